@@ -45,6 +45,7 @@ import abdcmd_arcydstatushtml
 import abdcmd_devstatushtml
 import abdcmd_init
 import abdcmd_instaweb
+import abdcmd_iolog
 import abdcmd_processrepos
 import abdcmd_repostatushtml
 import abdcmd_start
@@ -116,6 +117,8 @@ def main():
         "dev-status-html", abdcmd_devstatushtml, subparsers)
     phlsys_subcommand.setup_parser(
         "instaweb", abdcmd_instaweb, subparsers)
+    phlsys_subcommand.setup_parser(
+        "io-log", abdcmd_iolog, subparsers)
     phlsys_subcommand.setup_parser(
         "init", abdcmd_init, subparsers)
     phlsys_subcommand.setup_parser(
@@ -167,25 +167,28 @@ def _exercise_arcydreporter():
             pass
         with reporter.tag_timer_context('phabricator'):
             pass
-        reporter.finish_repo()
+        reporter.finish_repo('myrepo-machine')
         reporter.start_repo('repeatrepo-machine', 'repeatrepo')
-        reporter.finish_repo()
+        reporter.finish_repo('repeatrepo-machine')
         reporter.start_repo('myrepo2-machine', 'myrepo2')
-        reporter.finish_repo()
+        reporter.finish_repo('myrepo2-machine')
         reporter.start_repo('myrepo3-machine', 'myrepo3')
-        reporter.finish_repo()
+        reporter.finish_repo('myrepo3-machine')
         reporter.start_repo('failrepo-machine', 'failrepo')
-        reporter.fail_repo()
+        reporter.fail_repo('failrepo-machine')
         reporter.start_repo('myrepo4-machine', 'myrepo4')
-        reporter.finish_repo()
+        reporter.finish_repo('myrepo4-machine')
         reporter.start_repo('repeatrepo-machine', 'repeatrepo')
-        reporter.finish_repo()
+        reporter.finish_repo('repeatrepo-machine')
         reporter.log_system_error('error', 'description of error')
         reporter.log_system_error('other-error', 'description of other error')
         reporter.start_repo('updating_repo-machine', 'updating_repo')
         reporter.log_user_action('createrev', 'user created 1231 from branch')
         _write('arcyd_many_repos')
-        reporter.finish_repo()
+        reporter.start_repo('updating_repo2-machine', 'updating_repo2')
+        _write('arcyd_many_repos_concurrent')
+        reporter.finish_repo('updating_repo-machine')
+        reporter.finish_repo('updating_repo2-machine')
         reporter.start_sleep(3)
         _write('arcyd_sleeping')
         reporter.finish_sleep()
@@ -27,7 +27,7 @@ _DEFAULT_CONFIG = """
 --status-path
 var/status/arcyd_status.json
 --io-log-file
-var/log/git-phab-writes.log
+{io_log}
 --kill-file
 var/command/killfile
 --sleep-secs
@@ -75,7 +75,8 @@ def process(args):
         sys_admin_emails=' '.join(args.sys_admin_emails),
         sendmail_binary=args.sendmail_binary,
         sendmail_type=args.sendmail_type,
-        sleep_secs=args.sleep_secs)
+        sleep_secs=args.sleep_secs,
+        io_log=fs.layout.io_log)
 
     fs.create_root_config(config)
 
@@ -16,10 +16,18 @@
 from __future__ import absolute_import
 
 import BaseHTTPServer
+import SocketServer
+import json
 import os
 
+import phlsys_fs
+
 import abdcmd_arcydstatushtml
 import abdcmd_repostatushtml
+import abdweb_metricscontent
+import abdweb_pagecache
+
+_HTML_CONTENT_TYPE = 'text/html'
 
 
 def getFromfilePrefixChars():
@@ -61,6 +69,12 @@ def setupParser(parser):
         required=True,
         help="path to the repo files to render")
 
+    parser.add_argument(
+        '--threaded',
+        action='store_true',
+        help="serve each request on a new thread, so that slow clients "
+             "don't hold up the others.")
+
 
 class _NotFoundError(Exception):
     pass
@@ -68,36 +82,76 @@ class _NotFoundError(Exception):
 
 class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
-    def __init__(self, instaweb_args, *args):
+    def __init__(self, instaweb_args, page_cache, *args):
         self._instaweb_args = instaweb_args
+        self._page_cache = page_cache
         self.path = None  # for pychecker
         self.wfile = None  # for pychecker
+        self.headers = None  # for pychecker
         BaseHTTPServer.BaseHTTPRequestHandler.__init__(self, *args)
 
     def do_GET(self):
 
         try:
-            content = self._get_content()
+            page = self._get_page()
         except _NotFoundError:
             self.send_response(404)
-            self.send_header("Content-type", "text/html")
+            self.send_header("Content-type", _HTML_CONTENT_TYPE)
             self.end_headers()
             self.wfile.write("<html><body><h1>404</h1></body></html>")
             self.wfile.close()
+            return
+
+        is_gzip = _is_gzip_accepted(self.headers.getheader('Accept-Encoding'))
+        etag = page.gzipped_etag if is_gzip else page.etag
+
+        if _is_etag_matched(etag, self.headers.getheader('If-None-Match')):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            self.wfile.close()
         else:
+            content = page.gzipped_content if is_gzip else page.content
+
             self.send_response(200)
-            self.send_header("Content-type", "text/html")
+            self.send_header("Content-type", page.content_type)
+            self.send_header("Content-Length", str(len(content)))
+            if is_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+
+            # let clients keep the page, but make them check it's current
+            self.send_header("Cache-Control", "no-cache")
+
             self.end_headers()
             self.wfile.write(content)
             self.wfile.close()
 
-    def _get_content(self):
+    def _get_page(self):
 
         args = self._instaweb_args
 
-        if self.path == '/':
-            content = abdcmd_arcydstatushtml.render_content(
-                args.reset_file, args.pause_file, args.report_file, '')
+        if self.path == '/metrics':
+            paths = [args.report_file]
+
+            def render():
+                return (
+                    abdweb_metricscontent.CONTENT_TYPE,
+                    _render_metrics(args.report_file))
+        elif self.path == '/':
+            # the page shows whether the reset and pause files exist, so
+            # they're part of the key too
+            paths = [args.report_file, args.reset_file, args.pause_file]
+            paths = [p for p in paths if p]
+
+            def render():
+                return (
+                    _HTML_CONTENT_TYPE,
+                    abdcmd_arcydstatushtml.render_content(
+                        args.reset_file, args.pause_file, args.report_file,
+                        ''))
         elif self.path.lower().endswith('favicon.ico'):
             raise _NotFoundError('could not find favicon')
         else:
@@ -108,16 +162,66 @@ class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
             #      layout is standardized
             repo_path = dir_path + '.try'
             branches_path = dir_path + '.ok'
-            content = abdcmd_repostatushtml.render_content(
-                repo_path, branches_path)
+            paths = [repo_path, branches_path]
 
-        return content
+            def render():
+                return (
+                    _HTML_CONTENT_TYPE,
+                    abdcmd_repostatushtml.render_content(
+                        repo_path, branches_path))
+
+        return self._page_cache.get(self.path, paths, render)
+
+
+class _ThreadingHTTPServer(
+        SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    # don't wait for requests in progress when we're asked to stop
+    daemon_threads = True
+
+
+def _is_etag_matched(etag, if_none_match):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+
+    # If-None-Match uses the weak comparison, so 'W/"x"' matches '"x"'; each
+    # encoding has a tag of its own so this won't mix them up
+    tags = [t[2:] if t.startswith('W/') else t for t in tags]
+    return '*' in tags or etag in tags
+
+
+def _is_gzip_accepted(accept_encoding):
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(','):
+        parts = [p.strip() for p in coding.split(';')]
+        if parts[0].lower() in ('gzip', 'x-gzip'):
+            # e.g. 'gzip;q=0' means that gzip is not acceptable
+            for param in parts[1:]:
+                if param.startswith('q='):
+                    try:
+                        return float(param[2:]) > 0
+                    except ValueError:
+                        return False
+            return True
+    return False
+
+
+def _render_metrics(report_file):
+    # render straight from the report, without any of the html machinery, so
+    # that frequent scraping is cheap
+    with phlsys_fs.read_file_lock_context(report_file) as f:
+        report = json.load(f)
+    return abdweb_metricscontent.render(report)
 
 
 def _request_handler_factory(instaweb_args):
 
+    page_cache = abdweb_pagecache.PageCache()
+
     def factory(*args):
-        return _RequestHandler(instaweb_args, *args)
+        return _RequestHandler(instaweb_args, page_cache, *args)
 
     return factory
 
@@ -127,7 +231,10 @@ def process(args):
     # start a webserver
     server_address = ('', args.port)
     factory = _request_handler_factory(args)
-    httpd = BaseHTTPServer.HTTPServer(server_address, factory)
+    if args.threaded:
+        httpd = _ThreadingHTTPServer(server_address, factory)
+    else:
+        httpd = BaseHTTPServer.HTTPServer(server_address, factory)
     httpd.serve_forever()
 
 
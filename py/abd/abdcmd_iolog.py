@@ -0,0 +1,109 @@
+"""Display the log of Arcyd's writes to git and Phabricator.
+
+usage examples:
+    display the last 20 writes:
+    $ arcyd io-log --tail 20
+
+    display all the pushes made to git:
+    $ arcyd io-log --identifier git-push
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# abdcmd_iolog
+#
+# Public Functions:
+#   getFromfilePrefixChars
+#   setupParser
+#   process
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import collections
+import json
+
+import phlsys_jsonlog
+
+import abdt_arcydreporter
+import abdt_fs
+
+
+def getFromfilePrefixChars():
+    return None
+
+
+def setupParser(parser):
+    parser.add_argument(
+        '--tail',
+        metavar="N",
+        type=int,
+        help="only display the last N matching writes")
+    parser.add_argument(
+        '--identifier',
+        metavar="ID",
+        type=str,
+        action='append',
+        help="only display writes with this identifier, e.g. 'git-push', "
+             "may be specified more than once")
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help="display each write as a line of JSON")
+    parser.add_argument(
+        '--path',
+        metavar="PATH",
+        type=str,
+        default=abdt_fs.Layout.io_log,
+        help="the io log file to read, defaults to the one for the arcyd "
+             "instance in the current directory")
+
+
+def process(args):
+    records = phlsys_jsonlog.read(args.path)
+
+    if args.identifier:
+        identifiers = set(args.identifier)
+        records = (
+            r for r in records
+            if r.get(abdt_arcydreporter.ARCYD_LOGITEM_IDENTIFIER)
+            in identifiers)
+
+    if args.tail is not None:
+        records = collections.deque(records, maxlen=args.tail)
+
+    for r in records:
+        if args.json:
+            print json.dumps(r, sort_keys=True)
+        else:
+            print '{}: {} - {}'.format(
+                r.get(abdt_arcydreporter.ARCYD_LOGITEM_DATETIME),
+                r.get(abdt_arcydreporter.ARCYD_LOGITEM_IDENTIFIER),
+                r.get(abdt_arcydreporter.ARCYD_LOGITEM_DETAIL))
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
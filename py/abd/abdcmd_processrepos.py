@@ -8,7 +8,11 @@
 #   DelayedRetrySleepOperation
 #    .do
 #   RefreshCachesOperation
+#    .on_change
 #    .do
+#   RepoChangeTrigger
+#    .process
+#    .is_triggered
 #   ResetFileException
 #   FileCheckOperation
 #    .do
@@ -28,9 +32,12 @@ from __future__ import absolute_import
 
 import argparse
 import contextlib
+import datetime
 import functools
+import multiprocessing.pool
 import os
 import sys
+import threading
 import time
 
 import phlsys_scheduleunreliables
@@ -43,12 +50,18 @@ import phlurl_watcher
 import abdi_processrepoargs
 import abdi_repoargs
 import abdt_arcydreporter
+import abdt_diffcache
 import abdt_errident
 import abdt_exhandlers
 import abdt_logging
 import abdt_shareddictoutput
 import abdt_tryloop
 
+# when waiting for a pool to finish we must specify a timeout, otherwise the
+# wait is uninterruptible and signals like SIGTERM will not be handled until
+# all the workers have finished
+_POOL_WAIT_SECS = 60 * 60 * 24 * 365
+
 
 def getFromfilePrefixChars():
     return None
@@ -118,6 +131,66 @@ def setupParser(parser):
         type=int,
         default=60,
         help="time to wait between runs through the list")
+    parser.add_argument(
+        '--max-workers',
+        metavar="N",
+        type=int,
+        default=1,
+        help="maximum number of repos to process at the same time, each "
+             "repo is processed by at most one worker at a time")
+    parser.add_argument(
+        '--max-fetch-workers',
+        metavar="N",
+        type=int,
+        default=4,
+        help="maximum number of repos to fetch at the same time, repos "
+             "that their snoop url says have changed are fetched together "
+             "before they're processed, 0 to fetch each repo only when it's "
+             "processed")
+    parser.add_argument(
+        '--event-driven',
+        action='store_true',
+        help="process each repo as soon as it's snoop url or the state of "
+             "one of it's reviews changes, rather than sweeping through all "
+             "the repos then sleeping")
+    parser.add_argument(
+        '--poll-secs',
+        metavar="TIME",
+        type=int,
+        default=10,
+        help="when event driven, time to wait between checks for changes, "
+             "the conduit caches that the checks use are refreshed this "
+             "often after a change, backing off to every '--sleep-secs' "
+             "while idle")
+    parser.add_argument(
+        '--idle-secs',
+        metavar="TIME",
+        type=int,
+        default=3600,
+        help="when event driven, the longest time to leave a repo with a "
+             "snoop url unprocessed.  repos without a snoop url are "
+             "processed at least every '--sleep-secs'")
+    parser.add_argument(
+        '--reviewstate-cache-dir',
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="directory to save the state of reviews to after each cache "
+             "refresh, so that it may be re-used when restarting")
+    parser.add_argument(
+        '--diff-cache-dir',
+        metavar="PATH",
+        type=str,
+        default=None,
+        help="directory to save the diffs of review branches to, so that "
+             "they needn't be made again if the branches haven't changed")
+    parser.add_argument(
+        '--diff-cache-max-bytes',
+        metavar="N",
+        type=int,
+        default=256 * 1024 * 1024,
+        help="the most space that saved diffs may take up, the least "
+             "recently used are removed first")
     parser.add_argument(
         '--no-loop',
         action='store_true',
@@ -152,15 +225,86 @@ class DelayedRetrySleepOperation(object):
 
 class RefreshCachesOperation(object):
 
-    def __init__(self, conduits, url_watcher, reporter):
+    def __init__(
+            self,
+            conduits,
+            url_watcher,
+            reporter,
+            reviewstate_cache_dir,
+            repo_args_list=None,
+            max_fetch_workers=0,
+            min_interval_secs=0,
+            max_interval_secs=0):
+        """Construct an operation to refresh the caches used by the repos.
+
+        If 'max_interval_secs' is more than zero then the expensive refreshes
+        of the conduit caches and the prefetches are skipped while nothing
+        changes, the interval between them doubles from 'min_interval_secs'
+        up to 'max_interval_secs'.  Call 'on_change' to do them on the next
+        'do' and start backing off again.  The url watcher is cheap to
+        refresh, so that is done every time.
+
+        :conduits: the dict of conduits used to process the repos
+        :url_watcher: the phlurl_watcher.Watcher used to process the repos
+        :reporter: the abdt_arcydreporter.ArcydReporter to report to
+        :reviewstate_cache_dir: the string path to save conduit caches to
+        :repo_args_list: the list of repo arguments to prefetch
+        :max_fetch_workers: the maximum number of repos to prefetch at once
+        :min_interval_secs: the number of seconds to back off from
+        :max_interval_secs: the most seconds to back off to, or zero for none
+
+        """
         super(RefreshCachesOperation, self).__init__()
         self._conduits = conduits
         self._url_watcher = url_watcher
         self._reporter = reporter
+        self._reviewstate_cache_dir = reviewstate_cache_dir
+        self._repo_args_list = repo_args_list or []
+        self._max_fetch_workers = max_fetch_workers
+        self._min_interval_secs = min_interval_secs
+        self._max_interval_secs = max_interval_secs
+        self._interval_secs = 0
+        self._next_refresh_time = None
+
+    def on_change(self):
+        self._interval_secs = 0
+        self._next_refresh_time = None
 
     def do(self):
+        is_due = self._is_expensive_refresh_due()
+
         self._reporter.start_cache_refresh()
 
+        if is_due:
+            self._refresh_conduit_caches()
+
+        with self._reporter.tag_timer_context('refresh git watcher'):
+            abdt_tryloop.critical_tryloop(
+                self._url_watcher.refresh, abdt_errident.GIT_SNOOP, '')
+
+        if is_due and self._max_fetch_workers > 0 and self._repo_args_list:
+            with self._reporter.tag_timer_context('prefetch repos'):
+                self._prefetch_repos()
+
+        self._reporter.finish_cache_refresh()
+        return True
+
+    def _is_expensive_refresh_due(self):
+        if self._max_interval_secs <= 0:
+            return True
+
+        now = time.time()
+        if self._next_refresh_time is not None:
+            if now < self._next_refresh_time:
+                return False
+
+        self._next_refresh_time = now + self._interval_secs
+        self._interval_secs = min(
+            max(self._interval_secs * 2, self._min_interval_secs),
+            self._max_interval_secs)
+        return True
+
+    def _refresh_conduit_caches(self):
         with self._reporter.tag_timer_context('refresh conduit cache'):
             for key in self._conduits:
                 conduit = self._conduits[key]
@@ -169,12 +313,70 @@ class RefreshCachesOperation(object):
                     abdt_errident.CONDUIT_REFRESH,
                     conduit.describe())
 
-        with self._reporter.tag_timer_context('refresh git watcher'):
-            abdt_tryloop.critical_tryloop(
-                self._url_watcher.refresh, abdt_errident.GIT_SNOOP, '')
+        if self._reviewstate_cache_dir:
+            with self._reporter.tag_timer_context('save conduit cache'):
+                abdi_processrepoargs.save_conduit_caches(
+                    self._conduits, self._reviewstate_cache_dir)
 
-        self._reporter.finish_cache_refresh()
-        return True
+    def _prefetch_repos(self):
+
+        def prefetch(repo_args):
+            try:
+                abdi_processrepoargs.prefetch(repo_args, self._url_watcher)
+            except Exception as e:
+                # this isn't critical, the repo will try to fetch again when
+                # it's processed
+                abdt_logging.on_system_exception(
+                    abdt_errident.PREFETCH, repo_args.repo_desc, e)
+
+        pool = multiprocessing.pool.ThreadPool(
+            min(self._max_fetch_workers, len(self._repo_args_list)))
+        try:
+            pool.map_async(prefetch, self._repo_args_list).get(
+                _POOL_WAIT_SECS)
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+class RepoChangeTrigger(object):
+
+    def __init__(
+            self,
+            process_func,
+            repo_args,
+            conduits,
+            url_watcher,
+            on_change=None):
+        """Track the changes to a repo since it was last processed.
+
+        :process_func: callable to process the repo, returning review ids
+        :repo_args: the repo arguments as passed to 'process_single_repo'
+        :conduits: the dict of conduits used to process the repos
+        :url_watcher: the phlurl_watcher.Watcher used to process the repos
+        :on_change: optional callable to call when the repo is triggered
+
+        """
+        super(RepoChangeTrigger, self).__init__()
+        self._process_func = process_func
+        self._repo_args = repo_args
+        self._conduits = conduits
+        self._url_watcher = url_watcher
+        self._on_change = on_change
+        self._review_ids = []
+
+    def process(self):
+        self._review_ids = self._process_func()
+
+    def is_triggered(self):
+        is_changed = abdi_processrepoargs.is_changed(
+            self._repo_args,
+            self._conduits,
+            self._url_watcher,
+            self._review_ids)
+        if is_changed and self._on_change is not None:
+            self._on_change()
+        return is_changed
 
 
 class ResetFileException(Exception):
@@ -280,17 +482,42 @@ def _process(args, reporter):
 
     # TODO: test write access to repos here
 
+    repo_operations = []
     operations = []
     conduits = {}
     url_watcher = phlurl_watcher.Watcher()
 
+    diff_cache = None
+    if args.diff_cache_dir:
+        diff_cache = abdt_diffcache.DiffCache(
+            os.path.abspath(args.diff_cache_dir), args.diff_cache_max_bytes)
+
     urlwatcher_cache_path = os.path.abspath('.arcyd.urlwatcher.cache')
 
+    # repos may be processed concurrently, make sure that only one of them
+    # writes the url watcher cache at a time
+    urlwatcher_cache_lock = threading.Lock()
+
     # load the url watcher cache (if any)
     if os.path.isfile(urlwatcher_cache_path):
         with open(urlwatcher_cache_path) as f:
             url_watcher.load(f)
 
+    # when event driven, the cheap checks for changes are done every
+    # '--poll-secs' but the conduit caches they depend on are expensive to
+    # refresh, so back off from refreshing those to every '--sleep-secs' while
+    # idle.  the snoop urls are still polled every time.
+    max_refresh_interval_secs = args.sleep_secs if args.event_driven else 0
+    refresh_caches = RefreshCachesOperation(
+        conduits,
+        url_watcher,
+        reporter,
+        args.reviewstate_cache_dir,
+        [repo_args for _, repo_args in repos],
+        args.max_fetch_workers,
+        args.poll_secs,
+        max_refresh_interval_secs)
+
     for repo, repo_args in repos:
 
         # create a function to update this particular repo.
@@ -306,16 +533,38 @@ def _process(args, reporter):
             reporter,
             conduits,
             url_watcher,
-            urlwatcher_cache_path)
+            urlwatcher_cache_path,
+            urlwatcher_cache_lock,
+            args.reviewstate_cache_dir,
+            diff_cache)
 
         on_exception_delay = abdt_exhandlers.make_exception_delay_handler(
             args, reporter, repo)
+        if args.event_driven:
+            trigger = RepoChangeTrigger(
+                process_func,
+                repo_args,
+                conduits,
+                url_watcher,
+                refresh_caches.on_change)
+            process_func = trigger.process
+
         operation = phlsys_scheduleunreliables.DelayedRetryNotifyOperation(
             process_func,
             list(retry_delays),  # make a copy to be sure
             on_exception_delay)
 
-        operations.append(operation)
+        if args.event_driven:
+            if repo_args.repo_snoop_url:
+                idle_delay = datetime.timedelta(seconds=args.idle_secs)
+            else:
+                # we'll never hear about new commits on the repo if it has
+                # no snoop url, so sweep it as often as we normally would
+                idle_delay = datetime.timedelta(seconds=args.sleep_secs)
+            operation = phlsys_scheduleunreliables.TriggeredOperation(
+                operation, trigger.is_triggered, idle_delay)
+
+        repo_operations.append(operation)
 
     def on_pause():
         on_exception_delay = abdt_exhandlers.make_exception_delay_handler(
@@ -329,25 +578,33 @@ def _process(args, reporter):
             args.pause_file,
             on_pause))
 
+    sleep_secs = args.poll_secs if args.event_driven else args.sleep_secs
     operations.append(
         DelayedRetrySleepOperation(
-            out, args.sleep_secs, reporter))
+            out, sleep_secs, reporter))
 
-    operations.append(
-        RefreshCachesOperation(
-            conduits, url_watcher, reporter))
+    operations.append(refresh_caches)
 
     if args.no_loop:
         def process_once():
-            return phlsys_scheduleunreliables.process_once(list(operations))
+            return phlsys_scheduleunreliables.process_once(
+                list(operations), list(repo_operations), args.max_workers)
 
         new_ops = tryHandleSpecialFiles(process_once, on_exception_delay)
-        if new_ops != set(operations):
+        if new_ops != set(operations) | set(repo_operations):
             print 'ERROR: some operations failed'
             sys.exit(1)
+    elif args.event_driven:
+        def loopForever():
+            phlsys_scheduleunreliables.process_loop_event_driven(
+                list(operations), list(repo_operations), args.max_workers)
+
+        while True:
+            tryHandleSpecialFiles(loopForever, on_exception_delay)
     else:
         def loopForever():
-            phlsys_scheduleunreliables.process_loop_forever(list(operations))
+            phlsys_scheduleunreliables.process_loop_forever(
+                list(operations), list(repo_operations), args.max_workers)
 
         while True:
             tryHandleSpecialFiles(loopForever, on_exception_delay)
@@ -360,13 +617,26 @@ def process_single_repo(
         reporter,
         conduits,
         url_watcher,
-        urlwatcher_cache_path):
-    abdi_processrepoargs.do(
-        repo, repo_args, out, reporter, conduits, url_watcher)
+        urlwatcher_cache_path,
+        urlwatcher_cache_lock,
+        reviewstate_cache_dir,
+        diff_cache):
+    review_ids = abdi_processrepoargs.do(
+        repo,
+        repo_args,
+        out,
+        reporter,
+        conduits,
+        url_watcher,
+        reviewstate_cache_dir,
+        diff_cache)
 
     # save the urlwatcher cache
-    with open(urlwatcher_cache_path, 'w') as f:
-        url_watcher.dump(f)
+    with urlwatcher_cache_lock:
+        with open(urlwatcher_cache_path, 'w') as f:
+            url_watcher.dump(f)
+
+    return review_ids
 
 
 #------------------------------------------------------------------------------
@@ -67,6 +67,12 @@ def process(args):
     if args.no_loop:
         params.append('--no-loop')
 
+    params.append('--reviewstate-cache-dir')
+    params.append(fs.layout.dir_cache)
+
+    params.append('--diff-cache-dir')
+    params.append(fs.layout.dir_diff_cache)
+
     params.append('--repo-configs')
     for repo in repo_configs:
         params.append('@' + repo)
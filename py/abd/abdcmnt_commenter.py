@@ -31,6 +31,9 @@ import abdt_differ
 import abdt_exception
 import abdt_userwarning
 
+# the maximum number of file names to list when describing diff reductions
+_MAX_FILE_NAMES = 5
+
 _ABANDONED_MESSAGE = """
 this review has been abandoned, the review branch will be automatically
 removed soon.
@@ -286,7 +289,9 @@ the 'edit revision' link at the top-right of the page.
         message_list = []
 
         is_very_large = any(
-            isinstance(r, abdt_differ.DiffStatReduction)
+            isinstance(
+                r, (abdt_differ.DiffStatReduction,
+                    abdt_differ.FileStubReduction))
             for r in diff_result.reduction_list)
 
         if is_very_large:
@@ -336,6 +341,22 @@ the 'edit revision' link at the top-right of the page.
                     "diff size to "
                     "**{size:,} bytes** as UTF-8.".format(
                         size=r.diff_size_utf8_bytes))
+            elif isinstance(r, abdt_differ.FileLessContextReduction):
+                technique_list.append(
+                    "tried to reduce the amount of context to "
+                    "**{context:,} lines** for just the largest files, "
+                    "{files}, this reduced the diff size to "
+                    "**{size:,} bytes** as UTF-8.".format(
+                        context=r.context_lines,
+                        files=_format_file_names(r.file_names),
+                        size=r.diff_size_utf8_bytes))
+            elif isinstance(r, abdt_differ.FileStubReduction):
+                technique_list.append(
+                    "tried to **leave out the changes** to just the largest "
+                    "files, {files}, this reduced the diff size to "
+                    "**{size:,} bytes** as UTF-8.".format(
+                        files=_format_file_names(r.file_names),
+                        size=r.diff_size_utf8_bytes))
             elif isinstance(r, abdt_differ.DiffStatReduction):
                 technique_list.append(
                     "tried to reduce the diff to a **diffstat** instead, "
@@ -522,6 +543,28 @@ the 'edit revision' link at the top-right of the page.
         self._createComment(message)
 
 
+def _format_file_names(file_names):
+    """Return a string describing the supplied 'file_names' for a comment.
+
+    Usage examples:
+        >>> _format_file_names(['README'])
+        '`README`'
+
+        >>> _format_file_names(['a', 'b', 'c', 'd', 'e', 'f', 'g'])
+        '`a`, `b`, `c`, `d`, `e` and 2 more'
+
+    :file_names: a list of string file names
+    :returns: a string description of the files
+
+    """
+    shown = ', '.join(
+        '`{}`'.format(name) for name in file_names[:_MAX_FILE_NAMES])
+    num_hidden = len(file_names) - _MAX_FILE_NAMES
+    if num_hidden > 0:
+        shown += ' and {} more'.format(num_hidden)
+    return shown
+
+
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
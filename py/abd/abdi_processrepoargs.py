@@ -6,6 +6,9 @@
 #
 # Public Functions:
 #   do
+#   prefetch
+#   is_changed
+#   save_conduit_caches
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -13,12 +16,17 @@
 
 from __future__ import absolute_import
 
+import collections
 import contextlib
+import hashlib
+import os
+import threading
 import traceback
 
 import phlcon_reviewstatecache
 import phlmail_sender
 import phlsys_conduit
+import phlsys_fs
 import phlsys_git
 import phlsys_pluginmanager
 import phlsys_sendmail
@@ -37,9 +45,42 @@ import abdt_tryloop
 
 import abdi_processrepo
 
+# repos may be processed concurrently, make sure we only connect once per key
+_CONNECT_LOCK = threading.Lock()
 
-def do(repo, args, out, arcyd_reporter, conduits, url_watcher):
+# repos may be fetched by 'prefetch' while others are processed by 'do', make
+# sure that each repo is only used by one thread at a time and remember which
+# ones needn't be fetched again
+_REPO_LOCKS_LOCK = threading.Lock()
+_REPO_LOCKS = collections.defaultdict(threading.Lock)
+_PREFETCHED_REPO_PATHS = set()
 
+
+def do(
+        repo,
+        args,
+        out,
+        arcyd_reporter,
+        conduits,
+        url_watcher,
+        reviewstate_cache_dir=None,
+        diff_cache=None):
+    """Process the repo described by 'args', return list of review ids.
+
+    The returned review ids are those associated with the managed branches
+    of the repo, they are suitable for passing to 'is_changed' later.
+
+    If 'reviewstate_cache_dir' is supplied then new conduits will load their
+    cache of review states from there, if previously saved with
+    'save_conduit_caches'.
+
+    If 'diff_cache' is supplied then the diffs of unchanged branches will be
+    re-used from there rather than made again.
+
+    The long-lived git processes used to process the repo are stopped before
+    returning, so that they don't accumulate over many passes.
+
+    """
     reporter = abdt_reporeporter.RepoReporter(
         arcyd_reporter,
         repo,
@@ -48,9 +89,104 @@ def do(repo, args, out, arcyd_reporter, conduits, url_watcher):
         abdt_shareddictoutput.ToFile(args.ok_touch_path))
 
     with arcyd_reporter.tag_timer_context('process args'):
-        with contextlib.closing(reporter):
-            _do(
-                args, out, reporter, arcyd_reporter, conduits, url_watcher)
+        with _get_repo_lock(args.repo_path), contextlib.closing(reporter):
+            with contextlib.closing(phlsys_git.Repo(args.repo_path)) as clone:
+                return _do(
+                    args,
+                    clone,
+                    out,
+                    reporter,
+                    arcyd_reporter,
+                    conduits,
+                    url_watcher,
+                    reviewstate_cache_dir,
+                    diff_cache)
+
+
+def prefetch(args, url_watcher):
+    """Fetch the repo described by 'args' ahead of 'do', if it has changed.
+
+    Only repos with a snoop url that says they have changed are fetched, the
+    next call to 'do' for the repo will not fetch it again.  Repos that are
+    being processed at the time are skipped, they will fetch for themselves.
+
+    :args: the repo arguments, as passed to 'do'
+    :url_watcher: the phlurl_watcher.Watcher, as passed to 'do'
+    :returns: True if the repo was fetched, False otherwise
+
+    """
+    snoop_url = args.repo_snoop_url
+    if not snoop_url:
+        return False
+    if not url_watcher.peek_has_url_recently_changed(snoop_url):
+        return False
+
+    repo_lock = _get_repo_lock(args.repo_path)
+    if not repo_lock.acquire(False):
+        return False
+
+    try:
+        with contextlib.closing(phlsys_git.Repo(args.repo_path)) as clone:
+            repo = abdt_git.Repo(clone, "origin", args.repo_desc)
+            abdt_tryloop.tryloop(
+                repo.fetch_prune, abdt_errident.FETCH_PRUNE, args.repo_desc)
+        with _REPO_LOCKS_LOCK:
+            _PREFETCHED_REPO_PATHS.add(args.repo_path)
+    finally:
+        repo_lock.release()
+
+    return True
+
+
+def is_changed(args, conduits, url_watcher, review_ids):
+    """Return True if the repo described by 'args' may need processing.
+
+    A repo may need processing if it's snoop url has changed or if the state of
+    any of the supplied 'review_ids' changed on the last conduit refresh.
+
+    If the repo has not changed then the supplied 'review_ids' will be watched
+    for changes on the next conduit refresh.
+
+    :args: the repo arguments, as passed to 'do'
+    :conduits: the dict of conduits, as passed to 'do'
+    :url_watcher: the phlurl_watcher.Watcher, as passed to 'do'
+    :review_ids: the list of review ids returned from 'do'
+    :returns: True if the repo may need processing
+
+    """
+    snoop_url = args.repo_snoop_url
+    if snoop_url and url_watcher.peek_has_url_recently_changed(snoop_url):
+        return True
+
+    arcyd_conduit = conduits.get(_make_conduit_key(args))
+    if arcyd_conduit is None:
+        return True
+
+    if arcyd_conduit.pop_changed_reviews(review_ids):
+        return True
+
+    arcyd_conduit.watch_reviews(review_ids)
+    return False
+
+
+def save_conduit_caches(conduits, reviewstate_cache_dir):
+    """Save the review state caches of 'conduits' to 'reviewstate_cache_dir'.
+
+    :conduits: the dict of conduits, as passed to 'do'
+    :reviewstate_cache_dir: the string path of the directory to save to
+    :returns: None
+
+    """
+    phlsys_fs.ensure_dir(reviewstate_cache_dir)
+    for key, conduit in conduits.items():
+        path = _make_reviewstate_cache_path(reviewstate_cache_dir, key)
+
+        # write to a temporary file first, so that we never leave a partially
+        # written cache behind if we're interrupted
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            conduit.save_cache(f)
+        os.rename(tmp_path, path)
 
 
 def _set_attrib_if_not_none(config, key, value):
@@ -83,11 +219,19 @@ def _determine_options(args, repo):
     return config
 
 
-def _do(args, out, reporter, arcyd_reporter, conduits, url_watcher):
+def _do(
+        args,
+        clone,
+        out,
+        reporter,
+        arcyd_reporter,
+        conduits,
+        url_watcher,
+        reviewstate_cache_dir,
+        diff_cache):
 
     with arcyd_reporter.tag_timer_context('process branches prolog'):
-        repo = abdt_git.Repo(
-            phlsys_git.Repo(args.repo_path), "origin", args.repo_desc)
+        repo = abdt_git.Repo(clone, "origin", args.repo_desc)
 
         arcyd_reporter.tag_timer_decorate_object_methods_individually(
             repo, 'git')
@@ -96,11 +240,13 @@ def _do(args, out, reporter, arcyd_reporter, conduits, url_watcher):
             url_watcher,
             args.repo_snoop_url,
             repo,
-            args.repo_desc)
+            args.repo_desc,
+            _pop_is_prefetched(args.repo_path))
 
         options = _determine_options(args, repo)
 
-        arcyd_conduit = _connect(conduits, args, arcyd_reporter)
+        arcyd_conduit = _connect(
+            conduits, args, arcyd_reporter, reviewstate_cache_dir)
 
         reporter.set_config(options)
 
@@ -133,36 +279,58 @@ def _do(args, out, reporter, arcyd_reporter, conduits, url_watcher):
             repo,
             options.description,
             branch_naming,
-            branch_url_callable)
+            branch_url_callable,
+            diff_cache)
 
         for branch in branches:
             arcyd_reporter.tag_timer_decorate_object_methods_individually(
                 branch, 'branch')
 
+        # fetch the state of all the reviews in one go, rather than one at a
+        # time as each branch is processed
+        review_ids = [b.review_id_or_none() for b in branches]
+        review_ids = [i for i in review_ids if i is not None]
+        arcyd_conduit.prefetch_reviews(review_ids)
+
     try:
         with arcyd_reporter.tag_timer_context('process branches'):
-            abdi_processrepo.process_branches(
-                branches,
-                arcyd_conduit,
-                mailer,
-                pluginManager,
-                reporter)
+            # make the pushes for this repo together at the end, it's much
+            # cheaper than pushing each change as it's made.  note that the
+            # tracking branches of new reviews are still pushed at once.
+            with repo.batched_push_context():
+                abdi_processrepo.process_branches(
+                    branches,
+                    arcyd_conduit,
+                    mailer,
+                    pluginManager,
+                    reporter)
     except Exception:
         reporter.on_traceback(traceback.format_exc())
         raise
 
     reporter.on_completed()
 
+    review_ids = [b.review_id_or_none() for b in branches]
+    return [i for i in review_ids if i is not None]
 
-def _fetch_if_needed(url_watcher, snoop_url, repo, repo_desc):
+
+def _fetch_if_needed(url_watcher, snoop_url, repo, repo_desc, is_prefetched):
 
     did_fetch = False
 
     # fetch only if we need to
-    if not snoop_url or url_watcher.peek_has_url_recently_changed(snoop_url):
-            abdt_tryloop.tryloop(
-                repo.fetch_prune, abdt_errident.FETCH_PRUNE, repo_desc)
-            did_fetch = True
+    if is_prefetched:
+        # 'prefetch' already fetched everything that changed
+        did_fetch = True
+    elif not snoop_url:
+        # without a snoop url we can't tell if the repo changed without asking
+        # the remote, listing the branches is much cheaper than fetching
+        did_fetch = abdt_tryloop.tryloop(
+            repo.fetch_prune_moved, abdt_errident.FETCH_PRUNE, repo_desc)
+    elif url_watcher.peek_has_url_recently_changed(snoop_url):
+        abdt_tryloop.tryloop(
+            repo.fetch_prune, abdt_errident.FETCH_PRUNE, repo_desc)
+        did_fetch = True
 
     if did_fetch and snoop_url:
         # consume the 'newness' of this repo, since fetching succeeded
@@ -171,10 +339,53 @@ def _fetch_if_needed(url_watcher, snoop_url, repo, repo_desc):
     return did_fetch
 
 
-def _connect(conduits, args, arcyd_reporter):
+def _get_repo_lock(repo_path):
+    with _REPO_LOCKS_LOCK:
+        return _REPO_LOCKS[repo_path]
+
+
+def _pop_is_prefetched(repo_path):
+    with _REPO_LOCKS_LOCK:
+        is_prefetched = repo_path in _PREFETCHED_REPO_PATHS
+        _PREFETCHED_REPO_PATHS.discard(repo_path)
+        return is_prefetched
+
 
-    key = (
+def _connect(conduits, args, arcyd_reporter, reviewstate_cache_dir):
+    with _CONNECT_LOCK:
+        return _connect_locked(
+            conduits, args, arcyd_reporter, reviewstate_cache_dir)
+
+
+def _make_conduit_key(args):
+    return (
         args.instance_uri, args.arcyd_user, args.arcyd_cert, args.https_proxy)
+
+
+def _make_reviewstate_cache_path(reviewstate_cache_dir, key):
+    # the key contains the certificate, don't reveal it in the filename
+    name = hashlib.sha1(repr(key)).hexdigest()
+    return os.path.join(reviewstate_cache_dir, name + '.reviewstates')
+
+
+def _load_reviewstate_cache(
+        arcyd_conduit, arcyd_reporter, reviewstate_cache_dir, key):
+    path = _make_reviewstate_cache_path(reviewstate_cache_dir, key)
+    if not os.path.isfile(path):
+        return
+
+    # the cache is only an optimisation, carry on without it if it's no good
+    try:
+        with open(path) as f:
+            arcyd_conduit.load_cache(f)
+    except Exception as e:
+        arcyd_reporter.log_system_exception(
+            abdt_errident.LOAD_REVIEWSTATE_CACHE, path, e)
+
+
+def _connect_locked(conduits, args, arcyd_reporter, reviewstate_cache_dir):
+
+    key = _make_conduit_key(args)
     if key not in conduits:
         # create an array so that the 'connect' closure binds to the 'conduit'
         # variable as we'd expect, otherwise it'll just modify a local variable
@@ -200,6 +411,10 @@ def _connect(conduits, args, arcyd_reporter):
         reviewstate_cache = phlcon_reviewstatecache.ReviewStateCache()
         reviewstate_cache.set_conduit(conduit)
         arcyd_conduit = abdt_conduit.Conduit(conduit, reviewstate_cache)
+        if reviewstate_cache_dir:
+            with arcyd_reporter.tag_timer_context('load review state cache'):
+                _load_reviewstate_cache(
+                    arcyd_conduit, arcyd_reporter, reviewstate_cache_dir, key)
         arcyd_reporter.tag_timer_decorate_object_methods_individually(
             arcyd_conduit, 'conduit')
         conduits[key] = arcyd_conduit
@@ -39,7 +39,7 @@
 # Public Assignments:
 #   ARCYD_STATUS
 #   ARCYD_STATUS_DESCRIPTION
-#   ARCYD_CURRENT_REPO
+#   ARCYD_CURRENT_REPOS
 #   ARCYD_REPOS
 #   ARCYD_STATISTICS
 #   ARCYD_LOG_SYSTEM_ERROR
@@ -57,6 +57,7 @@
 #   REPO_ATTRIB_NAME
 #   REPO_ATTRIB_HUMAN_NAME
 #   REPO_ATTRIB_STATUS
+#   REPO_ATTRIB_LAST_DURATION
 #   REPO_LIST_ATTRIB
 #   REPO_STATUS_UPDATING
 #   REPO_STATUS_FAILED
@@ -65,7 +66,22 @@
 #   ARCYD_STAT_CURRENT_CYCLE_TIME
 #   ARCYD_STAT_LAST_CYCLE_TIME
 #   ARCYD_STAT_TAG_SAMPLERS
+#   ARCYD_STAT_HTTP_POOL
+#   ARCYD_STAT_TAG_LATENCIES
+#   ARCYD_STAT_TAG_HISTOGRAMS
+#   ARCYD_STAT_TAG_ERRORS
+#   ARCYD_STAT_SYSTEM_ERRORS
+#   ARCYD_STAT_TRYLOOP_EXCEPTIONS
 #   ARCYD_LIST_STATISTICS
+#   ARCYD_LATENCY_CURRENT_CYCLE
+#   ARCYD_LATENCY_LAST_CYCLE
+#   ARCYD_LATENCY_RECENT_CYCLES
+#   ARCYD_LATENCY_COUNT
+#   ARCYD_LATENCY_P50
+#   ARCYD_LATENCY_P90
+#   ARCYD_LATENCY_P99
+#   ARCYD_LATENCY_MAX
+#   ARCYD_LIST_LATENCY
 #   ARCYD_LOGITEM_DATETIME
 #   ARCYD_LOGITEM_IDENTIFIER
 #   ARCYD_LOGITEM_DETAIL
@@ -81,15 +97,18 @@ import contextlib
 import datetime
 import functools
 import inspect
-import os
+import threading
 import traceback
 import types
 
+import phlsys_histogram
+import phlsys_httppool
+import phlsys_jsonlog
 import phlsys_subprocess
 
 ARCYD_STATUS = 'status'
 ARCYD_STATUS_DESCRIPTION = 'status-description'
-ARCYD_CURRENT_REPO = 'current-repo'
+ARCYD_CURRENT_REPOS = 'current-repos'
 ARCYD_REPOS = 'repos'
 ARCYD_STATISTICS = 'statistics'
 ARCYD_LOG_SYSTEM_ERROR = 'log-system-error'
@@ -99,7 +118,7 @@ ARCYD_LOG_USER_ACTION = 'log-user-action'
 ARCYD_LOG_USER_ACTION_MAX_SIZE = 5
 
 ARCYD_LIST_ATTRIB = [
-    ARCYD_CURRENT_REPO,
+    ARCYD_CURRENT_REPOS,
     ARCYD_STATUS,
     ARCYD_STATUS_DESCRIPTION,
     ARCYD_REPOS,
@@ -129,11 +148,13 @@ ARCYD_LIST_STATUS = [
 REPO_ATTRIB_NAME = 'name'
 REPO_ATTRIB_HUMAN_NAME = 'human-name'
 REPO_ATTRIB_STATUS = 'repo-status'
+REPO_ATTRIB_LAST_DURATION = 'last-duration'
 
 REPO_LIST_ATTRIB = [
     REPO_ATTRIB_NAME,
     REPO_ATTRIB_HUMAN_NAME,
     REPO_ATTRIB_STATUS,
+    REPO_ATTRIB_LAST_DURATION,
 ]
 
 REPO_STATUS_UPDATING = 'updating'
@@ -149,13 +170,47 @@ REPO_STATUSES = [
 ARCYD_STAT_CURRENT_CYCLE_TIME = 'current-cycle-time'
 ARCYD_STAT_LAST_CYCLE_TIME = 'last-cycle-time'
 ARCYD_STAT_TAG_SAMPLERS = 'tag-samplers'
+ARCYD_STAT_HTTP_POOL = 'http-pool'
+ARCYD_STAT_TAG_LATENCIES = 'tag-latencies'
+ARCYD_STAT_TAG_HISTOGRAMS = 'tag-histograms'
+ARCYD_STAT_TAG_ERRORS = 'tag-errors'
+ARCYD_STAT_SYSTEM_ERRORS = 'system-errors'
+ARCYD_STAT_TRYLOOP_EXCEPTIONS = 'tryloop-exceptions'
 
 ARCYD_LIST_STATISTICS = [
     ARCYD_STAT_CURRENT_CYCLE_TIME,
     ARCYD_STAT_LAST_CYCLE_TIME,
     ARCYD_STAT_TAG_SAMPLERS,
+    ARCYD_STAT_HTTP_POOL,
+    ARCYD_STAT_TAG_LATENCIES,
+    ARCYD_STAT_TAG_HISTOGRAMS,
+    ARCYD_STAT_TAG_ERRORS,
+    ARCYD_STAT_SYSTEM_ERRORS,
+    ARCYD_STAT_TRYLOOP_EXCEPTIONS,
 ]
 
+# the latencies of each call to a tag are summarised over these periods
+ARCYD_LATENCY_CURRENT_CYCLE = 'current-cycle'
+ARCYD_LATENCY_LAST_CYCLE = 'last-cycle'
+ARCYD_LATENCY_RECENT_CYCLES = 'recent-cycles'
+
+ARCYD_LATENCY_COUNT = 'count'
+ARCYD_LATENCY_P50 = 'p50'
+ARCYD_LATENCY_P90 = 'p90'
+ARCYD_LATENCY_P99 = 'p99'
+ARCYD_LATENCY_MAX = 'max'
+
+ARCYD_LIST_LATENCY = [
+    ARCYD_LATENCY_COUNT,
+    ARCYD_LATENCY_P50,
+    ARCYD_LATENCY_P90,
+    ARCYD_LATENCY_P99,
+    ARCYD_LATENCY_MAX,
+]
+
+# the number of cycles summarised by ARCYD_LATENCY_RECENT_CYCLES
+_LATENCY_RECENT_CYCLES = 10
+
 ARCYD_LOGITEM_DATETIME = 'logitem-datetime'
 ARCYD_LOGITEM_IDENTIFIER = 'logitem-identifier'
 ARCYD_LOGITEM_DETAIL = 'logitem-detail'
@@ -274,18 +329,44 @@ class ArcydReporter(object):
         super(ArcydReporter, self).__init__()
         self._output = output
 
-        log_path = io_log_path
-        self._io_log_path = os.path.abspath(log_path) if log_path else None
+        self._io_log = None
+        if io_log_path:
+            self._io_log = phlsys_jsonlog.Writer(io_log_path)
 
         assert self._output
 
+        # repos may be processed concurrently by different threads, guard all
+        # of our state with a lock
+        self._lock = threading.RLock()
+
         self._repos = {}
-        self._repo = None
+        self._current_repos = {}
 
         self._cycle_timer = _CycleTimer()
         self._tag_samplers = collections.defaultdict(Sampler)
         self._tag_times_now = collections.defaultdict(float)
         self._log_system_error = list()
+
+        # histograms of the duration of each call to each tag, for this cycle
+        # and for the recent cycles.  the summaries of completed cycles only
+        # change when a cycle completes, so keep them rather than re-making
+        # them every time the status is written.
+        self._tag_histograms_now = collections.defaultdict(
+            phlsys_histogram.Histogram)
+        self._tag_histograms_recent = collections.defaultdict(
+            functools.partial(
+                collections.deque, maxlen=_LATENCY_RECENT_CYCLES))
+        self._tag_latencies_completed = {}
+
+        # counters since we started, for monitoring systems to scrape; these
+        # only ever increase so that rates may be taken from them
+        self._tag_histograms_total = collections.defaultdict(
+            phlsys_histogram.Histogram)
+        self._tag_errors = collections.defaultdict(int)
+        self._system_errors = collections.defaultdict(int)
+        self._tryloop_exceptions = 0
+
+        self._repo_timers = {}
         self._log_user_action = list()
 
         self._external_system_error_logger = None
@@ -297,14 +378,17 @@ class ArcydReporter(object):
 
     def start_sleep(self, duration):
         _ = duration  # NOQA
-        self._cycle_timer.stop_cycle()
-        self._write_status(ARCYD_STATUS_SLEEPING)
+        with self._lock:
+            self._cycle_timer.stop_cycle()
+            self._write_status(ARCYD_STATUS_SLEEPING)
 
     def update_sleep(self, duration):
         _ = duration  # NOQA
         self._write_status(ARCYD_STATUS_SLEEPING)
 
     def on_tryloop_exception(self, e, delay):
+        with self._lock:
+            self._tryloop_exceptions += 1
         tb = traceback.format_exc()
         self._write_status(
             ARCYD_STATUS_TRYLOOP_EXCEPTION,
@@ -317,9 +401,12 @@ class ArcydReporter(object):
             ARCYD_LOGITEM_IDENTIFIER: identifier,
             ARCYD_LOGITEM_DETAIL: detail,
         }
-        log.append(d)
+        with self._lock:
+            log.append(d)
 
     def log_system_error(self, identifier, detail):
+        with self._lock:
+            self._system_errors[identifier] += 1
         self._add_log_item(self._log_system_error, identifier, detail)
         if self._external_system_error_logger:
             phlsys_subprocess.run(
@@ -328,30 +415,62 @@ class ArcydReporter(object):
                 detail)
 
     def log_user_action(self, identifier, detail):
-        self._add_log_item(self._log_user_action, identifier, detail)
-        if self._log_user_action > ARCYD_LOG_USER_ACTION_MAX_SIZE:
-            max_size = ARCYD_LOG_USER_ACTION_MAX_SIZE
-            self._log_user_action = self._log_user_action[-max_size:]
+        with self._lock:
+            self._add_log_item(self._log_user_action, identifier, detail)
+            if self._log_user_action > ARCYD_LOG_USER_ACTION_MAX_SIZE:
+                max_size = ARCYD_LOG_USER_ACTION_MAX_SIZE
+                self._log_user_action = self._log_user_action[-max_size:]
 
     def log_io_action(self, identifier, detail):
-        if self._io_log_path:
-            with open(self._io_log_path, 'a') as f:
-                now = str(datetime.datetime.utcnow())
-                description = '{}: {} - {}\n'.format(now, identifier, detail)
-                f.write(description)
+        if self._io_log:
+            self._io_log.write({
+                ARCYD_LOGITEM_DATETIME: str(datetime.datetime.utcnow()),
+                ARCYD_LOGITEM_IDENTIFIER: identifier,
+                ARCYD_LOGITEM_DETAIL: detail,
+            })
 
     def log_system_exception(self, identifier, detail, exception):
         message = detail + '\n' + repr(exception)
         self.log_system_error(identifier, message)
 
     def finish_sleep(self):
-        self._write_status(ARCYD_STATUS_IDLE)
-        self._cycle_timer.start_cycle()
-
-        # accumulate tag times from last cycle
-        for k, v in self._tag_times_now.iteritems():
-            self._tag_samplers[k].sample(v)
-        self._tag_times_now = collections.defaultdict(float)
+        with self._lock:
+            self._write_status(ARCYD_STATUS_IDLE)
+            self._cycle_timer.start_cycle()
+
+            # accumulate tag times from last cycle
+            for k, v in self._tag_times_now.iteritems():
+                self._tag_samplers[k].sample(v)
+            self._tag_times_now = collections.defaultdict(float)
+
+            self._complete_tag_latencies()
+
+    def _complete_tag_latencies(self):
+        histograms_now = self._tag_histograms_now
+        self._tag_histograms_now = collections.defaultdict(
+            phlsys_histogram.Histogram)
+
+        # tags which weren't used in the last cycle still complete a cycle,
+        # so that their old calls are eventually forgotten
+        tags = set(histograms_now) | set(self._tag_histograms_recent)
+        for tag in tags:
+            recent = self._tag_histograms_recent[tag]
+            recent.append(histograms_now[tag])
+
+            recent_histogram = phlsys_histogram.Histogram()
+            for histogram in recent:
+                recent_histogram.merge(histogram)
+
+            if recent_histogram.count:
+                self._tag_latencies_completed[tag] = {
+                    ARCYD_LATENCY_LAST_CYCLE: _summarise_latencies(
+                        histograms_now[tag]),
+                    ARCYD_LATENCY_RECENT_CYCLES: _summarise_latencies(
+                        recent_histogram),
+                }
+            else:
+                del self._tag_histograms_recent[tag]
+                self._tag_latencies_completed.pop(tag, None)
 
     def start_cache_refresh(self):
         self._write_status(ARCYD_STATUS_REFRESHING_CACHE)
@@ -360,18 +479,36 @@ class ArcydReporter(object):
         self._write_status(ARCYD_STATUS_IDLE)
 
     def start_repo(self, name, human_name):
-        self._repo = {
-            REPO_ATTRIB_NAME: name,
-            REPO_ATTRIB_HUMAN_NAME: human_name,
-            REPO_ATTRIB_STATUS: REPO_STATUS_UPDATING,
-        }
-        self._write_status(ARCYD_STATUS_UPDATING)
+        with self._lock:
+            last_duration = None
+            if name in self._repos:
+                last_duration = self._repos[name][REPO_ATTRIB_LAST_DURATION]
+            self._current_repos[name] = {
+                REPO_ATTRIB_NAME: name,
+                REPO_ATTRIB_HUMAN_NAME: human_name,
+                REPO_ATTRIB_STATUS: REPO_STATUS_UPDATING,
+                REPO_ATTRIB_LAST_DURATION: last_duration,
+            }
+            self._repo_timers[name] = Timer()
+            self._repo_timers[name].start()
+            self._write_status(ARCYD_STATUS_UPDATING)
 
     @contextlib.contextmanager
     def tag_timer_context(self, tag_name):
-        with timer_context() as timer:
-            yield
-        self._tag_times_now[tag_name] += timer.duration
+        is_error = True
+        try:
+            with timer_context() as timer:
+                yield
+            is_error = False
+        finally:
+            # record the failures too, calls which time out are likely to be
+            # the slowest of all
+            with self._lock:
+                self._tag_times_now[tag_name] += timer.duration
+                self._tag_histograms_now[tag_name].record(timer.duration)
+                self._tag_histograms_total[tag_name].record(timer.duration)
+                if is_error:
+                    self._tag_errors[tag_name] += 1
 
     def _tag_timer_decorate(self, tag, f):
         @functools.wraps(f)
@@ -395,52 +532,100 @@ class ArcydReporter(object):
                     self._tag_timer_decorate(description, attribute), object_)
                 object_.__dict__[name] = new_method
 
-    def fail_repo(self):
-        self._repo[REPO_ATTRIB_STATUS] = REPO_STATUS_FAILED
-        self._repos[self._repo[REPO_ATTRIB_NAME]] = self._repo
-        self._repo = None
-        self._write_status(ARCYD_STATUS_UPDATING)
-
-    def finish_repo(self):
-        if self._repo is None:
-            # if we fail_repo then we'll finish_repo after so allow
-            # finishing when there's no current repo
-            # (we still want to set the repo to None in fail_repo or we'll
-            #  accidentally set it to OK in this function)
-            return
-        self._repo[REPO_ATTRIB_STATUS] = REPO_STATUS_OK
-        self._repos[self._repo[REPO_ATTRIB_NAME]] = self._repo
-        self._repo = None
-        self._write_status(ARCYD_STATUS_IDLE)
+    def fail_repo(self, name):
+        with self._lock:
+            repo = self._current_repos.pop(name)
+            repo[REPO_ATTRIB_STATUS] = REPO_STATUS_FAILED
+            self._stop_repo_timer(repo)
+            self._repos[name] = repo
+            self._write_status(ARCYD_STATUS_UPDATING)
+
+    def finish_repo(self, name):
+        with self._lock:
+            if name not in self._current_repos:
+                # if we fail_repo then we'll finish_repo after so allow
+                # finishing when the repo is not current
+                # (we still want to remove the repo in fail_repo or we'll
+                #  accidentally set it to OK in this function)
+                return
+            repo = self._current_repos.pop(name)
+            repo[REPO_ATTRIB_STATUS] = REPO_STATUS_OK
+            self._stop_repo_timer(repo)
+            self._repos[name] = repo
+            if self._current_repos:
+                self._write_status(ARCYD_STATUS_UPDATING)
+            else:
+                self._write_status(ARCYD_STATUS_IDLE)
+
+    def _stop_repo_timer(self, repo):
+        timer = self._repo_timers.pop(repo[REPO_ATTRIB_NAME])
+        timer.stop()
+        repo[REPO_ATTRIB_LAST_DURATION] = timer.duration
 
     def _write_status(self, status, description=None):
-        timer = self._cycle_timer
-        assert status in ARCYD_LIST_STATUS
-
-        tag_samplers = dict(self._tag_samplers)
-        for k, v in tag_samplers.iteritems():
-            tag_samplers[k] = v.to_dict()
-
-        statistics = {
-            ARCYD_STAT_CURRENT_CYCLE_TIME: timer.current_duration(),
-            ARCYD_STAT_LAST_CYCLE_TIME: timer.last_duration,
-            ARCYD_STAT_TAG_SAMPLERS: tag_samplers,
-        }
-        assert set(statistics.keys()) == set(ARCYD_LIST_STATISTICS)
-        d = {
-            ARCYD_STATUS: status,
-            ARCYD_STATUS_DESCRIPTION: description,
-            ARCYD_CURRENT_REPO: self._repo,
-            ARCYD_REPOS: [self._repos[k] for k in self._repos],
-            ARCYD_STATISTICS: statistics,
-            ARCYD_LOG_SYSTEM_ERROR: self._log_system_error,
-            ARCYD_LOG_USER_ACTION: self._log_user_action,
-        }
-        assert set(d.keys()) == set(ARCYD_LIST_ATTRIB)
-        self._output.write(d)
+        with self._lock:
+            timer = self._cycle_timer
+            assert status in ARCYD_LIST_STATUS
+
+            tag_samplers = dict(self._tag_samplers)
+            for k, v in tag_samplers.iteritems():
+                tag_samplers[k] = v.to_dict()
+
+            tag_latencies = dict(
+                (tag, dict(latencies))
+                for tag, latencies in self._tag_latencies_completed.iteritems()
+            )
+            for tag, histogram in self._tag_histograms_now.iteritems():
+                latencies = tag_latencies.setdefault(tag, {})
+                latencies[ARCYD_LATENCY_CURRENT_CYCLE] = _summarise_latencies(
+                    histogram)
+
+            statistics = {
+                ARCYD_STAT_CURRENT_CYCLE_TIME: timer.current_duration(),
+                ARCYD_STAT_LAST_CYCLE_TIME: timer.last_duration,
+                ARCYD_STAT_TAG_SAMPLERS: tag_samplers,
+                ARCYD_STAT_HTTP_POOL: dict(
+                    phlsys_httppool.get_default_pool().stats()._asdict()),
+                ARCYD_STAT_TAG_LATENCIES: tag_latencies,
+                ARCYD_STAT_TAG_HISTOGRAMS: dict(
+                    (tag, histogram.to_dict())
+                    for tag, histogram
+                    in self._tag_histograms_total.iteritems()
+                ),
+                ARCYD_STAT_TAG_ERRORS: dict(self._tag_errors),
+                ARCYD_STAT_SYSTEM_ERRORS: dict(self._system_errors),
+                ARCYD_STAT_TRYLOOP_EXCEPTIONS: self._tryloop_exceptions,
+            }
+            assert set(statistics.keys()) == set(ARCYD_LIST_STATISTICS)
+            d = {
+                ARCYD_STATUS: status,
+                ARCYD_STATUS_DESCRIPTION: description,
+                ARCYD_CURRENT_REPOS: [
+                    self._current_repos[k] for k in self._current_repos
+                ],
+                ARCYD_REPOS: [self._repos[k] for k in self._repos],
+                ARCYD_STATISTICS: statistics,
+                ARCYD_LOG_SYSTEM_ERROR: self._log_system_error,
+                ARCYD_LOG_USER_ACTION: self._log_user_action,
+            }
+            assert set(d.keys()) == set(ARCYD_LIST_ATTRIB)
+            self._output.write(d)
 
     def close(self):
         self._write_status(ARCYD_STATUS_STOPPED)
+        self._output.flush()
+        if self._io_log:
+            self._io_log.close()
+
+
+def _summarise_latencies(histogram):
+    return {
+        ARCYD_LATENCY_COUNT: histogram.count,
+        ARCYD_LATENCY_P50: histogram.percentile(50),
+        ARCYD_LATENCY_P90: histogram.percentile(90),
+        ARCYD_LATENCY_P99: histogram.percentile(99),
+        ARCYD_LATENCY_MAX: histogram.max,
+    }
 
 
 #------------------------------------------------------------------------------
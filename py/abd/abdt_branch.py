@@ -51,8 +51,8 @@
 
 from __future__ import absolute_import
 
-import phlgit_checkout
 import phlgit_log
+import phlgit_mergebase
 import phlgit_push
 import phlgit_revparse
 import phlgitu_ref
@@ -96,7 +96,9 @@ class Branch(object):
             tracking_hash,
             lander,
             repo_name,
-            browse_url=None):
+            browse_url=None,
+            base_hash=None,
+            diff_cache=None):
         """Create a new relationship tracker for the supplied branch names.
 
         :clone: a Git clone to delegate to
@@ -107,6 +109,8 @@ class Branch(object):
         :lander: a lander conformant to abdt_lander
         :repo_name: a short string to identify the repo to humans
         :browse_url: a URL to browse the branch or repo (may be None)
+        :base_hash: the commit hash of the base branch or None
+        :diff_cache: an abdt_diffcache.DiffCache to re-use diffs from, or None
 
         """
         self._clone = clone
@@ -119,6 +123,8 @@ class Branch(object):
         assert self._tracking_branch_valid_or_none()
         self._repo_name = repo_name
         self._browse_url = browse_url
+        self._base_hash = base_hash
+        self._diff_cache = diff_cache
         assert self._repo_name is not None
 
     def _review_branch_valid_or_none(self):
@@ -297,13 +303,15 @@ class Branch(object):
         else:
             previous = self._tracking_branch.remote_branch
 
-        hashes = self._clone.get_range_hashes(previous, latest)
-        hashes.reverse()
-        revisions = self._clone.make_revisions_from_hashes(hashes)
+        lines = [
+            r.abbrev_hash + " " + r.subject + "\n"
+            for r in phlgit_log.iter_revisions_from_range(
+                self._clone, previous, latest)
+        ]
 
-        message = ""
-        for r in revisions:
-            message += r.abbrev_hash + " " + r.subject + "\n"
+        # describe the most recent commit first
+        lines.reverse()
+        message = "".join(lines)
         return phlsys_textconvert.ensure_ascii(message)
 
     def make_message_digest(self):
@@ -327,13 +335,31 @@ class Branch(object):
         If the diff would exceed the pre-specified max diff size then take
         measures to reduce the diff.
 
+        If the same diff was made before and is still in the diff cache then
+        re-use that instead.
+
         """
-        # checkout the 'to' branch, otherwise we won't take into account any
-        # changes to .gitattributes files
-        phlgit_checkout.branch(self._clone, self._review_branch.remote_branch)
+        # the diff is entirely determined by the review commit and the
+        # merge-base with the base, so it's safe to re-use a diff made from the
+        # same ones.  note that the tip of the base may move on without
+        # changing the merge-base.
+        merge_base = None
+        if (self._diff_cache is not None and
+                self._base_hash is not None and
+                self._review_hash is not None):
+            merge_base = phlgit_mergebase.get_or_none(
+                self._clone,
+                self._review_branch.remote_base,
+                self._review_hash)
+
+        if merge_base is not None:
+            diff_result = self._diff_cache.get(
+                merge_base, self._review_hash, _MAX_DIFF_SIZE)
+            if diff_result is not None:
+                return diff_result
 
         try:
-            return abdt_differ.make_raw_diff(
+            diff_result = abdt_differ.make_raw_diff(
                 self._clone,
                 self._review_branch.remote_base,
                 self._review_branch.remote_branch,
@@ -344,27 +370,43 @@ class Branch(object):
                 self.review_branch_name(),
                 self.review_branch_hash())
 
+        if merge_base is not None:
+            self._diff_cache.put(
+                merge_base,
+                self._review_hash,
+                _MAX_DIFF_SIZE,
+                diff_result)
+
+        return diff_result
+
     def _is_based_on(self, name, base):
-        # TODO: actually do this
-        return True
+        merge_base = phlgit_mergebase.get_or_none(self._clone, name, base)
+        return merge_base is not None
 
     def verify_review_branch_base(self):
         """Raise exception if review branch has invalid base."""
-        if self._review_branch.base not in self._clone.get_remote_branches():
+        # if we were given the hash of the base then it must exist, save
+        # asking git again
+        has_base = self._base_hash is not None
+        if not has_base:
+            remote_branches = self._clone.get_remote_branches()
+            has_base = self._review_branch.base in remote_branches
+        if not has_base:
             raise abdt_exception.MissingBaseException(
                 self._review_branch.branch,
                 self._review_branch.description,
                 self._review_branch.base)
         if not self._is_based_on(
-                self._review_branch.branch, self._review_branch.base):
+                self._review_branch.remote_branch,
+                self._review_branch.remote_base):
             raise abdt_exception.AbdUserException(
                 "'" + self._review_branch.branch +
                 "' is not based on '" + self._review_branch.base + "'")
 
     def get_commit_message_from_tip(self):
         """Return string commit message from latest commit on branch."""
-        hashes = self._get_commit_hashes()
-        revision = phlgit_log.make_revision_from_hash(self._clone, hashes[-1])
+        revision = phlgit_log.make_revision_from_hash(
+            self._clone, self._review_branch.remote_branch)
         message = revision.subject + "\n"
         message += "\n"
         message += revision.message + "\n"
@@ -454,12 +496,16 @@ class Branch(object):
         assert self.review_id_or_none() is None
 
         def action():
-            if not self.is_new():
-                # 'push_bad_new_in_review' wont clean up our existing tracker
-                self._push_delete_tracking_branch()
-            self._push_new(
-                abdt_naming.WB_STATUS_BAD_INREVIEW,
-                revision_id)
+            # the tracker is the only record that the review was created, so
+            # push it now even if pushes are being batched
+            with self._clone.unbatched_push_context():
+                if not self.is_new():
+                    # 'push_bad_new_in_review' wont clean up our existing
+                    # tracker
+                    self._push_delete_tracking_branch()
+                self._push_new(
+                    abdt_naming.WB_STATUS_BAD_INREVIEW,
+                    revision_id)
 
         self._tryloop(action, abdt_errident.MARK_NEW_BAD_IN_REVIEW)
 
@@ -473,9 +519,12 @@ class Branch(object):
             return
 
         def action():
-            self._push_new(
-                abdt_naming.WB_STATUS_BAD_PREREVIEW,
-                None)
+            # the tracker is the only record that we tried to create the
+            # review, so push it now even if pushes are being batched
+            with self._clone.unbatched_push_context():
+                self._push_new(
+                    abdt_naming.WB_STATUS_BAD_PREREVIEW,
+                    None)
 
         self._tryloop(
             action, abdt_errident.MARK_BAD_PRE_REVIEW)
@@ -493,43 +542,47 @@ class Branch(object):
         assert self.review_id_or_none() is None
 
         def action():
-            if not self.is_new():
-                # 'push_bad_new_in_review' wont clean up our existing tracker
-                self._push_delete_tracking_branch()
-            self._push_new(
-                abdt_naming.WB_STATUS_OK,
-                revision_id)
+            # the tracker is the only record that the review was created, so
+            # push it now even if pushes are being batched
+            with self._clone.unbatched_push_context():
+                if not self.is_new():
+                    # 'push_bad_new_in_review' wont clean up our existing
+                    # tracker
+                    self._push_delete_tracking_branch()
+                self._push_new(
+                    abdt_naming.WB_STATUS_OK,
+                    revision_id)
 
         self._tryloop(action, abdt_errident.MARK_OK_NEW_REVIEW)
 
     def land(self, author_name, author_email, message):
         """Integrate the branch into the base and remove the review branch."""
 
-        self._clone.checkout_forced_new_branch(
-            self._tracking_branch.base,
-            self._tracking_branch.remote_base)
-
+        # the lander doesn't touch the working tree or update any branches,
+        # so there's nothing to clean up if it fails
         try:
-            result = self._lander(
+            landing_hash, result = self._lander(
                 self._clone,
+                self._tracking_branch.remote_base,
                 self._tracking_branch.remote_branch,
                 author_name,
                 author_email,
                 message)
         except abdt_lander.LanderException as e:
-            self._clone.call("reset", "--hard")  # fix the working copy
             raise abdt_exception.LandingException(
                 str(e),
                 self.review_branch_name(),
                 self._tracking_branch.base)
 
-        landing_hash = phlgit_revparse.get_sha1(
-            self._clone, self._tracking_branch.base)
-
         # don't tryloop here as it's more expected that we can't push the base
-        # due to permissioning or some other error
+        # due to permissioning or some other error.  push immediately, even if
+        # pushes are being batched, as we need to know if this succeeded.
         try:
-            self._clone.push(self._tracking_branch.base)
+            phlgit_push.push_asymmetrical(
+                self._clone,
+                landing_hash,
+                phlgitu_ref.make_local(self._tracking_branch.base),
+                self._clone.get_remote())
         except Exception as e:
             raise abdt_exception.LandingPushBaseException(
                 str(e),
@@ -579,18 +632,14 @@ class Branch(object):
 
         new_branch = self._tracking_branch.branch
         if old_branch == new_branch:
-            phlgit_push.push_asymmetrical_force(
-                self._clone,
+            self._clone.push_asymmetrical_force(
                 self._review_branch.remote_branch,
-                phlgitu_ref.make_local(new_branch),
-                self._tracking_branch.remote)
+                phlgitu_ref.make_local(new_branch))
         else:
-            phlgit_push.move_asymmetrical(
-                self._clone,
+            self._clone.push_move_asymmetrical(
                 self._review_branch.remote_branch,
                 phlgitu_ref.make_local(old_branch),
-                phlgitu_ref.make_local(new_branch),
-                self._clone.get_remote())
+                phlgitu_ref.make_local(new_branch))
 
         self._tracking_hash = self._review_hash
 
@@ -598,11 +647,9 @@ class Branch(object):
         tracking_branch = self._review_branch.make_tracker(
             status, revision_id)
 
-        phlgit_push.push_asymmetrical_force(
-            self._clone,
+        self._clone.push_asymmetrical_force(
             self._review_branch.remote_branch,
-            phlgitu_ref.make_local(tracking_branch.branch),
-            tracking_branch.remote)
+            phlgitu_ref.make_local(tracking_branch.branch))
 
         self._tracking_branch = tracking_branch
         self._tracking_hash = self._review_hash
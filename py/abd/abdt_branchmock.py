@@ -309,6 +309,9 @@ class BranchMock(object):
         If the diff would exceed the pre-specified max diff size then take
         measures to reduce the diff.
 
+        If the same diff was made before and is still in the diff cache then
+        re-use that instead.
+
         """
         return abdt_differ.DiffResult(
             self._data.raw_diff,
@@ -8,6 +8,11 @@
 #   Conduit
 #    .describe
 #    .refresh_cache_on_cycle
+#    .watch_reviews
+#    .prefetch_reviews
+#    .pop_changed_reviews
+#    .save_cache
+#    .load_cache
 #    .create_comment
 #    .create_empty_revision_as_user
 #    .get_commit_message
@@ -55,6 +60,7 @@ class Conduit(object):
         super(Conduit, self).__init__()
         self._conduit = conduit
         self._reviewstate_cache = reviewstate_cache
+        self._phid_username_cache = phlcon_user.PhidUsernameCache(conduit)
 
     def describe(self):
         """Return a string description of this conduit for a human to read.
@@ -74,13 +80,78 @@ class Conduit(object):
 
         Note that this should be called once per 'cycle' of git
         repositories to avoid degredation of performance.  This is
-        necessary because revisions that were not accessed since the
-        last refresh are evicted and will not benefit from the batching
-        of revision queries.
+        necessary because revisions that were not accessed recently are
+        evicted and will not benefit from the batching of revision
+        queries.
 
         """
         self._reviewstate_cache.refresh_active_reviews()
 
+        # usernames may change, so start afresh each cycle and fetch all the
+        # authors we're likely to need in one go when the first is needed
+        phid_username_cache = phlcon_user.PhidUsernameCache(self._conduit)
+        phid_username_cache.add_hint_list(
+            self._reviewstate_cache.get_known_author_phids())
+        self._phid_username_cache = phid_username_cache
+
+    def watch_reviews(self, revisionids):
+        """Make sure that the supplied revisions are refreshed on next cycle.
+
+        This is useful for detecting changes to revisions which will not
+        otherwise be accessed before the next refresh.
+
+        :revisionids: a list of ids of Differential revisions to watch
+        :returns: None
+
+        """
+        self._reviewstate_cache.watch_reviews(revisionids)
+
+    def prefetch_reviews(self, revisionids):
+        """Fetch the state of the supplied revisions in bulk.
+
+        This is useful for avoiding querying revisions one at a time when
+        they are later accessed individually.
+
+        :revisionids: a list of ids of Differential revisions to prefetch
+        :returns: None
+
+        """
+        self._reviewstate_cache.prefetch_reviews(revisionids)
+
+    def pop_changed_reviews(self, revisionids):
+        """Return the set of supplied revisions which changed on refresh.
+
+        Revisions are only considered to have changed if their state was known
+        before the refresh.  Revisions that are returned are forgotten, they
+        will not be returned again until they change on a later refresh.
+
+        :revisionids: a list of ids of Differential revisions to check
+        :returns: a set of ids of the Differential revisions that changed
+
+        """
+        return self._reviewstate_cache.pop_changed_reviews(revisionids)
+
+    def save_cache(self, f):
+        """Save the stored state of revisions to the supplied file pointer.
+
+        :f: a text file pointer to save to
+        :returns: None
+
+        """
+        self._reviewstate_cache.dump(f)
+
+    def load_cache(self, f):
+        """Load the state of revisions from the supplied file pointer.
+
+        The loaded state will be brought up to date with any changes to
+        revisions since it was saved.
+
+        :f: a text file pointer to load from, as written by 'save_cache'
+        :returns: None
+
+        """
+        self._reviewstate_cache.load(f)
+
     def create_comment(self, revision, message, silent=False):
         """Make a comment on the specified 'revision'.
 
@@ -149,7 +220,8 @@ class Conduit(object):
         :returns: a (username, phid) tuple
 
         """
-        user = phlcon_user.query_user_from_email(self._conduit, email)
+        user = phlcon_user.query_cached_user_list_from_emails(
+            self._conduit, [email])[0]
         result = None
         if user:
             result = (user.userName, user.phid)
@@ -178,11 +250,8 @@ class Conduit(object):
         return phlcon_differential.parse_commit_message(self._conduit, message)
 
     def _get_author_user(self, revisionid):
-        # TODO: these queries are very expensive, cache them
-        revision = phlcon_differential.query(self._conduit, [revisionid])[0]
-        author_user = phlcon_user.query_usernames_from_phids(
-            self._conduit, [revision.authorPHID])[0]
-        return author_user
+        author_phid = self._reviewstate_cache.get_author_phid(revisionid)
+        return self._phid_username_cache.get_username(author_phid)
 
     def is_review_accepted(self, revisionid):
         """Return True if the supplied 'revisionid' is in 'accepted' status.
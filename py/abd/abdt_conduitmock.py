@@ -18,8 +18,13 @@
 #    .revisions
 #   ConduitMock
 #    .describe
+#    .save_cache
+#    .load_cache
 #    .create_comment
 #    .refresh_cache_on_cycle
+#    .watch_reviews
+#    .prefetch_reviews
+#    .pop_changed_reviews
 #    .create_empty_revision_as_user
 #    .get_commit_message
 #    .create_revision_as_user
@@ -205,6 +210,27 @@ class ConduitMock(object):
         """
         return 'abdt_conduitmock.ConduitMock'
 
+    def save_cache(self, f):
+        """Save the stored state of revisions to the supplied file pointer.
+
+        :f: a text file pointer to save to
+        :returns: None
+
+        """
+        _ = f  # NOQA
+
+    def load_cache(self, f):
+        """Load the state of revisions from the supplied file pointer.
+
+        The loaded state will be brought up to date with any changes to
+        revisions since it was saved.
+
+        :f: a text file pointer to load from, as written by 'save_cache'
+        :returns: None
+
+        """
+        _ = f  # NOQA
+
     def create_comment(self, revision, message, silent=False):
         """Make a comment on the specified 'revision'.
 
@@ -226,13 +252,51 @@ class ConduitMock(object):
 
         Note that this should be called once per 'cycle' of git
         repositories to avoid degredation of performance.  This is
-        necessary because revisions that were not accessed since the
-        last refresh are evicted and will not benefit from the batching
-        of revision queries.
+        necessary because revisions that were not accessed recently are
+        evicted and will not benefit from the batching of revision
+        queries.
 
         """
         pass
 
+    def watch_reviews(self, revisionids):
+        """Make sure that the supplied revisions are refreshed on next cycle.
+
+        This is useful for detecting changes to revisions which will not
+        otherwise be accessed before the next refresh.
+
+        :revisionids: a list of ids of Differential revisions to watch
+        :returns: None
+
+        """
+        _ = revisionids  # NOQA
+
+    def prefetch_reviews(self, revisionids):
+        """Fetch the state of the supplied revisions in bulk.
+
+        This is useful for avoiding querying revisions one at a time when
+        they are later accessed individually.
+
+        :revisionids: a list of ids of Differential revisions to prefetch
+        :returns: None
+
+        """
+        _ = revisionids  # NOQA
+
+    def pop_changed_reviews(self, revisionids):
+        """Return the set of supplied revisions which changed on refresh.
+
+        Revisions are only considered to have changed if their state was known
+        before the refresh.  Revisions that are returned are forgotten, they
+        will not be returned again until they change on a later refresh.
+
+        :revisionids: a list of ids of Differential revisions to check
+        :returns: a set of ids of the Differential revisions that changed
+
+        """
+        _ = revisionids  # NOQA
+        return set()
+
     def create_empty_revision_as_user(self, username):
         """Return the id of a newly created empty revision as 'username'.
 
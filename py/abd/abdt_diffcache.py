@@ -0,0 +1,203 @@
+"""Cache the results of abdt_differ on disk, keyed by the commits diffed."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# abdt_diffcache
+#
+# Public Classes:
+#   DiffCache
+#    .get
+#    .put
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import collections
+import cPickle
+import hashlib
+import os
+import threading
+
+import phlsys_fs
+
+import abdt_differ
+import abdt_errident
+import abdt_logging
+
+# change this if the way diffs are made changes, so that old entries are not
+# re-used
+_FORMAT_VERSION = 1
+
+_ENTRY_SUFFIX = '.diffresult'
+
+_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class DiffCache(object):
+
+    def __init__(self, cache_dir, max_bytes=_DEFAULT_MAX_BYTES):
+        """Construct a cache which stores entries as files in 'cache_dir'.
+
+        The least recently used entries are removed when the total size of
+        the entries would exceed 'max_bytes'.  Entries are only read from
+        disk when needed, so the cache may be shared by many repos.
+
+        A single instance may be used from many threads at once.
+
+        :cache_dir: the string path of the directory to store entries in
+        :max_bytes: the maximum integer size of all the entries together
+
+        """
+        super(DiffCache, self).__init__()
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # the size of each entry by name, least recently used first
+        self._entry_sizes = None
+        self._total_bytes = 0
+
+    def get(self, merge_base_hash, review_hash, max_diff_size_utf8_bytes):
+        """Return the abdt_differ.DiffResult for the supplied key, or None.
+
+        :merge_base_hash: the string hash of the merge-base of the diff
+        :review_hash: the string hash of the commit under review
+        :max_diff_size_utf8_bytes: the size limit the diff was made with
+        :returns: an abdt_differ.DiffResult or None
+
+        """
+        name = _make_entry_name(
+            merge_base_hash, review_hash, max_diff_size_utf8_bytes)
+        path = os.path.join(self._cache_dir, name)
+
+        with self._lock:
+            self._ensure_loaded()
+            if name not in self._entry_sizes:
+                return None
+            self._entry_sizes[name] = self._entry_sizes.pop(name)
+
+            try:
+                with open(path, 'rb') as f:
+                    diff_result = abdt_differ.DiffResult._make(
+                        cPickle.load(f))
+
+                # remember that this was recently used if we are restarted
+                os.utime(path, None)
+            except Exception as e:
+                abdt_logging.on_system_exception(
+                    abdt_errident.READ_DIFF_CACHE, path, e)
+                self._remove(name)
+                return None
+
+        return diff_result
+
+    def put(
+            self, merge_base_hash, review_hash, max_diff_size_utf8_bytes,
+            result):
+        """Store the abdt_differ.DiffResult 'result' for the supplied key.
+
+        :merge_base_hash: the string hash of the merge-base of the diff
+        :review_hash: the string hash of the commit under review
+        :max_diff_size_utf8_bytes: the size limit the diff was made with
+        :result: the abdt_differ.DiffResult to store
+        :returns: None
+
+        """
+        name = _make_entry_name(
+            merge_base_hash, review_hash, max_diff_size_utf8_bytes)
+        path = os.path.join(self._cache_dir, name)
+
+        # the namedtuple can't be pickled directly, as it's named differently
+        # to the module attribute
+        content = cPickle.dumps(tuple(result), cPickle.HIGHEST_PROTOCOL)
+
+        if len(content) > self._max_bytes:
+            return
+
+        with self._lock:
+            self._ensure_loaded()
+            if name in self._entry_sizes:
+                self._remove(name)
+
+            try:
+                # write to a temporary file first, so that readers never see
+                # a partially written entry
+                temp_path = path + '.tmp'
+                with open(temp_path, 'wb') as f:
+                    f.write(content)
+                os.rename(temp_path, path)
+            except EnvironmentError as e:
+                abdt_logging.on_system_exception(
+                    abdt_errident.WRITE_DIFF_CACHE, path, e)
+                return
+
+            self._entry_sizes[name] = len(content)
+            self._total_bytes += len(content)
+
+            while self._total_bytes > self._max_bytes:
+                oldest = next(iter(self._entry_sizes))
+                self._remove(oldest)
+
+    def _ensure_loaded(self):
+        if self._entry_sizes is not None:
+            return
+
+        phlsys_fs.ensure_dir(self._cache_dir)
+
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            path = os.path.join(self._cache_dir, name)
+            if name.endswith(_ENTRY_SUFFIX):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name, stat.st_size))
+            elif name.endswith(_ENTRY_SUFFIX + '.tmp'):
+                # left over from an interrupted write
+                os.remove(path)
+
+        entries.sort()
+        self._entry_sizes = collections.OrderedDict(
+            (name, size) for _, name, size in entries)
+        self._total_bytes = sum(self._entry_sizes.itervalues())
+
+    def _remove(self, name):
+        self._total_bytes -= self._entry_sizes.pop(name)
+        try:
+            os.remove(os.path.join(self._cache_dir, name))
+        except EnvironmentError:
+            # it doesn't matter if it's already gone
+            pass
+
+
+def _make_entry_name(merge_base_hash, review_hash, max_diff_size_utf8_bytes):
+    key = '{} {} {} {}'.format(
+        _FORMAT_VERSION,
+        merge_base_hash,
+        review_hash,
+        max_diff_size_utf8_bytes)
+    return hashlib.sha1(key).hexdigest() + _ENTRY_SUFFIX
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
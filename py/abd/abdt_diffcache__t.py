@@ -0,0 +1,131 @@
+"""Test suite for abdt_diffcache."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] can retrieve a stored diff result with the same key
+# [ A] other keys are not found
+# [ B] the least recently used entries are removed to stay within budget
+# [ C] stored entries can be retrieved by a new cache using the same dir
+# [ D] corrupt entries are treated as not found
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+# [ B] test_B_EvictLeastRecentlyUsed
+# [ C] test_C_Persist
+# [ D] test_D_CorruptEntry
+#==============================================================================
+
+from __future__ import absolute_import
+
+import os
+import unittest
+
+import phlsys_fs
+
+import abdt_diffcache
+import abdt_differ
+
+
+def _make_diff_result(diff):
+    return abdt_differ.DiffResult(
+        diff=diff,
+        reduction_list=[abdt_differ.RemoveContextReduction(len(diff))],
+        did_replace_unicode=False,
+        diff_size_utf8_bytes=len(diff),
+        full_diff_size_utf8_bytes=len(diff),
+        max_diff_size_utf8_bytes=1000)
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_A_Breathing(self):
+        with phlsys_fs.tmpdir_context() as tmpdir:
+            cache = abdt_diffcache.DiffCache(tmpdir)
+            result = _make_diff_result(u"diff")
+            self.assertIsNone(cache.get('base', 'review', 1000))
+            cache.put('base', 'review', 1000, result)
+
+            cached = cache.get('base', 'review', 1000)
+            self.assertEqual(cached.diff, result.diff)
+            self.assertEqual(
+                cached.reduction_list[0].diff_size_utf8_bytes,
+                result.reduction_list[0].diff_size_utf8_bytes)
+
+            self.assertIsNone(cache.get('base', 'review', 2000))
+            self.assertIsNone(cache.get('base2', 'review', 1000))
+            self.assertIsNone(cache.get('base', 'review2', 1000))
+
+    def test_B_EvictLeastRecentlyUsed(self):
+        with phlsys_fs.tmpdir_context() as tmpdir:
+            big_diff = u"x" * 1000
+            cache = abdt_diffcache.DiffCache(tmpdir, max_bytes=2500)
+            cache.put('base', 'review1', 1000, _make_diff_result(big_diff))
+            cache.put('base', 'review2', 1000, _make_diff_result(big_diff))
+
+            # use 'review1' so that 'review2' is the least recently used
+            self.assertIsNotNone(cache.get('base', 'review1', 1000))
+            cache.put('base', 'review3', 1000, _make_diff_result(big_diff))
+
+            self.assertIsNotNone(cache.get('base', 'review1', 1000))
+            self.assertIsNone(cache.get('base', 'review2', 1000))
+            self.assertIsNotNone(cache.get('base', 'review3', 1000))
+            self.assertEqual(len(os.listdir(tmpdir)), 2)
+
+            # entries larger than the whole budget are not stored
+            cache.put(
+                'base', 'review4', 1000, _make_diff_result(big_diff * 3))
+            self.assertIsNone(cache.get('base', 'review4', 1000))
+            self.assertIsNotNone(cache.get('base', 'review3', 1000))
+
+    def test_C_Persist(self):
+        with phlsys_fs.tmpdir_context() as tmpdir:
+            cache = abdt_diffcache.DiffCache(tmpdir)
+            cache.put('base', 'review', 1000, _make_diff_result(u"diff"))
+
+            cache = abdt_diffcache.DiffCache(tmpdir)
+            self.assertEqual(cache.get('base', 'review', 1000).diff, u"diff")
+
+    def test_D_CorruptEntry(self):
+        with phlsys_fs.tmpdir_context() as tmpdir:
+            cache = abdt_diffcache.DiffCache(tmpdir)
+            cache.put('base', 'review', 1000, _make_diff_result(u"diff"))
+            for name in os.listdir(tmpdir):
+                with open(os.path.join(tmpdir, name), 'w') as f:
+                    f.write('corrupt')
+
+            cache = abdt_diffcache.DiffCache(tmpdir)
+            self.assertIsNone(cache.get('base', 'review', 1000))
+            self.assertEqual(os.listdir(tmpdir), [])
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
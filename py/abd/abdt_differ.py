@@ -12,6 +12,11 @@
 #    .context_lines
 #   RemoveContextReduction
 #   DiffStatReduction
+#   FileLessContextReduction
+#    .context_lines
+#    .file_names
+#   FileStubReduction
+#    .file_names
 #
 # Public Functions:
 #   make_raw_diff
@@ -28,6 +33,7 @@ from __future__ import absolute_import
 import collections
 
 import phlgit_diff
+import phlgitu_diff
 
 import abdt_exception
 
@@ -35,6 +41,10 @@ _FULL_DIFF_CONTEXT_LINES = 100000
 _GOOD_DIFF_CONTEXT_LINES = 1000
 _SOME_DIFF_CONTEXT_LINES = 100
 
+# 'removing' context leaves as much as 'git diff' gives by default, which is
+# what we'd get without specifying '--unified'
+_NO_DIFF_CONTEXT_LINES = 3
+
 DiffResult = collections.namedtuple(
     'abdt_differ__DiffResult',
     [
@@ -113,11 +123,131 @@ class DiffStatReduction(ReductionTechnique):
         ReductionTechnique.__init__(self, diff_size_utf8_bytes)
 
 
+class FileLessContextReduction(ReductionTechnique):
+
+    """Represent an attempt to reduce diff size by reducing context in the
+    largest files only."""
+
+    def __init__(self, diff_size_utf8_bytes, context_lines, file_names):
+        """Initialize.
+
+        :diff_size_utf8_bytes: the size of the diff after attempting to reduce
+        :context_lines: the number of lines of context
+        :file_names: the list of string names of the files that were reduced
+
+        """
+        ReductionTechnique.__init__(self, diff_size_utf8_bytes)
+        self._context_lines = context_lines
+        self._file_names = file_names
+
+    @property
+    def context_lines(self):
+        return self._context_lines
+
+    @property
+    def file_names(self):
+        return self._file_names
+
+
+class FileStubReduction(ReductionTechnique):
+
+    """Represent an attempt to reduce diff size by replacing the changes to
+    the largest files with stubs, as if they were binary."""
+
+    def __init__(self, diff_size_utf8_bytes, file_names):
+        """Initialize.
+
+        :diff_size_utf8_bytes: the size of the diff after attempting to reduce
+        :file_names: the list of string names of the files that were reduced
+
+        """
+        ReductionTechnique.__init__(self, diff_size_utf8_bytes)
+        self._file_names = file_names
+
+    @property
+    def file_names(self):
+        return self._file_names
+
+
+class _FileDiffSelection(object):
+
+    """Keep track of which version of each file diff to use."""
+
+    def __init__(self, file_diffs):
+        super(_FileDiffSelection, self).__init__()
+        self._file_diffs = file_diffs
+
+        # the (file_diff, context_lines) to use for each file
+        self._versions = [(f, None) for f in file_diffs]
+
+        self._sizes = [f.size() for f in file_diffs]
+        self._size = sum(self._sizes)
+
+    @property
+    def size(self):
+        return self._size
+
+    def reduce_context(self, context_lines, max_size):
+        """Reduce the context of the largest files until within 'max_size'.
+
+        :context_lines: the integer lines of context to reduce to
+        :max_size: the integer size to stop at
+        :returns: a list of the string names of the files that were reduced
+
+        """
+        return self._reduce_largest(
+            max_size, lambda index: (self._file_diffs[index], context_lines))
+
+    def stub(self, max_size):
+        """Replace the largest files with stubs until within 'max_size'.
+
+        :max_size: the integer size to stop at
+        :returns: a list of the string names of the files that were reduced
+
+        """
+        def make_version(index):
+            file_diff = self._file_diffs[index]
+            if not file_diff.hunks:
+                return file_diff, None
+            return file_diff.make_binary_stub(), None
+
+        return self._reduce_largest(max_size, make_version)
+
+    def format(self):
+        return ''.join(f.format(c) for f, c in self._versions)
+
+    def _reduce_largest(self, max_size, make_version):
+        largest_first = sorted(
+            xrange(len(self._file_diffs)),
+            key=lambda index: self._sizes[index],
+            reverse=True)
+
+        names = []
+        for index in largest_first:
+            if self._size <= max_size:
+                break
+            file_diff, context_lines = make_version(index)
+            size = file_diff.size(context_lines)
+            if size < self._sizes[index]:
+                self._size += size - self._sizes[index]
+                self._sizes[index] = size
+                self._versions[index] = (file_diff, context_lines)
+                names.append(self._file_diffs[index].name)
+
+        return names
+
+
 def make_raw_diff(clone, base, branch, max_diff_size_utf8_bytes):
     """Return a string raw diff of the changes on 'branch'.
 
     If the diff would exceed the _MAX_DIFF_SIZE then take measures
-    to reduce the diff size by reducing the amount of context.
+    to reduce the diff size by reducing the amount of context, starting with
+    the largest files.  If that's not enough then replace the largest files
+    with stubs, and failing that reduce the diff to a diffstat.
+
+    Git is only asked for the diff once, with full context; any reductions
+    are made in memory from that.  The diff respects the '.gitattributes' on
+    'branch' without checking it out.
 
     Raise 'NoDiffError' if the diff could not be fit into
     'max_bytes'.
@@ -129,61 +259,73 @@ def make_raw_diff(clone, base, branch, max_diff_size_utf8_bytes):
     :returns: the string diff of the changes on the branch
 
     """
-    raw_diff = phlgit_diff.raw_diff_range(
+    raw_diff = phlgit_diff.raw_diff_range_without_checkout(
         clone, base, branch, _FULL_DIFF_CONTEXT_LINES)
-    new_raw_diff = unicode(raw_diff, errors='replace')
-    full_diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
-    diff_size_utf8_bytes = full_diff_size_utf8_bytes
 
     if not raw_diff:
         raise NoDiffError()
 
+    new_raw_diff = unicode(raw_diff, errors='replace')
+
+    # work with the utf8 from here on, so that sizes are simply lengths
+    utf8_diff = new_raw_diff.encode("utf-8")
+    did_replace_unicode = utf8_diff != raw_diff
+    full_diff_size_utf8_bytes = len(utf8_diff)
+    diff_size_utf8_bytes = full_diff_size_utf8_bytes
+
     reduction_list = []
 
-    # TODO: detect generated files and try less context on just those first
-    # TODO: detect generated files and try no context on just those first
-    # TODO: detect generated files and try excluding those first
-
-    # if the diff is too big then regen with less context
-    for context_lines in [_GOOD_DIFF_CONTEXT_LINES, _SOME_DIFF_CONTEXT_LINES]:
-        if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
-            raw_diff = phlgit_diff.raw_diff_range(
-                clone, base, branch, context_lines)
-            new_raw_diff = unicode(raw_diff, errors='replace')
-            diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
+    if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
+        file_diffs = phlgitu_diff.parse(utf8_diff)
+        selection = _FileDiffSelection(file_diffs)
+        reduced_diff = None
+
+        # if the diff is too big then try with less context, on the largest
+        # files first; often a few generated files are responsible
+        for context_lines in [
+                _GOOD_DIFF_CONTEXT_LINES,
+                _SOME_DIFF_CONTEXT_LINES,
+                _NO_DIFF_CONTEXT_LINES]:
+            file_names = selection.reduce_context(
+                context_lines, max_diff_size_utf8_bytes)
+            if file_names:
+                reduction_list.append(
+                    _make_context_reduction(
+                        file_diffs, selection, context_lines, file_names))
+
+        # if the diff is still too big then stub out the largest files
+        if selection.size > max_diff_size_utf8_bytes:
+            file_names = selection.stub(max_diff_size_utf8_bytes)
+            if file_names:
+                reduction_list.append(
+                    FileStubReduction(selection.size, file_names))
+
+        diff_size_utf8_bytes = selection.size
+        if diff_size_utf8_bytes <= max_diff_size_utf8_bytes:
+            reduced_diff = selection.format()
+
+        # if the diff is still too big then just use the diff stat with message
+        if reduced_diff is None:
+            stat = phlgitu_diff.make_stat(file_diffs)
+            content = (
+                "this diff is very large, it has been reduced to a summary:")
+            content = '\n\n'.join([content, stat])
+            reduced_diff = phlgit_diff.create_add_file('diffstat', content)
+            diff_size_utf8_bytes = len(reduced_diff)
             reduction_list.append(
-                LessContextReduction(
-                    diff_size_utf8_bytes,
-                    context_lines))
+                DiffStatReduction(
+                    diff_size_utf8_bytes))
 
-    # if the diff is still too big then regen with no context
-    if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
-        raw_diff = phlgit_diff.raw_diff_range(clone, base, branch, None)
-        new_raw_diff = unicode(raw_diff, errors='replace')
-        diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
-        reduction_list.append(
-            RemoveContextReduction(
-                diff_size_utf8_bytes))
-
-    # if the diff is still too big then just use the diff stat with message
-    if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
-        stat = phlgit_diff.stat_range(clone, base, branch)
-        content = "this diff is very large, it has been reduced to a summary:"
-        content = '\n\n'.join([content, stat])
-        raw_diff = phlgit_diff.create_add_file('diffstat', content)
-        new_raw_diff = unicode(raw_diff, errors='replace')
-        diff_size_utf8_bytes = len(new_raw_diff.encode("utf-8"))
-        reduction_list.append(
-            DiffStatReduction(
-                diff_size_utf8_bytes))
+        new_raw_diff = unicode(reduced_diff, "utf-8")
+
+        # the replaced characters may have been reduced away
+        did_replace_unicode = did_replace_unicode and u'\ufffd' in new_raw_diff
 
     # if the diff is still too big then error
     if diff_size_utf8_bytes > max_diff_size_utf8_bytes:
         raise abdt_exception.LargeDiffException(
             "diff too big", diff_size_utf8_bytes, max_diff_size_utf8_bytes)
 
-    did_replace_unicode = new_raw_diff != raw_diff
-
     return DiffResult(
         new_raw_diff,
         reduction_list,
@@ -193,6 +335,18 @@ def make_raw_diff(clone, base, branch, max_diff_size_utf8_bytes):
         max_diff_size_utf8_bytes)
 
 
+def _make_context_reduction(
+        file_diffs, selection, context_lines, file_names):
+    # if the context was reduced for all the files that it would make a
+    # difference to, then describe it as reducing the context of the diff
+    if selection.size == phlgitu_diff.size(file_diffs, context_lines):
+        if context_lines == _NO_DIFF_CONTEXT_LINES:
+            return RemoveContextReduction(selection.size)
+        return LessContextReduction(selection.size, context_lines)
+
+    return FileLessContextReduction(selection.size, context_lines, file_names)
+
+
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
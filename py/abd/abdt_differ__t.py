@@ -9,7 +9,10 @@
 # [ A] a diff within the limits passes straight through
 # [ B] a diff outside the limits can be reduced ok with less context
 # [ B] a diff still outside the limits can be reduced ok with no context
-# [ C] a diff still outside the limits can be reduced to the diffstat
+# [ C] a diff still outside the limits can have the largest files stubbed
+# [ D] a diff still outside the limits can be reduced to the diffstat
+# [ B] the reported size of a reduced diff is correct
+# [ E] context is reduced only for the largest files if that's enough
 # [ A] raise if a diff cannot be reduced to the limits
 # [  ] bad unicode chars are replaced
 #------------------------------------------------------------------------------
@@ -17,6 +20,8 @@
 # [ A] test_A_Breathing
 # [ B] test_B_ReduceSmallChangeOnLargeFile
 # [ C] test_C_ReduceAddMassiveFile
+# [ D] test_D_ReduceAddManyFiles
+# [ E] test_E_ReduceOnlyLargeFile
 #==============================================================================
 
 from __future__ import absolute_import
@@ -101,6 +106,11 @@ class Test(unittest.TestCase):
                 no_context_diff_size,
                 reduced_context_diff_size)
 
+            # [ B] the reported size of a reduced diff is correct
+            self.assertEqual(
+                diff_result.diff_size_utf8_bytes,
+                len(diff_result.diff.encode("utf-8")))
+
     def test_C_ReduceAddMassiveFile(self):
         with phlgitu_fixture.lone_worker_context() as worker:
 
@@ -118,10 +128,44 @@ class Test(unittest.TestCase):
             self.assertIn("lorem ipsum", diff_result.diff)
             original_diff_size = len(diff_result.diff)
 
-            # [ C] a diff still outside the limits can be reduced
-            #      to the diffstat
+            # [ C] a diff still outside the limits can have the largest
+            #      files stubbed
             diff_result = make_diff(500)
             self.assertNotIn("lorem ipsum", diff_result.diff)
+            self.assertIn("large_file", diff_result.diff)
+            stubbed_diff_size = len(diff_result.diff)
+            self.assertTrue(
+                any(
+                    isinstance(r, abdt_differ.FileStubReduction)
+                    for r in diff_result.reduction_list))
+            self.assertLess(
+                stubbed_diff_size,
+                original_diff_size)
+
+    def test_D_ReduceAddManyFiles(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+
+            # stubs mention the name of each file a few times, whereas the
+            # diffstat only mentions it once
+            worker.repo.call("checkout", "-b", "diff_branch")
+            for i in xrange(20):
+                name = "file_with_a_long_name_to_make_stubs_large_{}".format(i)
+                worker.add_new_file(name, "lorem ipsum\n" * 100)
+            worker.repo.call("commit", "-m", "add many files")
+
+            def make_diff(max_bytes):
+                return abdt_differ.make_raw_diff(
+                    worker.repo, "master", "diff_branch", max_bytes)
+
+            # establish a baseline size for the diff
+            diff_result = make_diff(100000)
+            self.assertIn("lorem ipsum", diff_result.diff)
+            original_diff_size = len(diff_result.diff)
+
+            # [ D] a diff still outside the limits can be reduced
+            #      to the diffstat
+            diff_result = make_diff(3000)
+            self.assertNotIn("lorem ipsum", diff_result.diff)
             diffstat_diff_size = len(diff_result.diff)
             self.assertTrue(
                 any(
@@ -131,6 +175,42 @@ class Test(unittest.TestCase):
                 diffstat_diff_size,
                 original_diff_size)
 
+    def test_E_ReduceOnlyLargeFile(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+
+            # make a large file and a smaller file to base our changes on
+            worker.commit_new_file(
+                "add large_file", "large_file", "lorem ipsum\n" * 1000)
+            worker.commit_new_file(
+                "add small_file", "small_file", "dolor sit amet\n" * 300)
+
+            worker.repo.call("checkout", "-b", "diff_branch")
+            worker.add_append_to_file("large_file", "test content")
+            worker.add_append_to_file("small_file", "more content")
+            worker.repo.call("commit", "-m", "change both files")
+
+            def make_diff(max_bytes):
+                return abdt_differ.make_raw_diff(
+                    worker.repo, "master", "diff_branch", max_bytes)
+
+            # [ E] context is reduced only for the largest files if that's
+            #      enough
+            diff_result = make_diff(7000)
+            self.assertIn("test content", diff_result.diff)
+            self.assertEqual(
+                diff_result.diff.count("dolor sit amet"), 300)
+            self.assertLess(
+                diff_result.diff.count("lorem ipsum"), 1000)
+            reductions = [
+                r for r in diff_result.reduction_list
+                if isinstance(r, abdt_differ.FileLessContextReduction)
+            ]
+            self.assertEqual(len(reductions), 1)
+            self.assertListEqual(reductions[0].file_names, ["large_file"])
+            self.assertEqual(
+                diff_result.diff_size_utf8_bytes,
+                len(diff_result.diff.encode("utf-8")))
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -13,8 +13,10 @@ kinds of error identifiers to expect.
 # Public Assignments:
 #   CONDUIT_REFRESH
 #   GIT_SNOOP
+#   PREFETCH
 #   FETCH_PRUNE
 #   CONDUIT_CONNECT
+#   LOAD_REVIEWSTATE_CACHE
 #   PUSH_DELETE_REVIEW
 #   PUSH_DELETE_TRACKING
 #   MARK_BAD_LAND
@@ -27,6 +29,10 @@ kinds of error identifiers to expect.
 #   PUSH_DELETE_LANDED
 #   PUSH_LANDING_ARCHIVE
 #   PUSH_ABANDONED_ARCHIVE
+#   PUSH_BATCH
+#   PUSH_BATCHED_REFSPEC
+#   READ_DIFF_CACHE
+#   WRITE_DIFF_CACHE
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -41,10 +47,12 @@ from __future__ import absolute_import
 # abdi_processrepos
 CONDUIT_REFRESH = "conduit-refresh"
 GIT_SNOOP = "git-snoop"
+PREFETCH = "prefetch"
 
 # abdi_processargs
 FETCH_PRUNE = 'fetch-prune'
 CONDUIT_CONNECT = 'conduit-connect'
+LOAD_REVIEWSTATE_CACHE = 'load-reviewstate-cache'
 
 # abdt_branch
 PUSH_DELETE_REVIEW = 'push-delete-review'
@@ -59,6 +67,12 @@ MARK_OK_NEW_REVIEW = 'mark-ok-new-review'
 PUSH_DELETE_LANDED = 'push-delete-landed'
 PUSH_LANDING_ARCHIVE = 'push-landing-archive'
 PUSH_ABANDONED_ARCHIVE = 'push-abandoned-archive'
+PUSH_BATCH = 'push-batch'
+PUSH_BATCHED_REFSPEC = 'push-batched-refspec'
+
+# abdt_diffcache
+READ_DIFF_CACHE = 'read-diff-cache'
+WRITE_DIFF_CACHE = 'write-diff-cache'
 
 
 #------------------------------------------------------------------------------
@@ -77,14 +77,22 @@ _VAR_RUN_README = """
 This is where Arcyd puts it's pidfile.
 """.strip()
 
+_VAR_CACHE_README = """
+This is where Arcyd saves information that it may re-use when restarted, e.g.
+the state of reviews and the diffs of review branches.
+""".strip()
+
 
 class Layout(object):
 
     arcydroot = '.arcydroot'
     root_config = 'config'
     pid = 'var/run/arcyd.pid'
+    io_log = 'var/log/git-phab-writes.log'
 
     dir_run = 'var/run'
+    dir_cache = 'var/cache'
+    dir_diff_cache = 'var/cache/diffs'
 
     @staticmethod
     def phabricator_config(name):
@@ -272,6 +280,7 @@ def initialise_here():
     phlsys_fs.write_text_file('var/status/README', _VAR_STATUS_README)
     phlsys_fs.write_text_file('var/command/README', _VAR_COMMAND_README)
     phlsys_fs.write_text_file('var/run/README', _VAR_RUN_README)
+    phlsys_fs.write_text_file('var/cache/README', _VAR_CACHE_README)
 
     repo.call('add', '.')
     phlsys_fs.write_text_file('.gitignore', 'var\n')
@@ -7,6 +7,8 @@
 # Public Classes:
 #   Repo
 #    .is_identical
+#    .is_ref
+#    .hash_ref_pairs
 #    .get_remote_branches
 #    .checkout_forced_new_branch
 #    .raw_diff_range
@@ -18,10 +20,17 @@
 #    .archive_to_abandoned
 #    .push_abandoned
 #    .push_asymmetrical
+#    .push_asymmetrical_force
+#    .push_move_asymmetrical
 #    .push
 #    .push_delete
+#    .batched_push_context
+#    .unbatched_push_context
 #    .fetch_prune
+#    .fetch_prune_moved
 #    .call
+#    .read_object
+#    .get_object_info
 #    .get_remote
 #    .working_dir
 #
@@ -39,21 +48,30 @@
 # =============================================================================
 from __future__ import absolute_import
 
+import collections
+import contextlib
+
 import phlgit_branch
 import phlgit_checkout
 import phlgit_commit
 import phlgit_diff
 import phlgit_fetch
 import phlgit_log
+import phlgit_lsremote
 import phlgit_merge
 import phlgit_push
-import phlgit_showref
+import phlgit_revparse
+import phlgit_version
 import phlgitu_ref
+import phlgitu_refcache
+import phlsys_subprocess
 
 import abdt_branch
+import abdt_errident
 import abdt_lander
 import abdt_logging
 import abdt_naming
+import abdt_tryloop
 
 _LANDED_ARCHIVE_BRANCH_MESSAGE = """
 Create an archive branch for landed branches
@@ -98,6 +116,19 @@ ARCYD_ABANDONED_REF = "refs/arcyd/abandoned"
 _ARCYD_ABANDONED_BRANCH = "__private_arcyd/abandoned"
 ARCYD_ABANDONED_BRANCH_FQ = "refs/heads/" + _ARCYD_ABANDONED_BRANCH
 
+# the branch to land on if git is too old to land without a checkout
+_ARCYD_LANDING_BRANCH = "__private_arcyd/landing"
+_ARCYD_LANDING_BRANCH_FQ = "refs/heads/" + _ARCYD_LANDING_BRANCH
+
+# fetching more branches than this individually is no cheaper than fetching
+# everything
+_MAX_FETCH_MOVED_BRANCHES = 64
+
+# the git commands which talk to the remote, and how long to let them take
+# before giving up on them
+_REMOTE_COMMANDS = frozenset(['fetch', 'ls-remote', 'push', 'remote'])
+_REMOTE_COMMAND_TIMEOUT_SECS = 30 * 60
+
 
 class Repo(object):
 
@@ -117,6 +148,20 @@ class Repo(object):
         self._description = description
         self._is_landing_archive_enabled = None
 
+        # a snapshot of the refs, so that we don't list them all again every
+        # time we look one up
+        self._refcache = phlgitu_refcache.RefCache(clone)
+
+        # True if git can land without a checkout, or None if not checked yet
+        self._is_squash_without_checkout_supported = None
+
+        # pushes waiting to be made together, see 'batched_push_context'
+        self._push_queue = None
+
+        # the hashes that the remote-tracking refs updated by the queued
+        # pushes had before the batch, or None if they didn't exist
+        self._tracking_ref_to_old_hash = None
+
     def is_identical(self, branch1, branch2):
         """Return True if the branches point to the same commit.
 
@@ -127,15 +172,25 @@ class Repo(object):
         """
         return phlgit_branch.is_identical(self, branch1, branch2)
 
-    def _is_ref(self, ref):
+    def is_ref(self, ref):
         """Return True if the specified ref exists, otherwise False.
 
         :ref: the string name of the ref to look up
         :return: True if the specified ref exists, otherwise False
 
         """
-        ref_names = phlgit_showref.names(self)
-        return ref in ref_names
+        return self._refcache.is_ref(ref)
+
+    def hash_ref_pairs(self):
+        """Return a list of (sha1, name) tuples of the refs in the repo.
+
+        The refs are taken from a snapshot which is refreshed when they change
+        through this object, e.g. by fetching or pushing.
+
+        :returns: a list of (string sha1, string fully qualified ref name)
+
+        """
+        return self._refcache.hash_ref_pairs()
 
     def get_remote_branches(self):
         """Return a list of string names of remote branches.
@@ -143,7 +198,7 @@ class Repo(object):
         :returns: list of string names
 
         """
-        return phlgit_branch.get_remote(self, self._remote)
+        return _get_branch_to_hash(self).keys()
 
     def checkout_forced_new_branch(self, new_name, based_on):
         """Overwrite and checkout 'new_name' as a new branch from 'based_on'.
@@ -197,31 +252,70 @@ class Repo(object):
         """
         return phlgit_log.make_revisions_from_hashes(self, hashes)
 
-    def squash_merge(self, branch, message, author_name, author_email):
-        """Return output from Git performing a squash merge.
+    def squash_merge(self, base, branch, message, author_name, author_email):
+        """Return a new commit squashing 'branch' onto 'base' and a summary.
+
+        No shared branches are updated, it's up to the caller to push the new
+        commit to where it's needed.  The working tree is not touched if git
+        is recent enough, see phlgit_merge.squash_without_checkout, otherwise
+        the squash is done on a private branch in the working tree.
 
-        :branch: string name of branch to merge into HEAD
+        Raise phlgit_merge.MergeException if there are conflicts or if there
+        is nothing to commit.
+
+        :base: string name of the commit to land on
+        :branch: string name of branch to squash onto 'base'
         :message: string message for the merge commit
         :author_name: string name of author for the merge commit
         :author_email: string email of author for the merge commit
-        :returns: string of Git output
+        :returns: tuple of the string hash of the new commit and a string
+                  summary of it for a human to review
 
         """
-        # TODO: test that the author is set correctly
-        return phlgit_merge.squash(
-            self,
-            branch,
-            message,
-            author_name + " <" + author_email + ">")
+        if self._is_squash_without_checkout_supported is None:
+            self._is_squash_without_checkout_supported = (
+                phlgit_version.get() >=
+                phlgit_merge.SQUASH_WITHOUT_CHECKOUT_MIN_GIT_VERSION)
+
+        if self._is_squash_without_checkout_supported:
+            landing_hash = phlgit_merge.squash_without_checkout(
+                self, base, branch, message, author_name, author_email)
+        else:
+            landing_hash = self._squash_merge_with_checkout(
+                base, branch, message, author_name, author_email)
+
+        summary = self.call(
+            "show", "--format=[%h] %s", "--shortstat", "--summary",
+            landing_hash)
+        return landing_hash, summary
+
+    def _squash_merge_with_checkout(
+            self, base, branch, message, author_name, author_email):
+        phlgit_checkout.new_branch_force_based_on(
+            self, _ARCYD_LANDING_BRANCH, base)
+        try:
+            phlgit_merge.squash(
+                self, branch, message, author_name + " <" + author_email + ">")
+        except phlgit_merge.MergeException:
+            self.call("reset", "--hard")  # fix the working copy
+            raise
+        finally:
+            self._refcache.invalidate(_ARCYD_LANDING_BRANCH_FQ)
+        return phlgit_revparse.get_sha1(self, 'HEAD')
 
     def _checkout_archive_ref_branch(
             self, short_branch_name, fq_branch_name, initial_message):
 
-        if self._is_ref(fq_branch_name):
+        if self.is_ref(fq_branch_name):
             phlgit_checkout.branch(self, short_branch_name)
         else:
             phlgit_checkout.orphan_clean(self, short_branch_name)
             phlgit_commit.allow_empty(self, initial_message)
+            self._update_ref_from_head(fq_branch_name)
+
+    def _update_ref_from_head(self, fq_branch_name):
+        self._refcache.set_ref(
+            fq_branch_name, phlgit_revparse.get_sha1(self, 'HEAD'))
 
     def archive_to_landed(
             self, review_hash, review_branch, base_branch, land_hash, message):
@@ -244,6 +338,7 @@ class Repo(object):
             review_branch, base_branch, land_hash, message)
 
         phlgit_merge.ours(self, review_hash, new_message)
+        self._update_ref_from_head(ARCYD_LANDED_BRANCH_FQ)
 
     def push_landed(self):
         """Push the 'landed' archive branch to the remote.
@@ -273,6 +368,7 @@ class Repo(object):
             review_branch, base_branch)
 
         phlgit_merge.ours(self, review_hash, new_message)
+        self._update_ref_from_head(ARCYD_ABANDONED_BRANCH_FQ)
 
     def push_abandoned(self):
         """Push the 'abandoned' archive branch to the remote.
@@ -291,8 +387,33 @@ class Repo(object):
         :returns: None
 
         """
-        phlgit_push.push_asymmetrical(
-            self, local_branch, remote_branch, self._remote)
+        self._push_or_queue(local_branch + ":" + remote_branch)
+
+    def push_asymmetrical_force(self, local_branch, remote_branch):
+        """Force push 'local_branch' as 'remote_branch' to the remote.
+
+        :local_branch: string name of the branch to push
+        :remote_branch: string name of the branch on the remote
+        :returns: None
+
+        """
+        self._push_or_queue("+" + local_branch + ":" + remote_branch)
+
+    def push_move_asymmetrical(self, local_branch, old_remote, new_remote):
+        """Push 'local_branch' as 'new_remote' and delete 'old_remote'.
+
+        :local_branch: string name of the branch to push
+        :old_remote: string name of the branch on the remote to delete
+        :new_remote: string name of the branch on the remote to push to
+        :returns: None
+
+        """
+        if self._push_queue is None:
+            phlgit_push.move_asymmetrical(
+                self, local_branch, old_remote, new_remote, self._remote)
+        else:
+            self._push_or_queue(local_branch + ":" + new_remote)
+            self._push_or_queue(":" + old_remote)
 
     def push(self, branch):
         """Push 'branch' to the remote.
@@ -301,7 +422,7 @@ class Repo(object):
         :returns: None
 
         """
-        phlgit_push.push(self, branch, self._remote)
+        self._push_or_queue(branch + ":" + branch)
 
     def push_delete(self, branch, *args):
         """Delete 'branch' from the remote.
@@ -311,7 +432,159 @@ class Repo(object):
         :returns: None
 
         """
-        phlgit_push.delete(self, self._remote, branch, *args)
+        if self._push_queue is None:
+            phlgit_push.delete(self, self._remote, branch, *args)
+        else:
+            for b in (branch,) + args:
+                self._push_or_queue(":" + b)
+
+    @contextlib.contextmanager
+    def batched_push_context(self):
+        """Queue the pushes made within the context and make them all at once.
+
+        The pushes are made with a single atomic 'git push' when the context
+        exits, rather than one 'git push' each.  If that fails then each of
+        them is tried individually instead, so that one bad push doesn't
+        stop the others.  Pushes that still fail are reported but not
+        escalated, so only batch pushes which may be safely made again later,
+        see 'unbatched_push_context'.
+
+        If a remote branch is pushed more than once then only the last push
+        is made.
+
+        The remote-tracking branches are updated as each push is queued, so
+        that they may be used within the context as if the push had been
+        made, e.g. to land a review after updating its tracking branch.  If
+        the pushes fail then they are put back as they were.
+
+        Note that pushes made with 'call' directly are not queued.
+
+        :returns: None
+
+        """
+        assert self._push_queue is None
+        self._push_queue = collections.OrderedDict()
+        self._tracking_ref_to_old_hash = {}
+        is_ok = False
+        try:
+            yield
+            is_ok = True
+        finally:
+            push_queue = self._push_queue
+            tracking_ref_to_old_hash = self._tracking_ref_to_old_hash
+            self._push_queue = None
+            self._tracking_ref_to_old_hash = None
+            try:
+                self._push_batch(
+                    push_queue.values(), tracking_ref_to_old_hash)
+            except Exception as e:
+                # don't hide the exception that's already on its way out
+                if is_ok:
+                    raise
+                abdt_logging.on_system_exception(
+                    abdt_errident.PUSH_BATCH, self._description, e)
+
+    @contextlib.contextmanager
+    def unbatched_push_context(self):
+        """Make the pushes within the context at once, even within a batch.
+
+        This is useful for pushes that record work which can't be repeated
+        safely, e.g. creating a review, as they are lost if arcyd stops
+        before the batch is pushed.
+
+        :returns: None
+
+        """
+        push_queue = self._push_queue
+        self._push_queue = None
+        try:
+            yield
+        finally:
+            self._push_queue = push_queue
+
+    def _push_or_queue(self, refspec):
+        if self._push_queue is None:
+            self.call('push', self._remote, refspec)
+            return
+
+        src, dst = refspec.lstrip('+').split(':')
+        if not dst.startswith('refs/'):
+            dst = phlgitu_ref.make_local(dst)
+
+        remote_ref = None
+        if dst.startswith('refs/heads/'):
+            remote_ref = phlgitu_ref.make_remote(
+                phlgitu_ref.fq_to_short(dst), self._remote)
+
+        # only the last push to each remote branch needs to be made
+        previous = self._push_queue.pop(dst, None)
+        is_delete = not src
+        if is_delete and previous is not None and remote_ref is not None:
+            # don't try to delete branches that were only going to be
+            # created in this batch, the push would fail
+            if self._tracking_ref_to_old_hash[remote_ref] is None:
+                self._set_tracking_ref(remote_ref, None)
+                return
+
+        self._push_queue[dst] = refspec
+
+        if remote_ref is not None:
+            new_hash = None
+            if not is_delete:
+                new_hash = self._refcache.get_hash_or_none(src)
+                if new_hash is None:
+                    new_hash = phlgit_revparse.get_sha1(self, src)
+            self._set_tracking_ref(remote_ref, new_hash)
+
+    def _set_tracking_ref(self, ref, hash_):
+        # remember what the remote-tracking ref was before the batch, so that
+        # it may be put back if the push fails
+        if ref not in self._tracking_ref_to_old_hash:
+            self._tracking_ref_to_old_hash[ref] = (
+                self._refcache.get_hash_or_none(ref))
+        self._write_ref(ref, hash_)
+
+    def _write_ref(self, ref, hash_):
+        if hash_ is not None:
+            self.call('update-ref', ref, hash_)
+            self._refcache.set_ref(ref, hash_)
+        elif self.is_ref(ref):
+            self.call('update-ref', '-d', ref)
+            self._refcache.remove_ref(ref)
+
+    def _push_batch(self, refspecs, tracking_ref_to_old_hash):
+        if not refspecs:
+            return
+
+        try:
+            phlgit_push.atomic(self, self._remote, *refspecs)
+            return
+        except Exception as e:
+            abdt_logging.on_system_exception(
+                abdt_errident.PUSH_BATCH, self._description, e)
+
+        # none of the pushes were made, so put the remote-tracking refs back
+        # as they were; the pushes that succeed below will update them again
+        for ref, old_hash in tracking_ref_to_old_hash.iteritems():
+            self._write_ref(ref, old_hash)
+
+        # fall back to pushing them one at a time, so that as many as possible
+        # succeed.  the failures have been reported by the tryloop; don't
+        # escalate them, that would fail all the branches in the batch rather
+        # than just the ones that failed to push.  those will be processed
+        # again next time, as their tracking branches won't have moved.
+        for refspec in refspecs:
+
+            def push(refspec=refspec):
+                self.call('push', self._remote, refspec)
+
+            try:
+                abdt_tryloop.tryloop(
+                    push,
+                    abdt_errident.PUSH_BATCHED_REFSPEC,
+                    '{}: {}'.format(self._description, refspec))
+            except Exception:
+                pass
 
     def fetch_prune(self):
         """Fetch from the remote and prune branches.
@@ -321,13 +594,136 @@ class Repo(object):
         """
         phlgit_fetch.prune_safe(self, self._remote)
 
+    def fetch_prune_moved(self):
+        """Fetch and prune only the refs that moved on the remote.
+
+        Listing the refs on the remote is much cheaper than the negotiation
+        that a full fetch does, so compare the listing with the local refs
+        that the configured fetch refspecs map them to and only fetch the
+        ones that differ.  e.g. with the default refspec, the branches on
+        the remote are compared with the remote-tracking branches.
+
+        :returns: True if anything was fetched or pruned, False otherwise
+
+        """
+        refspecs = self._get_fetch_refspecs()
+        if refspecs is None:
+            # we can't tell which refs a fetch would update, so do a full one
+            self.fetch_prune()
+            return True
+
+        remote_pairs = phlgit_lsremote.hash_ref_pairs(
+            self, self._remote, *[src for src, _ in refspecs])
+
+        # map the refs on the remote to the local refs they're fetched to,
+        # the first refspec to match a ref wins, as it would when fetching
+        local_to_remote_hash = {}
+        for hash_, ref in remote_pairs:
+            if ref.endswith('^{}'):
+                # skip the peeled tags, they're not refs in their own right
+                continue
+            for src, dst in refspecs:
+                local_ref = phlgitu_ref.map_by_pattern(ref, src, dst)
+                if local_ref is not None:
+                    local_to_remote_hash.setdefault(local_ref, (ref, hash_))
+                    break
+
+        # the symbolic 'HEAD' of the remote is not pruned by fetching
+        remote_head = phlgitu_ref.make_remote('HEAD', self._remote)
+        local_to_hash = dict(
+            (ref, hash_) for hash_, ref in self.hash_ref_pairs()
+            if ref != remote_head and any(
+                phlgitu_ref.map_by_pattern(ref, dst, src) is not None
+                for src, dst in refspecs))
+
+        moved = sorted(
+            r for r, (_, h) in local_to_remote_hash.iteritems()
+            if local_to_hash.get(r) != h)
+        removed = sorted(
+            r for r in local_to_hash if r not in local_to_remote_hash)
+
+        if not moved and not removed:
+            return False
+
+        if len(moved) > _MAX_FETCH_MOVED_BRANCHES:
+            # when most things have moved it's no cheaper to fetch them
+            # individually, e.g. on the first fetch
+            self.fetch_prune()
+            return True
+
+        # prune first, so that a new branch may take the place of a removed
+        # one, e.g. 'mybranch' may be replaced with 'mybranch/blah'
+        for ref in removed:
+            self.call('update-ref', '-d', ref)
+            self._refcache.remove_ref(ref)
+
+        if moved:
+            self.call('fetch', self._remote, *[
+                '+{}:{}'.format(local_to_remote_hash[r][0], r)
+                for r in moved
+            ])
+
+        return True
+
+    def _get_fetch_refspecs(self):
+        # return the (src, dst) patterns of the fetch refspecs configured for
+        # the remote, or None if there are none or they're unusual
+        try:
+            config = self.call(
+                'config', '--get-all',
+                'remote.{}.fetch'.format(self._remote))
+        except phlsys_subprocess.CalledProcessError:
+            return None
+
+        try:
+            refspecs = [
+                phlgitu_ref.parse_refspec(r) for r in config.splitlines()
+            ]
+        except phlgitu_ref.Error:
+            return None
+
+        return refspecs or None
+
     def call(self, *args, **kwargs):
         if args and args[0] == 'push':
             abdt_logging.on_io_event(
                 'git-push',
                 '{}: {} {}'.format(
                     self._description, ' '.join(args), kwargs))
-        return self._clone.call(*args, **kwargs)
+
+        # don't let an unresponsive remote hold us up indefinitely
+        if args and args[0] in _REMOTE_COMMANDS:
+            kwargs.setdefault('timeout', _REMOTE_COMMAND_TIMEOUT_SECS)
+
+        try:
+            return self._clone.call(*args, **kwargs)
+        finally:
+            # fetching and pushing change the remote refs in ways that aren't
+            # simple to predict, read them again when next needed.  note that
+            # even failed pushes may update some of the remote refs.
+            if args and args[0] == 'fetch':
+                self._refcache.invalidate()
+            elif args and args[0] == 'push':
+                self._refcache.invalidate(
+                    phlgitu_ref.make_remote('', self._remote))
+
+    def read_object(self, name):
+        """Return a phlsys_git.Object for the object referred to by 'name'.
+
+        :name: a string that git can resolve to an object, e.g. a hash
+        :returns: a phlsys_git.Object
+
+        """
+        return self._clone.read_object(name)
+
+    def get_object_info(self, name):
+        """Return a phlsys_git.ObjectInfo for the object referred to by 'name'.
+
+        :name: a string that git can resolve to an object, e.g. a hash
+        :returns: a phlsys_git.ObjectInfo
+
+        """
+        return self._clone.get_object_info(name)
 
     def get_remote(self):
         return self._remote
@@ -340,7 +736,7 @@ class Repo(object):
 def _get_branch_to_hash(git):
 
     remote = git.get_remote()
-    hash_ref_list = phlgit_showref.hash_ref_pairs(git)
+    hash_ref_list = git.hash_ref_pairs()
 
     def is_remote(ref):
         return phlgitu_ref.is_under_remote(ref, remote)
@@ -354,7 +750,8 @@ def _get_branch_to_hash(git):
     return branch_to_hash
 
 
-def get_managed_branches(git, repo_desc, naming, branch_link_callable=None):
+def get_managed_branches(
+        git, repo_desc, naming, branch_link_callable=None, diff_cache=None):
     branch_to_hash = _get_branch_to_hash(git)
     branch_pairs = abdt_naming.get_branch_pairs(branch_to_hash.keys(), naming)
 
@@ -369,9 +766,11 @@ def get_managed_branches(git, repo_desc, naming, branch_link_callable=None):
 
         review_hash = None
         tracker_hash = None
+        base_hash = None
 
         if review_branch is not None:
             review_hash = branch_to_hash[review_branch.branch]
+            base_hash = branch_to_hash.get(review_branch.base)
             if branch_link_callable:
                 branch_url = branch_link_callable(review_branch.branch)
 
@@ -387,7 +786,9 @@ def get_managed_branches(git, repo_desc, naming, branch_link_callable=None):
                 tracker_hash,
                 lander,
                 repo_desc,
-                branch_url))
+                branch_url,
+                base_hash,
+                diff_cache))
 
     return managed_branches
 
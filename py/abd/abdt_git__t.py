@@ -8,10 +8,32 @@
 # Concerns:
 # [ B] changes to review branches can be detected when creating 'Branch'-es
 # [ A] can create archive refs without error
+# [ C] can squash a review branch onto the base without touching the worktree
+# [ I] can squash a review branch onto the base with older versions of git
+# [ J] cached diffs are re-used when the base moves on without the review
+# [ D] the snapshot of refs follows pushes and fetches through the repo
+# [ E] batched pushes are only made when the batch ends
+# [ E] batched pushes only make the last push to each branch
+# [ E] batched pushes that fail don't stop the others, and aren't escalated
+# [ E] unbatched pushes are made at once, even within a batch
+# [ E] batched pushes are visible to the remote-tracking branches at once
+# [ G] can land a review after updating it in the same batch of pushes
+# [ H] new tracking branches are pushed at once, even within a batch
+# [ F] fetching only moved branches does nothing if nothing moved
+# [ F] fetching only moved branches follows new, moved and removed branches
+# [ F] fetching only moved branches follows the other configured refspecs
 #------------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
 # [ B] test_B_RawDiffNewCommits
+# [ C] test_C_SquashMergeWithoutCheckout
+# [ D] test_D_RefSnapshotFollowsChanges
+# [ E] test_E_BatchedPushes
+# [ F] test_F_FetchPruneMoved
+# [ G] test_G_UpdateThenLandInBatch
+# [ H] test_H_NewTrackerNotBatched
+# [ I] test_I_SquashMergeWithCheckout
+# [ J] test_J_DiffCacheSurvivesBaseMoving
 #==============================================================================
 
 from __future__ import absolute_import
@@ -32,6 +54,8 @@ import phlsys_git
 
 import abdt_branch
 import abdt_classicnaming
+import abdt_diffcache
+import abdt_differ
 import abdt_git
 import abdt_naming
 import abdt_rbranchnaming
@@ -187,6 +211,321 @@ class Test(unittest.TestCase):
         branch.mark_ok_in_review()
         self.assertIs(branch.has_new_commits(), False)
 
+    def test_C_SquashMergeWithoutCheckout(self):
+        base, branch_name, branch = self._setup_for_tracked_branch()
+
+        # push a new commit on branch as dev
+        phlgit_checkout.branch(self.repo_dev, branch_name)
+        filename = 'new_on_branch'
+        self._create_new_file(self.repo_dev, filename)
+        self.repo_dev.call('add', filename)
+        phlgit_commit.index(self.repo_dev, message=filename)
+        phlgit_push.branch(self.repo_dev, branch_name)
+
+        phlgit_fetch.all_prune(self.clone_arcyd)
+        status = self.clone_arcyd.call('status', '--porcelain')
+
+        landing_hash, summary = self.clone_arcyd.squash_merge(
+            'refs/remotes/origin/' + base,
+            'refs/remotes/origin/' + branch_name,
+            'land message',
+            'author',
+            'author@example.test')
+
+        self.assertIn('land message', summary)
+
+        # the working tree is untouched
+        self.assertEqual(
+            status, self.clone_arcyd.call('status', '--porcelain'))
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.clone_arcyd.working_dir, filename)))
+
+        self.clone_arcyd.push_asymmetrical(
+            landing_hash, 'refs/heads/' + base)
+        self.assertEqual(
+            'author land message\n',
+            self.repo_central.call('log', '-1', '--format=%an %s', base))
+        self.assertIn(
+            filename,
+            self.repo_central.call('ls-tree', '--name-only', base))
+
+    def test_D_RefSnapshotFollowsChanges(self):
+        self.assertItemsEqual(
+            ['master'], self.clone_arcyd.get_remote_branches())
+
+        # pushing through the repo is noticed
+        self.clone_arcyd.push_asymmetrical(
+            'refs/remotes/origin/master', 'refs/heads/other')
+        self.assertItemsEqual(
+            ['master', 'other'], self.clone_arcyd.get_remote_branches())
+
+        # fetching through the repo is noticed
+        phlgit_push.push_asymmetrical(
+            self.repo_dev, 'master', 'another', 'origin')
+        self.clone_arcyd.fetch_prune()
+        self.assertItemsEqual(
+            ['master', 'other', 'another'],
+            self.clone_arcyd.get_remote_branches())
+
+        # deleting through the repo is noticed
+        self.assertTrue(self.clone_arcyd.is_ref('refs/remotes/origin/other'))
+        self.clone_arcyd.push_delete('other')
+        self.assertFalse(
+            self.clone_arcyd.is_ref('refs/remotes/origin/other'))
+        self.assertItemsEqual(
+            ['master', 'another'], self.clone_arcyd.get_remote_branches())
+
+    def test_E_BatchedPushes(self):
+        master = 'refs/remotes/origin/master'
+
+        def remote_branches():
+            return [
+                r.split('/', 2)[2]
+                for r in self.repo_central.call(
+                    'for-each-ref', '--format=%(refname)').split()
+            ]
+
+        with self.clone_arcyd.batched_push_context():
+            self.clone_arcyd.push_asymmetrical(master, 'refs/heads/one')
+            self.clone_arcyd.push_asymmetrical_force(master, 'refs/heads/two')
+            self.clone_arcyd.push_asymmetrical(master, 'refs/heads/three')
+            self.clone_arcyd.push_delete('three')
+            self.assertItemsEqual(['master'], remote_branches())
+            self.assertItemsEqual(
+                ['master', 'one', 'two'],
+                self.clone_arcyd.get_remote_branches())
+
+        self.assertItemsEqual(['master', 'one', 'two'], remote_branches())
+        self.assertItemsEqual(
+            ['master', 'one', 'two'], self.clone_arcyd.get_remote_branches())
+
+        # if one push fails then the rest are still made
+        with self.clone_arcyd.batched_push_context():
+            self.clone_arcyd.push_delete('one')
+            self.clone_arcyd.push_delete('does_not_exist')
+            self.clone_arcyd.push_move_asymmetrical(
+                master, 'refs/heads/two', 'refs/heads/four')
+
+        self.assertItemsEqual(['master', 'four'], remote_branches())
+        self.assertItemsEqual(
+            ['master', 'four'], self.clone_arcyd.get_remote_branches())
+
+        # unbatched pushes are made straight away
+        with self.clone_arcyd.batched_push_context():
+            self.clone_arcyd.push_delete('four')
+            with self.clone_arcyd.unbatched_push_context():
+                self.clone_arcyd.push_asymmetrical(master, 'refs/heads/five')
+            self.assertItemsEqual(
+                ['master', 'four', 'five'], remote_branches())
+
+        self.assertItemsEqual(['master', 'five'], remote_branches())
+
+    def test_F_FetchPruneMoved(self):
+
+        def tracking_hashes():
+            return sorted(
+                (h, r.replace('refs/remotes/origin/', 'refs/heads/'))
+                for h, r in self.clone_arcyd.hash_ref_pairs()
+                if r.startswith('refs/remotes/origin/'))
+
+        def central_hashes():
+            return sorted(
+                tuple(line.split())
+                for line in self.repo_central.call(
+                    'for-each-ref', '--format=%(objectname) %(refname)',
+                    'refs/heads/').splitlines())
+
+        self.assertFalse(self.clone_arcyd.fetch_prune_moved())
+
+        phlgit_push.push_asymmetrical(self.repo_dev, 'master', 'a', 'origin')
+        phlgit_push.push_asymmetrical(self.repo_dev, 'master', 'b', 'origin')
+        self.assertTrue(self.clone_arcyd.fetch_prune_moved())
+        self.assertEqual(central_hashes(), tracking_hashes())
+        self.assertFalse(self.clone_arcyd.fetch_prune_moved())
+
+        # replace 'a' with a branch that would conflict with it, move 'b'
+        phlgit_push.delete(self.repo_dev, 'origin', 'a')
+        phlgit_push.push_asymmetrical(
+            self.repo_dev, 'master', 'a/blah', 'origin')
+        self._create_new_file(self.repo_dev, 'NEWFILE')
+        self.repo_dev.call('add', 'NEWFILE')
+        self.repo_dev.call('commit', '-m', 'add NEWFILE')
+        phlgit_push.push_asymmetrical(self.repo_dev, 'master', 'b', 'origin')
+        self.assertTrue(self.clone_arcyd.fetch_prune_moved())
+        self.assertEqual(central_hashes(), tracking_hashes())
+        self.assertItemsEqual(
+            ['master', 'a/blah', 'b'], self.clone_arcyd.get_remote_branches())
+        self.assertFalse(self.clone_arcyd.fetch_prune_moved())
+
+        # refs which aren't branches are followed too, if configured
+        config_ref = 'refs/config/origin/arcyd'
+        self.clone_arcyd.call(
+            'config', '--add', 'remote.origin.fetch',
+            '+refs/config/*:refs/config/origin/*')
+        phlgit_push.push_asymmetrical(
+            self.repo_dev, 'master', 'refs/config/arcyd', 'origin')
+        self.assertTrue(self.clone_arcyd.fetch_prune_moved())
+        self.assertEqual(
+            phlgit_revparse.get_sha1(self.repo_dev, 'master'),
+            phlgit_revparse.get_sha1(self.clone_arcyd, config_ref))
+        self.assertEqual(central_hashes(), tracking_hashes())
+        self.assertFalse(self.clone_arcyd.fetch_prune_moved())
+
+        phlgit_push.push_asymmetrical(
+            self.repo_dev, '+master^', 'refs/config/arcyd', 'origin')
+        self.assertTrue(self.clone_arcyd.fetch_prune_moved())
+        self.assertEqual(
+            phlgit_revparse.get_sha1(self.repo_dev, 'master^'),
+            phlgit_revparse.get_sha1(self.clone_arcyd, config_ref))
+
+        phlgit_push.delete(self.repo_dev, 'origin', 'refs/config/arcyd')
+        self.assertTrue(self.clone_arcyd.fetch_prune_moved())
+        self.assertFalse(self.clone_arcyd.is_ref(config_ref))
+        self.assertFalse(self.clone_arcyd.fetch_prune_moved())
+
+    def test_G_UpdateThenLandInBatch(self):
+        base, branch_name, branch = self._setup_for_tracked_branch()
+
+        # push a new commit on branch as dev
+        phlgit_checkout.branch(self.repo_dev, branch_name)
+        filename = 'new_on_branch'
+        self._create_new_file(self.repo_dev, filename)
+        self.repo_dev.call('add', filename)
+        phlgit_commit.index(self.repo_dev, message=filename)
+        phlgit_push.branch(self.repo_dev, branch_name)
+
+        branch = self._get_updated_branch(branch_name)
+        self.assertIs(branch.has_new_commits(), True)
+
+        with self.clone_arcyd.batched_push_context():
+            branch.mark_ok_in_review()
+            self.assertIs(branch.has_new_commits(), False)
+            branch.land('author', 'author@example.test', 'land message')
+
+        self.assertEqual(
+            'author land message\n',
+            self.repo_central.call('log', '-1', '--format=%an %s', base))
+        self.assertIn(
+            filename,
+            self.repo_central.call('ls-tree', '--name-only', base))
+
+        # the review and tracking branches are gone from the remote, and the
+        # remote-tracking branches agree with it
+        self.assertItemsEqual(
+            [base], self.clone_arcyd.get_remote_branches())
+        self.clone_arcyd.fetch_prune()
+        self.assertItemsEqual(
+            [base], self.clone_arcyd.get_remote_branches())
+
+    def test_H_NewTrackerNotBatched(self):
+        _, _, branch = self._setup_for_untracked_branch()
+
+        def central_branches():
+            return self.repo_central.call(
+                'for-each-ref', '--format=%(refname)', 'refs/heads/')
+
+        with self.clone_arcyd.batched_push_context():
+            branch.mark_ok_new_review(101)
+            self.assertIn('/ok/', central_branches())
+
+    def test_I_SquashMergeWithCheckout(self):
+        base, branch_name, branch = self._setup_for_tracked_branch()
+
+        # pretend that git is too old to merge without a checkout
+        self.clone_arcyd._is_squash_without_checkout_supported = False
+
+        # push a new commit on branch as dev
+        phlgit_checkout.branch(self.repo_dev, branch_name)
+        filename = 'new_on_branch'
+        self._create_new_file(self.repo_dev, filename)
+        self.repo_dev.call('add', filename)
+        phlgit_commit.index(self.repo_dev, message=filename)
+        phlgit_push.branch(self.repo_dev, branch_name)
+
+        phlgit_fetch.all_prune(self.clone_arcyd)
+
+        landing_hash, summary = self.clone_arcyd.squash_merge(
+            'refs/remotes/origin/' + base,
+            'refs/remotes/origin/' + branch_name,
+            'land message',
+            'author',
+            'author@example.test')
+
+        self.assertIn('land message', summary)
+        self.assertEqual(
+            'author land message\n',
+            self.clone_arcyd.call(
+                'log', '-1', '--format=%an %s', landing_hash))
+        self.assertEqual(
+            phlgit_revparse.get_sha1(
+                self.clone_arcyd, 'refs/remotes/origin/' + base),
+            phlgit_revparse.get_sha1(self.clone_arcyd, landing_hash + '^'))
+
+        # landing again has nothing to commit, which is an error
+        with self.assertRaises(phlgit_merge.MergeException):
+            self.clone_arcyd.squash_merge(
+                landing_hash,
+                'refs/remotes/origin/' + branch_name,
+                'land message',
+                'author',
+                'author@example.test')
+
+    def test_J_DiffCacheSurvivesBaseMoving(self):
+        base, branch_name, _ = self._setup_for_tracked_branch()
+        cache_dir = tempfile.mkdtemp()
+        diff_cache = abdt_diffcache.DiffCache(cache_dir)
+
+        # push a new commit on branch as dev
+        phlgit_checkout.branch(self.repo_dev, branch_name)
+        self._create_new_file(self.repo_dev, 'new_on_branch')
+        self.repo_dev.call('add', 'new_on_branch')
+        phlgit_commit.index(self.repo_dev, message='new_on_branch')
+        phlgit_push.branch(self.repo_dev, branch_name)
+
+        def make_raw_diff():
+            phlgit_fetch.all_prune(self.clone_arcyd)
+            branch, = abdt_git.get_managed_branches(
+                self.clone_arcyd,
+                "repo",
+                abdt_classicnaming.Naming(),
+                diff_cache=diff_cache)
+            return branch.make_raw_diff().diff
+
+        made_diffs = []
+        original_make_raw_diff = abdt_differ.make_raw_diff
+
+        def counting_make_raw_diff(*args, **kwargs):
+            made_diffs.append(args)
+            return original_make_raw_diff(*args, **kwargs)
+
+        abdt_differ.make_raw_diff = counting_make_raw_diff
+        try:
+            diff = make_raw_diff()
+            self.assertIn('new_on_branch', diff)
+            self.assertEqual(1, len(made_diffs))
+
+            # move the base on, the merge-base and so the diff don't change
+            phlgit_checkout.branch(self.repo_dev, base)
+            self._create_new_file(self.repo_dev, 'new_on_base')
+            self.repo_dev.call('add', 'new_on_base')
+            phlgit_commit.index(self.repo_dev, message='new_on_base')
+            phlgit_push.branch(self.repo_dev, base)
+
+            self.assertEqual(diff, make_raw_diff())
+            self.assertEqual(1, len(made_diffs))
+
+            # merge the base into the review, the diff must be made again
+            phlgit_checkout.branch(self.repo_dev, branch_name)
+            phlgit_merge.no_ff(self.repo_dev, base)
+            phlgit_push.branch(self.repo_dev, branch_name)
+
+            self.assertNotIn('new_on_base', make_raw_diff())
+            self.assertEqual(2, len(made_diffs))
+        finally:
+            abdt_differ.make_raw_diff = original_make_raw_diff
+            shutil.rmtree(cache_dir)
+
     def _setup_for_tracked_branch(self):
         base, branch_name, branch = self._setup_for_untracked_branch()
         branch.mark_ok_new_review(101)
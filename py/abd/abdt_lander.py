@@ -1,15 +1,16 @@
 """Callables for re-integrating branches upstream.
 
 This component provides a number of 'landers', which will re-integrate a
-feature branch back into the current branch, which is assumed to be upstream.
+feature branch back into a base branch, which is assumed to be upstream.
 
-In other words, the 'landers' land a supplied branch on the current branch.
+In other words, the 'landers' land a supplied branch on the base.
 
 Landers have the interface:
-    def lander(clone, feature, author_name, author_email, message)
+    def lander(clone, base, feature, author_name, author_email, message)
 
-On success the lander will return a string summary of the landing operation
-for a human to review.
+Landers don't update any branches or touch the working tree, on success the
+lander will return a tuple of the string hash of the new commit on the base
+and a string summary of the landing operation for a human to review.
 
 If the lander fails to land then it will raise a LanderException with details
 of the failure.
@@ -41,10 +42,11 @@ class LanderException(Exception):
         super(LanderException, self).__init__(description)
 
 
-def squash(clone, source, author_name, author_email, message):
-    """Return the string output of squashing 'source' into current branch."""
+def squash(clone, base, source, author_name, author_email, message):
+    """Return a new commit squashing 'source' onto 'base' and a summary."""
     try:
         result = clone.squash_merge(
+            base,
             source,
             message,
             author_name,
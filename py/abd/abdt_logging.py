@@ -9,6 +9,7 @@
 #   set_arcyd_reporter
 #   clear_arcyd_reporter
 #   on_retry_exception
+#   on_system_exception
 #   on_review_event
 #   on_io_event
 #
@@ -59,6 +60,13 @@ def on_retry_exception(identifier, detail, e, delay):
         reporter.log_system_exception(identifier, detail, e)
 
 
+def on_system_exception(identifier, detail, e):
+    logging.error(str(e))
+    reporter = _get_reporter()
+    if reporter:
+        reporter.log_system_exception(identifier, detail, e)
+
+
 def on_review_event(identifier, detail):
     reporter = _get_reporter()
     if reporter:
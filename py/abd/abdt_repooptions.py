@@ -26,7 +26,6 @@ import copy
 import json
 
 import phlgit_show
-import phlgit_showref
 
 
 class Data(object):
@@ -196,7 +195,7 @@ def data_from_repo_or_none(repo):
 
     Will return 'None' if no config file was found.
 
-    :repo: a git repo object that supports call()
+    :repo: a git repo object that supports call() and is_ref()
     :returns: a valid 'Data' or None
 
     """
@@ -204,7 +203,7 @@ def data_from_repo_or_none(repo):
 
     # try to get the file content from the special ref, if it exists
     ref = 'refs/config/origin/arcyd'
-    if ref in phlgit_showref.names(repo):
+    if repo.is_ref(ref):
         try:
             config = phlgit_show.file_on_ref(
                 repo, 'repo.json', ref)
@@ -123,6 +123,7 @@ class RepoReporter(object):
         """
         super(RepoReporter, self).__init__()
         self._arcyd_reporter = arcyd_reporter
+        self._repo = repo
         self._try_output = try_output
         self._ok_output = ok_output
         self._is_updating = True
@@ -163,7 +164,7 @@ class RepoReporter(object):
         self._update_write_repo_status(
             REPO_STATUS_FAILED,
             traceback)
-        self._arcyd_reporter.fail_repo()
+        self._arcyd_reporter.fail_repo(self._repo)
 
     def on_completed(self):
         self._is_updating = False
@@ -251,9 +252,11 @@ class RepoReporter(object):
         """Close any resources associated with the report."""
         if self._is_updating:
             self._update_write_repo_status(REPO_STATUS_FAILED)
-            self._arcyd_reporter.fail_repo()
+            self._arcyd_reporter.fail_repo(self._repo)
         else:
-            self._arcyd_reporter.finish_repo()
+            self._arcyd_reporter.finish_repo(self._repo)
+        self._try_output.flush()
+        self._ok_output.flush()
 
 
 #------------------------------------------------------------------------------
@@ -7,8 +7,10 @@
 # Public Classes:
 #   ToFile
 #    .write
+#    .flush
 #   ToDict
 #    .write
+#    .flush
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -18,20 +20,123 @@ from __future__ import absolute_import
 
 import json
 import os
+import threading
+import time
 
 import phlsys_fs
 
+# don't write a file more often than this, later writes are coalesced
+_DEFAULT_MIN_WRITE_INTERVAL_SECS = 1
+
+# don't wait for a written file to reach the disk more often than this, it's
+# expensive on busy hosts and the contents will be replaced again soon
+_DEFAULT_MIN_FSYNC_INTERVAL_SECS = 30
+
 
 class ToFile(object):
 
-    def __init__(self, filename):
+    def __init__(
+            self,
+            filename,
+            min_write_interval_secs=_DEFAULT_MIN_WRITE_INTERVAL_SECS,
+            min_fsync_interval_secs=_DEFAULT_MIN_FSYNC_INTERVAL_SECS):
+        """Construct a writer which replaces 'filename' with each dictionary.
+
+        Writes are made at most once every 'min_write_interval_secs', the
+        latest dictionary written in the meantime is written when the
+        interval has passed.  Dictionaries which are the same as the file
+        contents are not written.
+
+        The file is replaced atomically, readers will never see a partially
+        written file.
+
+        :filename: the string path of the file to write
+        :min_write_interval_secs: the minimum number of seconds between writes
+        :min_fsync_interval_secs: the minimum number of seconds between making
+                                  sure that the written file is on disk
+        :returns: None
+
+        """
         super(ToFile, self).__init__()
         self._filename = os.path.abspath(filename)
+        self._min_write_interval_secs = min_write_interval_secs
+        self._min_fsync_interval_secs = min_fsync_interval_secs
+        self._lock = threading.Lock()
+
+        self._written_content = None
+        self._pending_content = None
+        self._timer = None
+        self._last_write_time = None
+        self._last_fsync_time = None
 
     def write(self, d):
         assert isinstance(d, dict)
-        with phlsys_fs.write_file_lock_context(self._filename) as f:
-            f.write(json.dumps(d))
+        content = json.dumps(d)
+        with self._lock:
+            self._pending_content = content
+            if self._timer is not None:
+                # a write is already due, it will use the latest content
+                return
+
+            delay = 0
+            if self._last_write_time is not None:
+                delay = self._last_write_time - time.time()
+                delay += self._min_write_interval_secs
+
+            if delay > 0:
+                self._timer = threading.Timer(delay, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            else:
+                self._write_pending()
+
+    def flush(self):
+        """Write any coalesced dictionary now, rather than when it's due.
+
+        :returns: None
+
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._write_pending()
+
+    def _on_timer(self):
+        with self._lock:
+            if self._timer is None:
+                # 'flush' was called in the meantime
+                return
+            self._timer = None
+            self._write_pending()
+
+    def _write_pending(self):
+        content = self._pending_content
+        self._pending_content = None
+        if content is None:
+            return
+
+        if self._written_content is None:
+            try:
+                with open(self._filename) as f:
+                    self._written_content = f.read()
+            except EnvironmentError:
+                pass
+
+        if content == self._written_content:
+            return
+
+        now = time.time()
+        fsync = (
+            self._last_fsync_time is None or
+            now - self._last_fsync_time >= self._min_fsync_interval_secs)
+
+        phlsys_fs.replace_file_atomically(self._filename, content, fsync)
+
+        self._written_content = content
+        self._last_write_time = now
+        if fsync:
+            self._last_fsync_time = now
 
 
 class ToDict(object):
@@ -47,6 +152,10 @@ class ToDict(object):
         self._shared_d.clear()
         self._shared_d.update(d)
 
+    def flush(self):
+        # there's nothing to do, writes are made immediately
+        pass
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -0,0 +1,112 @@
+"""Test suite for abdt_shareddictoutput."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] ToFile and ToDict can write dictionaries which can be read back
+# [ B] ToFile writes immediately if it hasn't written recently
+# [ B] ToFile coalesces writes made soon after the last one
+# [ B] ToFile writes the latest coalesced dictionary when due or on flush
+# [ C] ToFile doesn't rewrite a file with the same contents
+# [ C] ToFile leaves no temporary files behind
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+# [ B] test_B_CoalesceWrites
+# [ C] test_C_SkipUnchanged
+#==============================================================================
+
+from __future__ import absolute_import
+
+import json
+import os
+import time
+import unittest
+
+import phlsys_fs
+
+import abdt_shareddictoutput
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Breathing(self):
+        with phlsys_fs.chtmpdir_context():
+            to_file = abdt_shareddictoutput.ToFile('status')
+            to_file.write({'hello': 'world'})
+            to_file.flush()
+            self.assertEqual({'hello': 'world'}, _read_json('status'))
+
+        shared_d = {'old': 'content'}
+        to_dict = abdt_shareddictoutput.ToDict(shared_d)
+        to_dict.write({'hello': 'world'})
+        to_dict.flush()
+        self.assertEqual({'hello': 'world'}, shared_d)
+
+    def test_B_CoalesceWrites(self):
+        with phlsys_fs.chtmpdir_context():
+            to_file = abdt_shareddictoutput.ToFile(
+                'status', min_write_interval_secs=0.5)
+
+            to_file.write({'count': 1})
+            self.assertEqual({'count': 1}, _read_json('status'))
+
+            to_file.write({'count': 2})
+            to_file.write({'count': 3})
+            self.assertEqual({'count': 1}, _read_json('status'))
+
+            time.sleep(1)
+            self.assertEqual({'count': 3}, _read_json('status'))
+
+            to_file.write({'count': 4})
+            to_file.write({'count': 5})
+            to_file.flush()
+            self.assertEqual({'count': 5}, _read_json('status'))
+
+    def test_C_SkipUnchanged(self):
+        with phlsys_fs.chtmpdir_context():
+            to_file = abdt_shareddictoutput.ToFile('status')
+            to_file.write({'hello': 'world'})
+            inode = os.stat('status').st_ino
+
+            # a new writer for the same file also notices it's unchanged
+            to_file = abdt_shareddictoutput.ToFile('status')
+            to_file.write({'hello': 'world'})
+            to_file.flush()
+            self.assertEqual(inode, os.stat('status').st_ino)
+
+            to_file.write({'hello': 'again'})
+            to_file.flush()
+            self.assertNotEqual(inode, os.stat('status').st_ino)
+            self.assertEqual(['status'], os.listdir('.'))
+
+
+def _read_json(path):
+    with phlsys_fs.read_file_lock_context(path) as f:
+        return json.load(f)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
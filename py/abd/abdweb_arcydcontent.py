@@ -9,6 +9,7 @@
 #   render_status
 #   render_repo
 #   render_stats
+#   render_latencies
 #   render_controls
 #   render_error_log
 #   render_info_log
@@ -41,8 +42,8 @@ def render(
     description = report[abdt_arcydreporter.ARCYD_STATUS_DESCRIPTION]
     render_status(status, stats, formatter, description)
 
-    repo = report[abdt_arcydreporter.ARCYD_CURRENT_REPO]
-    if repo:
+    current_repos = report[abdt_arcydreporter.ARCYD_CURRENT_REPOS]
+    for repo in current_repos:
         render_repo(base_url, repo, formatter)
 
     formatter.horizontal_rule()
@@ -110,8 +111,10 @@ def render_stats(stats, formatter):
     current_duration = stats[abdt_arcydreporter.ARCYD_STAT_CURRENT_CYCLE_TIME]
     last_duration = stats[abdt_arcydreporter.ARCYD_STAT_LAST_CYCLE_TIME]
     tag_samplers = stats[abdt_arcydreporter.ARCYD_STAT_TAG_SAMPLERS]
+    http_pool = stats.get(abdt_arcydreporter.ARCYD_STAT_HTTP_POOL)
+    tag_latencies = stats.get(abdt_arcydreporter.ARCYD_STAT_TAG_LATENCIES)
 
-    if current_duration or last_duration or tag_samplers:
+    if current_duration or last_duration or tag_samplers or http_pool:
         formatter.heading('stats')
 
     if current_duration:
@@ -122,6 +125,11 @@ def render_stats(stats, formatter):
         formatter.text(
             'last cycle time: {:.2f} secs'.format(last_duration))
 
+    if http_pool:
+        formatter.text(
+            'http connections: {hits} re-used, {misses} new, '
+            '{reconnects} stale'.format(**http_pool))
+
     if tag_samplers:
         Sampler = abdt_arcydreporter.Sampler.from_dict
         samplers_tags = [(Sampler(s), t) for t, s in tag_samplers.iteritems()]
@@ -157,6 +165,53 @@ def render_stats(stats, formatter):
             [i[1] for i in heading_format],
             'stats')
 
+    if tag_latencies:
+        render_latencies(tag_latencies, formatter)
+
+
+def render_latencies(tag_latencies, formatter):
+    # show the slowest tags first, by their recent tail latency
+    recent_key = abdt_arcydreporter.ARCYD_LATENCY_RECENT_CYCLES
+    current_key = abdt_arcydreporter.ARCYD_LATENCY_CURRENT_CYCLE
+    empty = dict.fromkeys(abdt_arcydreporter.ARCYD_LIST_LATENCY)
+
+    latencies_tags = []
+    for tag, latencies in tag_latencies.iteritems():
+        recent = latencies.get(recent_key, empty)
+        current = latencies.get(current_key, empty)
+        latencies_tags.append((
+            recent[abdt_arcydreporter.ARCYD_LATENCY_P99],
+            tag,
+            recent[abdt_arcydreporter.ARCYD_LATENCY_COUNT],
+            recent[abdt_arcydreporter.ARCYD_LATENCY_P50],
+            recent[abdt_arcydreporter.ARCYD_LATENCY_P90],
+            recent[abdt_arcydreporter.ARCYD_LATENCY_MAX],
+            current[abdt_arcydreporter.ARCYD_LATENCY_COUNT],
+            current[abdt_arcydreporter.ARCYD_LATENCY_P99],
+            current[abdt_arcydreporter.ARCYD_LATENCY_MAX],
+        ))
+
+    heading_format = (
+        ('p99', '{:.3f} secs'),
+        ('tag', '{}'),
+        ('count', '{}'),
+        ('p50', '{:.3f} secs'),
+        ('p90', '{:.3f} secs'),
+        ('max', '{:.3f} secs'),
+        ('this cycle count', '{}'),
+        ('this cycle p99', '{:.3f} secs'),
+        ('this cycle max', '{:.3f} secs'),
+    )
+
+    latencies_tags.sort(reverse=True)
+
+    formatter.heading('latencies of each call, over recent cycles')
+    formatter.table_from_tuple_list(
+        latencies_tags,
+        [i[0] for i in heading_format],
+        [i[1] for i in heading_format],
+        'stats')
+
 
 def render_controls(is_reset_scheduled, is_pause_scheduled, formatter):
     with formatter.tags_context('table'):
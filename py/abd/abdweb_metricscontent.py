@@ -0,0 +1,245 @@
+"""Render the state of a running instance of Arcyd for Prometheus to scrape.
+
+The output is in the Prometheus text exposition format, version 0.0.4, which
+OpenMetrics scrapers also accept.
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# abdweb_metricscontent
+#
+# Public Functions:
+#   render
+#
+# Public Assignments:
+#   CONTENT_TYPE
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import phlsys_histogram
+
+import abdt_arcydreporter
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# tags for the raw calls to conduit, see abdi_processrepoargs
+_CONDUIT_TAG_PREFIX = 'base_conduit.'
+
+
+def render(report):
+    """Return the string metrics for the supplied arcyd 'report'.
+
+    Values which the report doesn't have yet, for example the last cycle time
+    of an arcyd which is still in its first cycle, are left out.
+
+    :report: the dict read from the arcyd status file
+    :returns: a string in the Prometheus text format
+
+    """
+    lines = []
+    stats = report[abdt_arcydreporter.ARCYD_STATISTICS]
+
+    status = report[abdt_arcydreporter.ARCYD_STATUS]
+    _add_metric(
+        lines, 'arcyd_status', 'gauge',
+        'Whether arcyd currently has each status.',
+        [({'status': s}, int(s == status))
+         for s in abdt_arcydreporter.ARCYD_LIST_STATUS])
+
+    _add_metric(
+        lines, 'arcyd_cycle_seconds', 'gauge',
+        'Duration of the current and last cycles over all repos.',
+        [({'cycle': 'current'},
+          stats[abdt_arcydreporter.ARCYD_STAT_CURRENT_CYCLE_TIME]),
+         ({'cycle': 'last'},
+          stats[abdt_arcydreporter.ARCYD_STAT_LAST_CYCLE_TIME])])
+
+    _add_repo_metrics(lines, report)
+    _add_tag_metrics(lines, stats)
+
+    _add_metric(
+        lines, 'arcyd_tryloop_exceptions_total', 'counter',
+        'Exceptions which caused an operation to be retried.',
+        [({}, stats.get(
+            abdt_arcydreporter.ARCYD_STAT_TRYLOOP_EXCEPTIONS))])
+
+    system_errors = stats.get(abdt_arcydreporter.ARCYD_STAT_SYSTEM_ERRORS, {})
+    _add_metric(
+        lines, 'arcyd_system_errors_total', 'counter',
+        'System errors by identifier, including those which were retried.',
+        [({'identifier': identifier}, count)
+         for identifier, count in sorted(system_errors.iteritems())])
+
+    http_pool = stats.get(abdt_arcydreporter.ARCYD_STAT_HTTP_POOL, {})
+    for name, count in sorted(http_pool.iteritems()):
+        _add_metric(
+            lines, 'arcyd_http_pool_{}_total'.format(name), 'counter',
+            'Connections from the pool by outcome: {}.'.format(name),
+            [({}, count)])
+
+    return ''.join(lines)
+
+
+def _add_repo_metrics(lines, report):
+    current_repos = report[abdt_arcydreporter.ARCYD_CURRENT_REPOS]
+    repos = report[abdt_arcydreporter.ARCYD_REPOS]
+
+    _add_metric(
+        lines, 'arcyd_repos_in_progress', 'gauge',
+        'Repos which are being processed right now.',
+        [({}, len(current_repos))])
+
+    name_to_repo = dict(
+        (r[abdt_arcydreporter.REPO_ATTRIB_NAME], r) for r in repos)
+    name_to_repo.update(dict(
+        (r[abdt_arcydreporter.REPO_ATTRIB_NAME], r) for r in current_repos))
+    sorted_repos = [name_to_repo[name] for name in sorted(name_to_repo)]
+
+    _add_metric(
+        lines, 'arcyd_repos', 'gauge',
+        'Repos by the status of their current or last processing.',
+        [({'status': s}, len([
+            r for r in sorted_repos
+            if r[abdt_arcydreporter.REPO_ATTRIB_STATUS] == s]))
+         for s in abdt_arcydreporter.REPO_STATUSES])
+
+    _add_metric(
+        lines, 'arcyd_repo_processing_seconds', 'gauge',
+        'Duration of the last completed processing of each repo.',
+        [({'repo': r[abdt_arcydreporter.REPO_ATTRIB_NAME]},
+          r.get(abdt_arcydreporter.REPO_ATTRIB_LAST_DURATION))
+         for r in sorted_repos])
+
+    _add_metric(
+        lines, 'arcyd_repo_failed', 'gauge',
+        'Whether the last processing of each repo failed.',
+        [({'repo': r[abdt_arcydreporter.REPO_ATTRIB_NAME]},
+          int(r[abdt_arcydreporter.REPO_ATTRIB_STATUS] ==
+              abdt_arcydreporter.REPO_STATUS_FAILED))
+         for r in sorted_repos])
+
+
+def _add_tag_metrics(lines, stats):
+    tag_histograms = stats.get(
+        abdt_arcydreporter.ARCYD_STAT_TAG_HISTOGRAMS, {})
+    tag_errors = stats.get(abdt_arcydreporter.ARCYD_STAT_TAG_ERRORS, {})
+
+    histograms = [
+        (tag, phlsys_histogram.Histogram.from_dict(d))
+        for tag, d in sorted(tag_histograms.iteritems())
+    ]
+
+    samples = []
+    for tag, histogram in histograms:
+        for bound, count in histogram.cumulative_counts():
+            samples.append(
+                ('_bucket', {'tag': tag, 'le': _format_value(bound)}, count))
+        samples.append(('_sum', {'tag': tag}, histogram.total))
+        samples.append(('_count', {'tag': tag}, histogram.count))
+    _add_metric(
+        lines, 'arcyd_tag_duration_seconds', 'histogram',
+        'Duration of each call to each timed tag, including failed calls.',
+        samples)
+
+    _add_metric(
+        lines, 'arcyd_tag_errors_total', 'counter',
+        'Calls to each timed tag which raised an exception.',
+        [({'tag': tag}, count)
+         for tag, count in sorted(tag_errors.iteritems())])
+
+    conduit_histograms = [
+        (tag[len(_CONDUIT_TAG_PREFIX):], histogram)
+        for tag, histogram in histograms
+        if tag.startswith(_CONDUIT_TAG_PREFIX)
+    ]
+    _add_metric(
+        lines, 'arcyd_conduit_calls_total', 'counter',
+        'Calls to conduit by method, including failed calls.',
+        [({'method': method}, histogram.count)
+         for method, histogram in conduit_histograms])
+    _add_metric(
+        lines, 'arcyd_conduit_errors_total', 'counter',
+        'Calls to conduit by method which raised an exception.',
+        [({'method': method},
+          tag_errors.get(_CONDUIT_TAG_PREFIX + method, 0))
+         for method, _ in conduit_histograms])
+
+
+def _add_metric(lines, name, type_, help_, samples):
+    """Append the lines describing the metric 'name' to 'lines'.
+
+    Samples with a value of None are left out.  The 'samples' of histograms
+    have a name suffix before their labels, e.g. ('_bucket', labels, value).
+
+    :lines: the list of string lines to append to
+    :name: the string name of the metric
+    :type_: the string Prometheus type of the metric, e.g. 'counter'
+    :help_: the string description of the metric
+    :samples: a list of (labels, value) or (suffix, labels, value)
+    :returns: None
+
+    """
+    lines.append('# HELP {} {}\n'.format(name, help_))
+    lines.append('# TYPE {} {}\n'.format(name, type_))
+    for sample in samples:
+        if len(sample) == 2:
+            suffix = ''
+            labels, value = sample
+        else:
+            suffix, labels, value = sample
+        if value is None:
+            continue
+        lines.append('{}{}{} {}\n'.format(
+            name, suffix, _format_labels(labels), _format_value(value)))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(k, _escape_label_value(v))
+        for k, v in sorted(labels.iteritems())) + '}'
+
+
+def _escape_label_value(value):
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    value = value.replace('\\', '\\\\')
+    value = value.replace('"', '\\"')
+    return value.replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
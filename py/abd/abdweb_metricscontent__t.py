@@ -0,0 +1,132 @@
+"""Test suite for abdweb_metricscontent."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] the metrics of a freshly started arcyd can be rendered
+# [ A] every sample belongs to a metric with a TYPE declared before it
+# [ B] tag calls, errors and conduit calls are counted since arcyd started
+# [ B] the processing time of each repo is reported
+# [ B] label values are escaped
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+# [ B] test_B_Counts
+#==============================================================================
+
+from __future__ import absolute_import
+
+import json
+import unittest
+
+import abdt_arcydreporter
+import abdt_shareddictoutput
+
+import abdweb_metricscontent
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.report = {}
+        self.reporter = abdt_arcydreporter.ArcydReporter(
+            abdt_shareddictoutput.ToDict(self.report))
+
+    def _render(self):
+        # round-trip through json as the report is read from a file
+        report = json.loads(json.dumps(self.report))
+        return abdweb_metricscontent.render(report)
+
+    def _samples(self, text):
+        samples = {}
+        declared = set()
+        for line in text.splitlines():
+            if line.startswith('# TYPE '):
+                declared.add(line.split()[2])
+            elif not line.startswith('#'):
+                name_and_labels, value = line.rsplit(' ', 1)
+                name = name_and_labels.split('{')[0]
+                self.assertTrue(
+                    any(name.startswith(d) for d in declared), line)
+                samples[name_and_labels] = float(value)
+        return samples
+
+    def test_A_Breathing(self):
+        samples = self._samples(self._render())
+        self.assertEqual(1, samples['arcyd_status{status="starting"}'])
+        self.assertEqual(0, samples['arcyd_repos_in_progress'])
+        self.assertEqual(0, samples['arcyd_tryloop_exceptions_total'])
+        self.assertNotIn('arcyd_cycle_seconds{cycle="last"}', samples)
+
+    def test_B_Counts(self):
+        reporter = self.reporter
+        reporter.finish_sleep()
+
+        reporter.start_repo('repo', 'human "repo"')
+        with reporter.tag_timer_context('base_conduit.ping'):
+            pass
+        with self.assertRaises(ValueError):
+            with reporter.tag_timer_context('base_conduit.ping'):
+                raise ValueError('test')
+        reporter.finish_repo('repo')
+
+        reporter.on_tryloop_exception(ValueError('test'), 1)
+        reporter.log_system_error('identifier', 'detail')
+        reporter.start_sleep(1)
+
+        samples = self._samples(self._render())
+        self.assertEqual(1, samples['arcyd_status{status="sleeping"}'])
+        self.assertIn('arcyd_cycle_seconds{cycle="last"}', samples)
+        self.assertIn('arcyd_repo_processing_seconds{repo="repo"}', samples)
+        self.assertEqual(1, samples['arcyd_repos{status="ok"}'])
+        self.assertEqual(
+            2,
+            samples[
+                'arcyd_tag_duration_seconds_count'
+                '{tag="base_conduit.ping"}'])
+        self.assertEqual(
+            2,
+            samples[
+                'arcyd_tag_duration_seconds_bucket'
+                '{le="+Inf",tag="base_conduit.ping"}'])
+        self.assertEqual(
+            1, samples['arcyd_tag_errors_total{tag="base_conduit.ping"}'])
+        self.assertEqual(
+            2, samples['arcyd_conduit_calls_total{method="ping"}'])
+        self.assertEqual(
+            1, samples['arcyd_conduit_errors_total{method="ping"}'])
+        self.assertEqual(1, samples['arcyd_tryloop_exceptions_total'])
+        self.assertEqual(
+            1, samples['arcyd_system_errors_total{identifier="identifier"}'])
+
+        reporter.start_repo('repo\n"2"\\', 'repo 2')
+        samples = self._samples(self._render())
+        self.assertEqual(
+            0, samples['arcyd_repo_failed{repo="repo\\n\\"2\\"\\\\"}'])
+        self.assertEqual(1, samples['arcyd_repos_in_progress'])
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
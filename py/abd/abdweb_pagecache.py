@@ -0,0 +1,154 @@
+"""Cache rendered pages, keyed by the state of the files they're made from.
+
+Usage example:
+    >>> cache = PageCache()
+    >>> render = lambda: ('text/plain', 'hello')
+    >>> page = cache.get('/', [], render)
+    >>> page.content, page.content_type
+    ('hello', 'text/plain')
+    >>> cache.get('/', [], lambda: ('text/plain', 'changed')) is page
+    True
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# abdweb_pagecache
+#
+# Public Classes:
+#   Page
+#    .gzipped_content
+#   PageCache
+#    .get
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import hashlib
+import os
+import threading
+import zlib
+
+_DEFAULT_MAX_PAGES = 1024
+
+# the 'wbits' for zlib to write the gzip format, rather than raw zlib
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class Page(object):
+
+    def __init__(self, content_type, content):
+        """Construct a rendered page.
+
+        :content_type: the string mime type of the content
+        :content: the string content of the page, unicode is sent as utf-8
+
+        """
+        super(Page, self).__init__()
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+        self.content_type = content_type
+        self.content = content
+        content_hash = hashlib.sha1(content).hexdigest()
+        self.etag = '"{}"'.format(content_hash)
+
+        # each encoding of the content needs a validator of its own, or a
+        # cache could answer a revalidation of one with the other
+        self.gzipped_etag = '"{}-gzip"'.format(content_hash)
+        self._gzipped_content = None
+
+    @property
+    def gzipped_content(self):
+        # compress on first use, the page may only ever be fetched plainly;
+        # if several threads race here then they'll all get the same result
+        if self._gzipped_content is None:
+            compressor = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, _GZIP_WBITS)
+            self._gzipped_content = (
+                compressor.compress(self.content) + compressor.flush())
+        return self._gzipped_content
+
+
+class PageCache(object):
+
+    def __init__(self, max_pages=_DEFAULT_MAX_PAGES):
+        """Construct an empty cache which holds at most 'max_pages'.
+
+        A single instance may be used from many threads at once.
+
+        :max_pages: the maximum integer number of pages to keep
+
+        """
+        super(PageCache, self).__init__()
+        self._max_pages = max_pages
+        self._lock = threading.Lock()
+        self._key_to_signature_page = {}
+
+    def get(self, key, paths, render):
+        """Return the Page for 'key', rendering it only if 'paths' changed.
+
+        The page is rendered again if any of the files at 'paths' have been
+        modified, replaced, created or removed since it was last rendered.
+        Pages which fail to render are not cached.
+
+        :key: the hashable key of the page, e.g. the url path
+        :paths: the list of string paths of the files the page is made from
+        :render: a callable returning (content_type, content)
+        :returns: a Page
+
+        """
+        # note that we stat before rendering, so if the files change while
+        # we're rendering then we'll just render again next time
+        signature = tuple(_get_file_signature(p) for p in paths)
+
+        with self._lock:
+            cached = self._key_to_signature_page.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        page = Page(*render())
+
+        with self._lock:
+            if len(self._key_to_signature_page) >= self._max_pages:
+                # pages are cheap to make again, don't bother tracking which
+                # were least recently used
+                self._key_to_signature_page.clear()
+            self._key_to_signature_page[key] = (signature, page)
+
+        return page
+
+
+def _get_file_signature(path):
+    # the status files are replaced atomically, so a change of inode is the
+    # surest sign of a change; compare the size and mtime for other writers
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
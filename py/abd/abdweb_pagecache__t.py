@@ -0,0 +1,120 @@
+"""Test suite for abdweb_pagecache."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] pages are only rendered again when their files change
+# [ A] creating, modifying, replacing and removing files are all changes
+# [ A] pages which fail to render are not cached
+# [ B] pages with the same content have the same etag
+# [ B] the gzipped content has a different etag to the plain content
+# [ B] gzipped content decompresses to the original content
+# [ B] unicode content is encoded as utf-8
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Invalidation
+# [ B] test_B_Page
+#==============================================================================
+
+from __future__ import absolute_import
+
+import os
+import unittest
+import zlib
+
+import phlsys_fs
+
+import abdweb_pagecache
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Invalidation(self):
+        renders = []
+
+        def render():
+            renders.append(None)
+            return 'text/plain', str(len(renders))
+
+        with phlsys_fs.chtmpdir_context():
+            cache = abdweb_pagecache.PageCache()
+            paths = ['a', 'b']
+
+            def get_content():
+                return cache.get('key', paths, render).content
+
+            self.assertEqual('1', get_content())
+            self.assertEqual('1', get_content())
+
+            # create
+            phlsys_fs.write_text_file('a', 'a')
+            self.assertEqual('2', get_content())
+            self.assertEqual('2', get_content())
+
+            # modify, making sure the size changes as mtime may not
+            with open('a', 'a') as f:
+                f.write('more')
+            self.assertEqual('3', get_content())
+
+            # replace
+            phlsys_fs.replace_file_atomically('a', 'aaaaa')
+            self.assertEqual('4', get_content())
+
+            # remove
+            os.remove('a')
+            self.assertEqual('5', get_content())
+            self.assertEqual('5', get_content())
+
+            # other keys are independent
+            self.assertEqual('6', cache.get('other', paths, render).content)
+            self.assertEqual('5', get_content())
+
+            def fail():
+                raise Exception('render failed')
+
+            phlsys_fs.write_text_file('b', 'b')
+            self.assertRaises(Exception, cache.get, 'key', paths, fail)
+            self.assertEqual('7', get_content())
+
+    def test_B_Page(self):
+        page = abdweb_pagecache.Page('text/plain', 'content')
+        same = abdweb_pagecache.Page('text/plain', 'content')
+        other = abdweb_pagecache.Page('text/plain', 'other content')
+        self.assertEqual(page.etag, same.etag)
+        self.assertNotEqual(page.etag, other.etag)
+        self.assertEqual(page.gzipped_etag, same.gzipped_etag)
+        self.assertNotEqual(page.etag, page.gzipped_etag)
+        self.assertNotEqual(page.gzipped_etag, other.gzipped_etag)
+
+        self.assertEqual(
+            'content',
+            zlib.decompress(page.gzipped_content, 16 + zlib.MAX_WBITS))
+
+        page = abdweb_pagecache.Page('text/html', u'\u2603')
+        self.assertEqual('\xe2\x98\x83', page.content)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
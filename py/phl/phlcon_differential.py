@@ -39,6 +39,7 @@
 #   AUTHOR_ACTIONS
 #   REVIEWER_ACTIONS
 #   USER_ACTIONS
+#   ORDERS
 #   CreateRawDiffResponse
 #   GetDiffIdResponse
 #   ParseCommitMessageResponse
@@ -118,6 +119,12 @@ REVIEWER_ACTIONS = {
 # map the strings that appear in the web UI to string that conduit expects
 USER_ACTIONS = dict(AUTHOR_ACTIONS.items() + REVIEWER_ACTIONS.items())
 
+# from DifferentialRevisionQuery.php
+ORDERS = {
+    'created': 'order-created',
+    'modified': 'order-modified',
+}
+
 
 # Enumerate some of the fields that Differential expects to be able fill out
 # based on commit messages, these are accepted by create_revision and
@@ -349,9 +356,27 @@ def create_revision(conduit, diffId, fields):
 
 def query(
         conduit,
-        ids=None):  # list(uint)
+        ids=None,  # list(uint)
+        order=None,
+        limit=None,
+        offset=None):
+    """Return a list of QueryResponse for the revisions matching the query.
+
+    :conduit: supports call()
+    :ids: a list of specific revision ids to restrict the query to
+    :order: one of ORDERS to impose an ordering on results, newest first
+    :limit: int limit of results to return, defaults to server value if None
+    :offset: int offset into the list of results to return
+    :returns: a list of QueryResponse
+
+    """
     # TODO: typechecking
-    d = phlsys_dictutil.copy_dict_no_nones({'ids': ids})
+    d = phlsys_dictutil.copy_dict_no_nones({
+        'ids': ids,
+        'order': order,
+        'limit': limit,
+        'offset': offset,
+    })
     response = conduit.call("differential.query", d)
     query_response_list = []
     for r in response:
@@ -8,12 +8,20 @@
 #   ReviewStateCache
 #    .get_status
 #    .get_date_modified
+#    .get_author_phid
+#    .get_known_author_phids
 #    .refresh_active_reviews
+#    .watch_reviews
+#    .prefetch_reviews
+#    .pop_changed_reviews
+#    .load
+#    .dump
 #    .set_conduit
 #    .clear_conduit
 #
 # Public Functions:
 #   make_revision_list_status_callable
+#   make_modified_since_callable
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -22,9 +30,30 @@
 from __future__ import absolute_import
 
 import collections
+import json
+import time
 
 import phlcon_differential
 
+# don't ask for too many reviews in one query, keep the requests manageable
+_MAX_QUERY_REVIEWS = 100
+
+# don't bother catching up with a saved cache that is older than this, it's
+# likely to be cheaper to start afresh
+_MAX_LOAD_AGE_SECS = 24 * 60 * 60
+
+# allow for the clocks of this machine and the Phabricator instance differing
+# when catching up with changes since the cache was last refreshed
+_CLOCK_SKEW_MARGIN_SECS = 10 * 60
+
+# if the cache hasn't been refreshed for this long then there may be many
+# modified reviews to page through, it's likely cheaper to refresh them all
+_MAX_INCREMENTAL_AGE_SECS = 60 * 60
+
+# when refreshing incrementally, forget reviews which haven't been accessed
+# for this many refreshes
+_MAX_IDLE_REFRESHES = 10
+
 
 class ReviewStateCache(object):
 
@@ -38,17 +67,42 @@ class ReviewStateCache(object):
     def get_date_modified(self, review_id):
         return self._cache.get_date_modified(review_id)
 
+    def get_author_phid(self, review_id):
+        return self._cache.get_author_phid(review_id)
+
+    def get_known_author_phids(self):
+        return self._cache.get_known_author_phids()
+
     def refresh_active_reviews(self):
         self._cache.refresh_active_reviews()
 
+    def watch_reviews(self, review_id_list):
+        self._cache.watch_reviews(review_id_list)
+
+    def prefetch_reviews(self, review_id_list):
+        self._cache.prefetch_reviews(review_id_list)
+
+    def pop_changed_reviews(self, review_id_list):
+        return self._cache.pop_changed_reviews(review_id_list)
+
+    def load(self, f):
+        self._cache.load(f)
+
+    def dump(self, f):
+        self._cache.dump(f)
+
     def set_conduit(self, conduit):
         assert conduit
         self._cache.set_revision_list_status_callable(
             make_revision_list_status_callable(
                 conduit))
+        self._cache.set_modified_since_callable(
+            make_modified_since_callable(
+                conduit))
 
     def clear_conduit(self):
         self._cache.clear_revision_list_status_callable()
+        self._cache.clear_modified_since_callable()
 
 
 def make_revision_list_status_callable(conduit):
@@ -59,9 +113,33 @@ def make_revision_list_status_callable(conduit):
     return revision_list_status
 
 
+def make_modified_since_callable(conduit):
+
+    def modified_since(timestamp):
+        # page through the revisions, most recently modified first, until we
+        # reach revisions which are older than 'timestamp'
+        modified = []
+        offset = 0
+        while True:
+            responses = phlcon_differential.query(
+                conduit,
+                order=phlcon_differential.ORDERS['modified'],
+                limit=_MAX_QUERY_REVIEWS,
+                offset=offset)
+            for r in responses:
+                if float(r.dateModified) < timestamp:
+                    return modified
+                modified.append(r)
+            if len(responses) < _MAX_QUERY_REVIEWS:
+                return modified
+            offset += len(responses)
+
+    return modified_since
+
+
 _ReviewState = collections.namedtuple(
     'phlcon_reviewstatecache__ReviewState',
-    ['status', 'date_modified'])
+    ['status', 'date_modified', 'author_phid'])
 
 
 class _ReviewStateCache(object):
@@ -70,19 +148,29 @@ class _ReviewStateCache(object):
         super(_ReviewStateCache, self).__init__()
         self._review_to_state = {}
         self._active_reviews = set()
+        self._changed_reviews = set()
+        self._refresh_time = None
+        self._refresh_count = 0
+        self._review_to_last_active = {}
         self._revision_list_status_callable = None
+        self._modified_since_callable = None
 
     def _make_state(self, response):
-        return _ReviewState(response.status, response.dateModified)
+        return _ReviewState(
+            response.status, response.dateModified, response.authorPHID)
 
     def _get_state(self, review_id):
         assert self._revision_list_status_callable
-        if review_id not in self._review_to_state:
+
+        # N.B. the map may be replaced by a refresh in another thread, so
+        #      make sure we work with the same one throughout
+        review_to_state = self._review_to_state
+        if review_id not in review_to_state:
             response = self._revision_list_status_callable([review_id])[0]
-            self._review_to_state[review_id] = self._make_state(response)
+            review_to_state[review_id] = self._make_state(response)
 
         self._active_reviews.add(review_id)
-        return self._review_to_state[review_id]
+        return review_to_state[review_id]
 
     def get_status(self, review_id):
         return self._get_state(review_id).status
@@ -90,16 +178,207 @@ class _ReviewStateCache(object):
     def get_date_modified(self, review_id):
         return self._get_state(review_id).date_modified
 
+    def get_author_phid(self, review_id):
+        return self._get_state(review_id).author_phid
+
+    def get_known_author_phids(self):
+        """Return the set of author PHIDs of the reviews currently cached.
+
+        This is useful for fetching the details of the authors in a batch
+        before they're needed.
+
+        :returns: a set of string PHIDs
+
+        """
+        review_to_state = self._review_to_state
+        return set(state.author_phid for state in review_to_state.values())
+
     def refresh_active_reviews(self):
+        """Bring the cached state of reviews up to date.
+
+        If possible, only the reviews which were modified since the last
+        refresh are queried and merged into the cache, reviews which haven't
+        been accessed for a number of refreshes are forgotten.
+
+        Otherwise all the reviews which were accessed since the last refresh
+        are queried and the rest are forgotten.
+
+        :returns: None
+
+        """
         assert self._revision_list_status_callable
-        self._review_to_state = {}
-        if self._active_reviews:
-            responses = self._revision_list_status_callable(
-                list(self._active_reviews))
-            self._review_to_state = {
-                r.id: self._make_state(r) for r in responses
-            }
-            self._active_reviews = set()
+        refresh_time = time.time()
+        self._refresh_count += 1
+
+        # N.B. reviews may be accessed by other threads while we refresh,
+        #      make sure we don't lose track of those
+        active_reviews = self._active_reviews
+        self._active_reviews = set()
+
+        is_incremental = (
+            self._modified_since_callable is not None and
+            self._refresh_time is not None and
+            refresh_time - self._refresh_time < _MAX_INCREMENTAL_AGE_SECS)
+
+        if is_incremental:
+            self._refresh_incrementally(active_reviews)
+        else:
+            self._refresh_all(active_reviews)
+
+        self._refresh_time = refresh_time
+
+    def _refresh_all(self, active_reviews):
+        old_review_to_state = self._review_to_state
+        review_to_state = {}
+        if active_reviews:
+            responses = self._query_in_chunks(list(active_reviews))
+            review_to_state = {r.id: self._make_state(r) for r in responses}
+        self._review_to_state = review_to_state
+        self._review_to_last_active = {
+            r: self._refresh_count for r in review_to_state
+        }
+
+        # remember which of the reviews we knew about have changed state, so
+        # that interested parties can find out later
+        for review_id, state in review_to_state.iteritems():
+            old_state = old_review_to_state.get(review_id)
+            if old_state is not None and old_state != state:
+                self._changed_reviews.add(review_id)
+
+    def _refresh_incrementally(self, active_reviews):
+        review_to_state = self._review_to_state
+        review_to_last_active = self._review_to_last_active
+
+        for review_id in active_reviews:
+            review_to_last_active[review_id] = self._refresh_count
+
+        # forget the reviews that nobody is interested in anymore
+        oldest_allowed = self._refresh_count - _MAX_IDLE_REFRESHES
+        for review_id, last_active in review_to_last_active.items():
+            if last_active < oldest_allowed:
+                del review_to_last_active[review_id]
+                review_to_state.pop(review_id, None)
+
+        since = self._refresh_time - _CLOCK_SKEW_MARGIN_SECS
+        for response in self._modified_since_callable(since):
+            old_state = review_to_state.get(response.id)
+            if old_state is not None:
+                state = self._make_state(response)
+                review_to_state[response.id] = state
+                if old_state != state:
+                    self._changed_reviews.add(response.id)
+
+        # watched reviews may not have been queried yet
+        missing = [r for r in active_reviews if r not in review_to_state]
+        for response in self._query_in_chunks(missing):
+            review_to_state[response.id] = self._make_state(response)
+
+    def watch_reviews(self, review_id_list):
+        """Refresh the supplied reviews on the next refresh, without querying.
+
+        This is useful for keeping track of changes to reviews which are not
+        otherwise accessed between refreshes.
+
+        :review_id_list: a list of review ids to refresh next time
+        :returns: None
+
+        """
+        self._active_reviews.update(review_id_list)
+
+    def prefetch_reviews(self, review_id_list):
+        """Query the state of all the supplied reviews that aren't cached.
+
+        This is useful for avoiding many queries for single reviews when the
+        reviews are subsequently accessed one-by-one.
+
+        Reviews which don't exist are ignored here, they will be reported as
+        usual when accessed.
+
+        :review_id_list: a list of review ids to fetch
+        :returns: None
+
+        """
+        assert self._revision_list_status_callable
+        review_to_state = self._review_to_state
+        missing = [r for r in set(review_id_list) if r not in review_to_state]
+        if missing:
+            for response in self._query_in_chunks(missing):
+                review_to_state[response.id] = self._make_state(response)
+        self._active_reviews.update(review_id_list)
+
+    def _query_in_chunks(self, review_id_list):
+        responses = []
+        for i in xrange(0, len(review_id_list), _MAX_QUERY_REVIEWS):
+            chunk = review_id_list[i:i + _MAX_QUERY_REVIEWS]
+            responses.extend(self._revision_list_status_callable(chunk))
+        return responses
+
+    def pop_changed_reviews(self, review_id_list):
+        """Return the set of reviews from the list which changed on refresh.
+
+        The returned reviews are forgotten, they will not be returned from
+        subsequent calls unless they change again on a later refresh.
+
+        :review_id_list: a list of review ids to check for changes
+        :returns: the set of review ids which changed since last popped
+
+        """
+        changed = self._changed_reviews.intersection(review_id_list)
+        self._changed_reviews -= changed
+        return changed
+
+    def load(self, f):
+        """Load states from the supplied file pointer, as saved by 'dump'.
+
+        Saved states which have changed since they were dumped will be updated
+        by querying the revisions which have been modified since then.
+
+        If the saved states are too old to be worth catching up with then
+        nothing is loaded.
+
+        :f: a text file pointer to load from
+        :returns: None
+
+        """
+        assert self._modified_since_callable
+        data = json.load(f)
+        refresh_time = data['refresh_time']
+        now = time.time()
+        if refresh_time is None or now - refresh_time > _MAX_LOAD_AGE_SECS:
+            return
+
+        review_to_state = dict(
+            (int(k), _ReviewState(*v)) for k, v in data['reviews'].iteritems())
+
+        if review_to_state:
+            since = refresh_time - _CLOCK_SKEW_MARGIN_SECS
+            for response in self._modified_since_callable(since):
+                if response.id in review_to_state:
+                    review_to_state[response.id] = self._make_state(response)
+
+        self._review_to_state = review_to_state
+        self._review_to_last_active = {
+            r: self._refresh_count for r in review_to_state
+        }
+        self._refresh_time = now
+
+    def dump(self, f):
+        """Dump states to the supplied file pointer.
+
+        :f: a text file pointer to dump to
+        :returns: None
+
+        """
+        # N.B. the map may be replaced by a refresh in another thread, so
+        #      make sure we work with the same one throughout
+        review_to_state = self._review_to_state
+        json.dump(
+            {
+                'refresh_time': self._refresh_time,
+                'reviews': dict(
+                    (str(k), list(v)) for k, v in review_to_state.items()),
+            },
+            f)
 
     def set_revision_list_status_callable(self, status_callable):
         self._revision_list_status_callable = status_callable
@@ -108,6 +387,13 @@ class _ReviewStateCache(object):
     def clear_revision_list_status_callable(self):
         self._revision_list_status_callable = None
 
+    def set_modified_since_callable(self, modified_since_callable):
+        self._modified_since_callable = modified_since_callable
+        assert self._modified_since_callable
+
+    def clear_modified_since_callable(self):
+        self._modified_since_callable = None
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
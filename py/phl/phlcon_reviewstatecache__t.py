@@ -18,17 +18,35 @@
 # [ D] _ReviewStateCache retrieves statuses for reviews not queried before
 # [ D] _ReviewStateCache does not callable when queried for cached query
 # [ D] _ReviewStateCache returns correct value when retrieving cached
+# [ D] _ReviewStateCache reports the authors of cached reviews
+# [ E] _ReviewStateCache refreshes watched reviews without querying first
+# [ E] _ReviewStateCache reports reviews which changed state on refresh
+# [ E] _ReviewStateCache does not report changed reviews twice
+# [ F] _ReviewStateCache prefetches uncached reviews in chunks
+# [ F] _ReviewStateCache doesn't query prefetched reviews again
+# [ F] _ReviewStateCache refreshes prefetched reviews
+# [ G] _ReviewStateCache loads dumped states without querying them
+# [ G] _ReviewStateCache catches up with changes since dumping
+# [ G] _ReviewStateCache ignores dumped states which are too old
+# [ H] _ReviewStateCache only queries modified reviews incrementally
+# [ H] _ReviewStateCache forgets reviews not accessed for a while
 #------------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
 # [ B] test_B_AssertIfNoQueryableSupplied
 # [ C] test_C_RefreshBeforeGet
 # [ D] test_D_InvalidationRules
+# [ E] test_E_WatchChangedReviews
+# [ F] test_F_PrefetchReviews
+# [ G] test_G_DumpLoad
+# [ H] test_H_IncrementalRefresh
 #==============================================================================
 
 from __future__ import absolute_import
 
 import collections
+import json
+import StringIO
 import unittest
 
 import phldef_conduit
@@ -40,7 +58,7 @@ import phlcon_reviewstatecache
 
 FakeResult = collections.namedtuple(
     'phlcon_reviewstatecache__t_FakeResult',
-    ['id', 'status', 'dateModified'])
+    ['id', 'status', 'dateModified', 'authorPHID'])
 
 
 class Test(unittest.TestCase):
@@ -184,7 +202,7 @@ class Test(unittest.TestCase):
             expected_queries[:] = expected_queries[1:]
 
             return [
-                FakeResult(r, str(r) + 'r', str(r) + 'd')
+                FakeResult(r, str(r) + 'r', str(r) + 'd', str(r) + 'a')
                 for r in actual_revision_list
             ]
 
@@ -209,6 +227,179 @@ class Test(unittest.TestCase):
         for revision in revision_list:
             result = cache_impl.get_status(revision)
             self.assertEqual(result, str(revision) + 'r')
+            result = cache_impl.get_author_phid(revision)
+            self.assertEqual(result, str(revision) + 'a')
+
+        # [ D] _ReviewStateCache reports the authors of cached reviews
+        self.assertSetEqual(
+            cache_impl.get_known_author_phids(),
+            set(str(r) + 'a' for r in revision_list))
+
+    def test_E_WatchChangedReviews(self):
+        revision_list = [101, 1337, 404]
+        revision_to_status = {r: 'needs review' for r in revision_list}
+        queries = []
+
+        def fake_callable(actual_revision_list):
+            queries.append(set(actual_revision_list))
+            return [
+                FakeResult(r, revision_to_status[r], 'd', 'a')
+                for r in actual_revision_list
+            ]
+
+        cache_impl = phlcon_reviewstatecache._ReviewStateCache()
+        cache_impl.set_revision_list_status_callable(fake_callable)
+
+        # [ E] _ReviewStateCache refreshes watched reviews without querying
+        cache_impl.watch_reviews(revision_list)
+        self.assertListEqual([], queries)
+        cache_impl.refresh_active_reviews()
+        self.assertListEqual([set(revision_list)], queries)
+        self.assertSetEqual(
+            set(), cache_impl.pop_changed_reviews(revision_list))
+
+        # [ E] _ReviewStateCache reports reviews which changed state
+        revision_to_status[1337] = 'accepted'
+        cache_impl.watch_reviews(revision_list)
+        cache_impl.refresh_active_reviews()
+        self.assertSetEqual(set(), cache_impl.pop_changed_reviews([101]))
+        self.assertSetEqual(
+            set([1337]), cache_impl.pop_changed_reviews(revision_list))
+        self.assertEqual('accepted', cache_impl.get_status(1337))
+
+        # [ E] _ReviewStateCache does not report changed reviews twice
+        self.assertSetEqual(
+            set(), cache_impl.pop_changed_reviews(revision_list))
+
+    def test_F_PrefetchReviews(self):
+        revision_list = range(250)
+        queries = []
+
+        def fake_callable(actual_revision_list):
+            queries.append(list(actual_revision_list))
+            return [
+                FakeResult(r, 'needs review', 'd', 'a')
+                for r in actual_revision_list
+                if r != 404
+            ]
+
+        cache_impl = phlcon_reviewstatecache._ReviewStateCache()
+        cache_impl.set_revision_list_status_callable(fake_callable)
+        cache_impl.get_status(0)
+        del queries[:]
+
+        # [ F] _ReviewStateCache prefetches uncached reviews in chunks
+        cache_impl.prefetch_reviews(revision_list + [404])
+        self.assertEqual(3, len(queries))
+        self.assertSetEqual(
+            set(revision_list[1:] + [404]), set(sum(queries, [])))
+
+        # [ F] _ReviewStateCache doesn't query prefetched reviews again
+        del queries[:]
+        for revision in revision_list:
+            cache_impl.get_status(revision)
+        self.assertListEqual([], queries)
+
+        # [ F] _ReviewStateCache refreshes prefetched reviews
+        cache_impl.refresh_active_reviews()
+        self.assertSetEqual(
+            set(revision_list + [404]), set(sum(queries, [])))
+
+    def test_G_DumpLoad(self):
+        revision_list = [101, 1337, 404]
+        revision_to_status = {r: 'needs review' for r in revision_list}
+        since_list = []
+
+        def fake_callable(actual_revision_list):
+            return [
+                FakeResult(r, revision_to_status[r], 'd', 'a')
+                for r in actual_revision_list
+            ]
+
+        def raise_callable(revision_list):
+            _ = revision_list  # NOQA
+            raise Exception("shouldn't get here")
+
+        def fake_modified_since(timestamp):
+            since_list.append(timestamp)
+            return [FakeResult(1337, 'accepted', 'd2', 'a')]
+
+        cache_impl = phlcon_reviewstatecache._ReviewStateCache()
+        cache_impl.set_revision_list_status_callable(fake_callable)
+        cache_impl.prefetch_reviews(revision_list)
+        cache_impl.refresh_active_reviews()
+
+        f = StringIO.StringIO()
+        cache_impl.dump(f)
+
+        # [ G] _ReviewStateCache loads dumped states without querying them
+        # [ G] _ReviewStateCache catches up with changes since dumping
+        loaded_impl = phlcon_reviewstatecache._ReviewStateCache()
+        loaded_impl.set_revision_list_status_callable(raise_callable)
+        loaded_impl.set_modified_since_callable(fake_modified_since)
+        loaded_impl.load(StringIO.StringIO(f.getvalue()))
+        self.assertEqual(1, len(since_list))
+        self.assertEqual('needs review', loaded_impl.get_status(101))
+        self.assertEqual('accepted', loaded_impl.get_status(1337))
+        self.assertEqual('d2', loaded_impl.get_date_modified(1337))
+
+        # [ G] _ReviewStateCache ignores dumped states which are too old
+        data = json.loads(f.getvalue())
+        data['refresh_time'] -= 7 * 24 * 60 * 60
+        old_impl = phlcon_reviewstatecache._ReviewStateCache()
+        old_impl.set_revision_list_status_callable(raise_callable)
+        old_impl.set_modified_since_callable(fake_modified_since)
+        old_impl.load(StringIO.StringIO(json.dumps(data)))
+        self.assertEqual(1, len(since_list))
+        self.assertRaises(Exception, old_impl.get_status, 101)
+
+    def test_H_IncrementalRefresh(self):
+        revision_list = [101, 1337, 404]
+        revision_to_status = {r: 'needs review' for r in revision_list}
+        modified = []
+        queries = []
+
+        def fake_callable(actual_revision_list):
+            queries.append(set(actual_revision_list))
+            return [
+                FakeResult(r, revision_to_status[r], 'd', 'a')
+                for r in actual_revision_list
+            ]
+
+        def fake_modified_since(timestamp):
+            _ = timestamp  # NOQA
+            return [
+                FakeResult(r, revision_to_status[r], 'd', 'a')
+                for r in modified
+            ]
+
+        cache_impl = phlcon_reviewstatecache._ReviewStateCache()
+        cache_impl.set_revision_list_status_callable(fake_callable)
+        cache_impl.set_modified_since_callable(fake_modified_since)
+        cache_impl.prefetch_reviews(revision_list)
+        cache_impl.refresh_active_reviews()
+        del queries[:]
+
+        # [ H] _ReviewStateCache only queries modified reviews incrementally
+        revision_to_status[1337] = 'accepted'
+        modified[:] = [1337]
+        cache_impl.refresh_active_reviews()
+        self.assertListEqual([], queries)
+        self.assertEqual('accepted', cache_impl.get_status(1337))
+        self.assertEqual('needs review', cache_impl.get_status(101))
+        self.assertSetEqual(
+            set([1337]), cache_impl.pop_changed_reviews(revision_list))
+
+        # [ H] _ReviewStateCache forgets reviews not accessed for a while
+        del modified[:]
+        for _ in xrange(phlcon_reviewstatecache._MAX_IDLE_REFRESHES + 1):
+            cache_impl.get_status(101)
+            cache_impl.refresh_active_reviews()
+        self.assertListEqual([], queries)
+        cache_impl.get_status(101)
+        self.assertListEqual([], queries)
+        cache_impl.get_status(404)
+        self.assertListEqual([set([404])], queries)
 
 
 #------------------------------------------------------------------------------
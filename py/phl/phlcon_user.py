@@ -9,11 +9,22 @@
 #    .add_hint
 #    .add_hint_list
 #    .get_phid
+#   PhidUsernameCache
+#    .add_hint
+#    .add_hint_list
+#    .get_username
+#   EmailUserCache
+#    .get
+#    .put
+#    .clear
 #
 # Public Functions:
+#   get_email_user_cache
 #   is_no_such_error
 #   query_user_from_email
 #   query_users_from_emails
+#   query_cached_user_list_from_emails
+#   query_user_dict_from_emails
 #   query_users_from_phids
 #   query_users_from_usernames
 #   query_usernames_from_phids
@@ -29,15 +40,22 @@
 
 from __future__ import absolute_import
 
+import threading
+import time
+
 import phlsys_conduit
 import phlsys_namedtuple
 
+# users don't often change their email addresses, it's ok to remember the
+# results of email lookups for a while
+_EMAIL_CACHE_TTL_SECS = 10 * 60
+
 
 QueryResponse = phlsys_namedtuple.make_named_tuple(
     'phlcon_user__QueryResponse',
     required=['phid', 'userName', 'realName', 'image', 'uri', 'roles'],
     defaults={},
-    ignored=['currentStatus', 'currentStatusUntil'])
+    ignored=['currentStatus', 'currentStatusUntil', 'primaryEmail'])
 
 
 class UserPhidCache(object):
@@ -72,6 +90,114 @@ class UserPhidCache(object):
         return self._user_to_phid[user]
 
 
+class PhidUsernameCache(object):
+
+    """Efficiently retrieve the username for specified PHIDs."""
+
+    def __init__(self, conduit):
+        """Construct a cache attached to the specified 'conduit'."""
+        super(PhidUsernameCache, self).__init__()
+        self._phid_to_user = {}
+        self._hinted_phids = set()
+        self._conduit = conduit
+        self._lock = threading.Lock()
+
+    def add_hint(self, phid):
+        """Register 'phid' as a user PHID we'll later query."""
+        with self._lock:
+            if phid not in self._phid_to_user:
+                self._hinted_phids.add(phid)
+
+    def add_hint_list(self, phid_list):
+        """Register all 'phid_list' as user PHIDs we'll later query."""
+        for phid in phid_list:
+            self.add_hint(phid)
+
+    def get_username(self, phid):
+        """Return the username for the specified 'phid'."""
+        self.add_hint(phid)
+        with self._lock:
+            if phid not in self._phid_to_user:
+                hinted_phids = list(self._hinted_phids)
+                results = make_phid_username_dict(self._conduit, hinted_phids)
+                if results is None:
+                    # one of the hints must be invalid, just get this one
+                    results = make_phid_username_dict(self._conduit, [phid])
+                self._phid_to_user.update(results)
+                self._hinted_phids = set()
+            return self._phid_to_user[phid]
+
+
+class EmailUserCache(object):
+
+    """Remember the users corresponding to email addresses, for a while.
+
+    The cache is thread-safe, so that it may be shared by all the conduits in
+    the process. Unknown emails are remembered as well as known ones.
+
+    """
+
+    def __init__(self, ttl_secs):
+        """Construct an empty cache which remembers entries for 'ttl_secs'."""
+        super(EmailUserCache, self).__init__()
+        self._ttl_secs = ttl_secs
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._next_sweep = 0
+
+    def get(self, conduit_uri, email):
+        """Return a (is_found, user) tuple for the supplied 'email'.
+
+        :conduit_uri: the string uri of the conduit the user was fetched from
+        :email: the string email address of the user
+        :returns: a (bool, QueryResponse or None) tuple
+
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((conduit_uri, email))
+            if entry is not None:
+                expiry, user = entry
+                if expiry > now:
+                    return True, user
+                del self._entries[(conduit_uri, email)]
+        return False, None
+
+    def put(self, conduit_uri, email, user):
+        """Remember that 'email' corresponds to 'user'.
+
+        :conduit_uri: the string uri of the conduit the user was fetched from
+        :email: the string email address of the user
+        :user: the QueryResponse for the user, or None if there isn't one
+        :returns: None
+
+        """
+        now = time.time()
+        with self._lock:
+            self._entries[(conduit_uri, email)] = (now + self._ttl_secs, user)
+            if now >= self._next_sweep:
+                self._entries = dict(
+                    (k, v) for k, v in self._entries.iteritems() if v[0] > now)
+                self._next_sweep = now + self._ttl_secs
+
+    def clear(self):
+        """Forget all the entries in the cache."""
+        with self._lock:
+            self._entries = {}
+
+
+_EMAIL_USER_CACHE = EmailUserCache(_EMAIL_CACHE_TTL_SECS)
+
+
+def get_email_user_cache():
+    """Return the EmailUserCache which is shared within this process.
+
+    :returns: an EmailUserCache
+
+    """
+    return _EMAIL_USER_CACHE
+
+
 def is_no_such_error(e):
     """Return True if the supplied ConduitException is due to unknown user.
 
@@ -119,19 +245,114 @@ def query_users_from_emails(conduit, emails):
     If an email does not correspond to a username then None is inserted in
     its place.
 
-    :conduit: must support 'call()' like phlsys_conduit
+    Results are remembered in the process-wide EmailUserCache for a while.
+
+    :conduit: must support 'call()' and 'conduit_uri' like phlsys_conduit
     :emails: a list of strings corresponding to user email addresses
     :returns: a list of strings corresponding to Phabricator usernames
 
     """
-    users = []
-    for e in emails:
-        u = query_user_from_email(conduit, e)
-        if u is not None:
-            users.append(u.userName)
-        else:
-            users.append(None)
-    return users
+    users = query_cached_user_list_from_emails(conduit, emails)
+    return [u.userName if u is not None else None for u in users]
+
+
+def query_cached_user_list_from_emails(conduit, emails):
+    """Return a list of QueryResponse based on the provided emails.
+
+    If an email does not correspond to a user then None is inserted in its
+    place.
+
+    Results are remembered in the process-wide EmailUserCache for a while,
+    the emails which aren't in the cache are looked up together with
+    'query_user_dict_from_emails'.
+
+    :conduit: must support 'call()' and 'conduit_uri' like phlsys_conduit
+    :emails: a list of strings corresponding to user email addresses
+    :returns: a list of QueryResponse or None
+
+    """
+    cache = get_email_user_cache()
+    uri = conduit.conduit_uri
+
+    email_to_user = {}
+    for email in emails:
+        is_found, user = cache.get(uri, email)
+        if is_found:
+            email_to_user[email] = user
+
+    missing = [e for e in set(emails) if e not in email_to_user]
+    if missing:
+        fetched = query_user_dict_from_emails(conduit, missing)
+        for email, user in fetched.iteritems():
+            cache.put(uri, email, user)
+        email_to_user.update(fetched)
+
+    return [email_to_user[e] for e in emails]
+
+
+def query_user_dict_from_emails(conduit, emails):
+    """Return a dict of email to QueryResponse based on the provided emails.
+
+    If an email does not correspond to a user then it maps to None.
+
+    All the emails are looked up in a single 'user.query'. Users are matched
+    to emails by their 'primaryEmail', where the response has it. If every
+    user in the response is accounted for then the remaining emails have no
+    user. Otherwise a user was found by an email we can't see, so only the
+    remaining emails are looked up individually.
+
+    :conduit: must support 'call()' like phlsys_conduit
+    :emails: a list of strings corresponding to user email addresses
+    :returns: a dict of email strings to QueryResponse or None
+
+    """
+    emails = list(set(emails))
+    if not emails:
+        return {}
+
+    d = {"emails": emails, "limit": len(emails)}
+    response = None
+    try:
+        response = conduit.call("user.query", d)
+    except phlsys_conduit.ConduitException as e:
+        if not is_no_such_error(e):
+            raise
+
+    result = dict((email, None) for email in emails)
+    if not response:
+        return result
+
+    if len(response) > len(emails):
+        raise Exception("unexpected number of entries")
+
+    if len(emails) == 1:
+        result[emails[0]] = QueryResponse(**response[0])
+        return result
+
+    # email addresses are matched case-insensitively by Phabricator
+    lower_to_emails = {}
+    for email in emails:
+        lower_to_emails.setdefault(email.lower(), []).append(email)
+
+    unattributed = set(emails)
+    is_all_attributed = True
+    for user_dict in response:
+        primary_email = user_dict.get('primaryEmail')
+        matched = []
+        if primary_email is not None:
+            matched = lower_to_emails.get(primary_email.lower(), [])
+        if not matched:
+            is_all_attributed = False
+        user = QueryResponse(**user_dict)
+        for email in matched:
+            result[email] = user
+            unattributed.discard(email)
+
+    if not is_all_attributed:
+        for email in unattributed:
+            result[email] = query_user_from_email(conduit, email)
+
+    return result
 
 
 def query_users_from_phids(conduit, phids):
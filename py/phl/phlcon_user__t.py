@@ -23,6 +23,71 @@ import phlcon_user
 #==============================================================================
 
 
+class _FakeUserQueryConduit(object):
+
+    def __init__(self, email_to_user, has_primary_email):
+        self.conduit_uri = 'fake://' + str(id(self))
+        self.calls = []
+        self._email_to_user = email_to_user
+        self._has_primary_email = has_primary_email
+
+    def call(self, method, params):
+        assert method == 'user.query'
+        self.calls.append(sorted(params['emails']))
+        response = []
+        for email, name in sorted(self._email_to_user.iteritems()):
+            if email in params['emails']:
+                user = {
+                    'phid': 'PHID-USER-' + name,
+                    'userName': name,
+                    'realName': name,
+                    'image': '',
+                    'uri': '',
+                    'roles': [],
+                }
+                if self._has_primary_email:
+                    user['primaryEmail'] = email
+                response.append(user)
+        return response
+
+
+class TestBatchedEmails(unittest.TestCase):
+
+    def test(self):
+        email_to_user = {
+            'alice@server.test': 'alice',
+            'bob@server.test': 'bob',
+        }
+        emails = ['alice@server.test', 'noone@server.test', 'bob@server.test']
+
+        # all the uncached emails are looked up in a single call
+        phlcon_user.get_email_user_cache().clear()
+        conduit = _FakeUserQueryConduit(email_to_user, True)
+        users = phlcon_user.query_users_from_emails(conduit, emails)
+        self.assertListEqual(users, ['alice', None, 'bob'])
+        self.assertListEqual(conduit.calls, [sorted(emails)])
+
+        # known and unknown emails are both remembered
+        users = phlcon_user.query_users_from_emails(conduit, emails)
+        self.assertListEqual(users, ['alice', None, 'bob'])
+        self.assertEqual(len(conduit.calls), 1)
+
+        # without 'primaryEmail' the users are matched with individual calls
+        phlcon_user.get_email_user_cache().clear()
+        conduit = _FakeUserQueryConduit(email_to_user, False)
+        users = phlcon_user.query_users_from_emails(conduit, emails)
+        self.assertListEqual(users, ['alice', None, 'bob'])
+        self.assertEqual(len(conduit.calls), 1 + len(emails))
+
+        # if no users are found then there's nothing to match
+        phlcon_user.get_email_user_cache().clear()
+        conduit = _FakeUserQueryConduit({}, False)
+        users = phlcon_user.query_users_from_emails(conduit, emails)
+        self.assertListEqual(users, [None, None, None])
+        self.assertEqual(len(conduit.calls), 1)
+        phlcon_user.get_email_user_cache().clear()
+
+
 class Test(unittest.TestCase):
 
     def __init__(self, data):
@@ -64,6 +129,25 @@ class Test(unittest.TestCase):
         self.assertEqual(len(users), 3)
         self.assertListEqual(users, [self.test_user, None, None])
 
+    def testCachedEmails(self):
+        phlcon_user.get_email_user_cache().clear()
+        emails = [self.test_email, "noone@server.invalid", self.test_email]
+        users = phlcon_user.query_cached_user_list_from_emails(
+            self.conduit, emails)
+        self.assertEqual(users[0].userName, self.test_user)
+        self.assertIsNone(users[1])
+        self.assertEqual(users[2], users[0])
+
+        is_found, user = phlcon_user.get_email_user_cache().get(
+            self.conduit.conduit_uri, self.test_email)
+        self.assertTrue(is_found)
+        self.assertEqual(user, users[0])
+
+        is_found, user = phlcon_user.get_email_user_cache().get(
+            self.conduit.conduit_uri, "noone@server.invalid")
+        self.assertTrue(is_found)
+        self.assertIsNone(user)
+
     def testAliceUsername(self):
         users = phlcon_user.query_users_from_usernames(
             self.conduit, [self.test_user])
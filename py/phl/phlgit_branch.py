@@ -19,14 +19,8 @@
 from __future__ import absolute_import
 
 
-def _cat_file_pretty(clone, objectHash):
-    return clone.call('cat-file', '-p', objectHash)
-
-
 def _get_tree(clone, commit):
-    content = _cat_file_pretty(clone, commit).splitlines()
-    tree = content[0].split("tree ")[1].strip()
-    return tree
+    return clone.get_object_info(commit + '^{tree}').hash
 
 
 def is_tree_same(clone, branch, targetBranch):
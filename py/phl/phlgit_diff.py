@@ -7,6 +7,7 @@
 # Public Functions:
 #   raw_diff_range_to_here
 #   raw_diff_range
+#   raw_diff_range_without_checkout
 #   no_index
 #   create_add_file
 #   stat_range
@@ -21,6 +22,7 @@ from __future__ import absolute_import
 import os
 import re
 
+import phlgit_mergebase
 import phlsys_fs
 import phlsys_subprocess
 
@@ -56,6 +58,53 @@ def raw_diff_range(clone, base, new, context_lines=None):
     return result
 
 
+def raw_diff_range_without_checkout(clone, base, new, context_lines=None):
+    """Return a raw diff from the history on 'new' that is not on 'base'.
+
+    The diff is the same as 'raw_diff_range' when 'new' is checked out, the
+    '.gitattributes' files on 'new' are respected.  The working tree and
+    index of 'clone' are not touched, which is much cheaper than a checkout
+    for large repositories.
+
+    This works by reading the tree of 'new' into a temporary index and
+    diffing that against the merge-base, git will read the attributes from
+    the temporary index as long as they're not in the working tree.
+
+    Raise if git returns a non-zero exit code.
+
+    :clone: the clone to operate on
+    :base: the base branch
+    :new: the branch with new commits
+    :returns: a string of the raw diff
+
+    """
+    merge_base = phlgit_mergebase.get(clone, base, new)
+
+    with phlsys_fs.tmpdir_context() as tmp_dir:
+
+        # an empty working tree, so that the attributes come from the index
+        work_tree = os.path.join(tmp_dir, 'work_tree')
+        os.mkdir(work_tree)
+
+        env = {'GIT_INDEX_FILE': os.path.join(tmp_dir, 'index')}
+        clone.call("read-tree", new, env=env)
+
+        args = [
+            "--work-tree=" + work_tree,
+            "diff",
+            "--cached",
+            merge_base,
+            "-M",  # automatically detect moves/renames
+        ]
+
+        if context_lines:
+            args.append("--unified=" + str(context_lines))
+
+        result = clone.call(*args, env=env)
+
+    return result
+
+
 def no_index(left_path, right_path, working_dir=None):
     """Return a string diff between the two paths.
 
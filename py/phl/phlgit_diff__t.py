@@ -6,10 +6,14 @@
 # cover those concerns.
 #
 # Concerns:
-# TODO
+# [ A] raw diffs contain the files changed on the fork only
+# [ B] raw diffs without checkout respect '.gitattributes' on the fork
+# [ B] raw diffs without checkout don't change the working tree or index
+# [ B] raw diffs without checkout match 'raw_diff_range' otherwise
 #------------------------------------------------------------------------------
 # Tests:
-# TODO
+# [ A] testSimpleFork
+# [ B] testWithoutCheckoutUsesNewAttributes
 #==============================================================================
 
 from __future__ import absolute_import
@@ -51,6 +55,40 @@ class Test(unittest.TestCase):
                 set(["ONLY_FORK", "ONLY_FORK2"]),
                 phlgit_diff.parse_filenames_from_raw_diff(rawDiff3))
 
+    def testWithoutCheckoutUsesNewAttributes(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+            worker.commit_new_file("add DATA", "DATA", "1\n")
+            worker.repo.call("branch", "fork")
+            worker.repo.call("checkout", "fork")
+            worker.commit_new_file(
+                "add .gitattributes", ".gitattributes", "DATA -diff\n")
+            worker.commit_append_to_file("change DATA", "DATA", "2\n")
+            worker.checkout_master()
+            worker.commit_new_file("add ONLY_MASTER", "ONLY_MASTER")
+            head = worker.repo.call("rev-parse", "HEAD")
+
+            diff = phlgit_diff.raw_diff_range_without_checkout(
+                worker.repo, "master", "fork", 1000)
+
+            # the attributes on 'fork' mean that 'DATA' is treated as binary
+            self.assertIn("Binary files a/DATA and b/DATA differ", diff)
+            self.assertNotIn("ONLY_MASTER", diff)
+
+            # the working tree and index are left alone
+            self.assertEqual(head, worker.repo.call("rev-parse", "HEAD"))
+            self.assertEqual("", worker.repo.call("status", "--porcelain"))
+
+            # without attributes, the diff is the same as 'raw_diff_range'
+            worker.repo.call("checkout", "fork")
+            worker.repo.call("rm", ".gitattributes")
+            worker.repo.call("commit", "-m", "remove .gitattributes")
+            worker.checkout_master()
+            self.assertEqual(
+                phlgit_diff.raw_diff_range(
+                    worker.repo, "master", "fork", 1000),
+                phlgit_diff.raw_diff_range_without_checkout(
+                    worker.repo, "master", "fork", 1000))
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
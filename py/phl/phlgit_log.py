@@ -12,6 +12,9 @@
 #   get_last_commit_hash_from_ref
 #   get_range_hashes
 #   make_revision_from_full_message
+#   iter_revisions_from_range
+#   iter_revisions_from_hashes
+#   make_revision_from_commit_object
 #   make_revision_from_hash
 #   make_revisions_from_hashes
 #   get_author_names_emails_from_hashes
@@ -29,6 +32,14 @@ from __future__ import absolute_import
 import collections
 import string
 
+import phlsys_git
+
+# 'git log' abbreviates hashes to at least this many characters by default
+_MIN_ABBREV_HASH_LENGTH = 7
+
+# the format expected by 'make_revision_from_full_message'
+_FULL_MESSAGE_FORMAT = "%H%n%h%n%ae%n%an%n%ce%n%cn%n%s%n%b"
+
 """NamedTuple to represent a git revision.
 
 :hash:the sha1 associated with this revision
@@ -175,20 +186,205 @@ def make_revision_from_full_message(message):
         message='\n'.join(lines[7:]))
 
 
+def iter_revisions_from_range(clone, start, end):
+    """Yield 'phlgit_log__Revision' for the commits from 'start' to 'end'.
+
+    The revisions are yielded in the same order as 'get_range_hashes', the
+    first is the revision closest to but not including 'start'.
+
+    All the revisions are retrieved with a single call to 'git log', they are
+    parsed as they are consumed.
+
+    :clone: supports 'call("log")' with git log parameters
+    :start: a reference that log will understand
+    :end: a reference that log will understand
+    :returns: an iterator of 'phlgit_log__Revision'
+
+    """
+    log = clone.call(
+        "log",
+        start + ".." + end,
+        "--reverse",
+        "-z",
+        "--format=" + _FULL_MESSAGE_FORMAT)
+    return _iter_revisions_from_log(log)
+
+
+def iter_revisions_from_hashes(clone, hashes):
+    """Yield 'phlgit_log__Revision' for each of 'hashes', in the same order.
+
+    All the revisions are retrieved with a single call to 'git log', they are
+    parsed as they are consumed.
+
+    :clone: supports 'call("log")' with git log parameters
+    :hashes: a list of strings containing the hashes to get the messages of
+    :returns: an iterator of 'phlgit_log__Revision'
+
+    """
+    if not hashes:
+        # 'git log' would show 'HEAD' if we didn't supply any revisions
+        return iter([])
+    log = clone.call(
+        "log",
+        "--stdin",
+        "--no-walk=unsorted",
+        "-z",
+        "--format=" + _FULL_MESSAGE_FORMAT,
+        stdin="\n".join(hashes) + "\n")
+    return _iter_revisions_from_log(log)
+
+
+def _iter_revisions_from_log(log):
+    # each record is terminated by a NUL, which can't appear in the fields.
+    # 'make_revision_from_full_message' expects the newline that terminates
+    # each record without '-z', so that the message is the same.
+    begin = 0
+    end = log.find('\0', begin)
+    while end != -1:
+        yield make_revision_from_full_message(log[begin:end] + '\n')
+        begin = end + 1
+        end = log.find('\0', begin)
+
+
+def make_revision_from_commit_object(commit_hash, abbrev_hash, content):
+    """Return a 'phlgit_log__Revision' from the content of a commit object.
+
+    The subject and message are split in the same way as 'git log' does for
+    '%s' and '%b'; the subject is the first paragraph with the lines joined
+    by spaces, the message is the rest with leading blank lines removed.
+
+    The result matches 'make_revision_from_full_message' for the same commit;
+    the message is re-encoded from the commit's 'encoding' header to UTF-8,
+    as 'git log' does, and lines are terminated with '\n' whatever line
+    endings the commit message used.
+
+    Usage examples:
+        >>> make_revision_from_commit_object(
+        ...     'abcdef0123', 'abcdef0',
+        ...     'tree 1234\\n'
+        ...     'author Alice <alice@server.test> 1400000000 +0000\\n'
+        ...     'committer Bob <bob@server.test> 1400000000 +0000\\n'
+        ...     '\\n'
+        ...     'Hello\\n'
+        ...     'World\\n'
+        ...     '\\n'
+        ...     'Details\\n')
+        ... # doctest: +NORMALIZE_WHITESPACE
+        phlgit_log__Revision(hash='abcdef0123', abbrev_hash='abcdef0',
+            author_email='alice@server.test', author_name='Alice',
+            committer_email='bob@server.test', committer_name='Bob',
+            subject='Hello World', message='Details\\n')
+
+    :commit_hash: the string hash of the commit
+    :abbrev_hash: the string abbreviated hash of the commit
+    :content: the string content of the commit object, from 'git cat-file'
+    :returns: a 'phlgit_log__Revision'
+
+    """
+    fields = _parse_commit_header(content)
+    encoding = fields.get('encoding')
+    if encoding is not None:
+        content = _recode_to_utf8(content, encoding)
+        fields = _parse_commit_header(content)
+    _, _, body = content.partition('\n\n')
+
+    author_name, author_email = _parse_ident(fields['author'])
+    committer_name, committer_email = _parse_ident(fields['committer'])
+
+    # split the lines in the same way as 'make_revision_from_full_message'
+    lines = body.splitlines()
+    index = _skip_blank_lines(lines, 0)
+    subject_lines = []
+    while index < len(lines) and lines[index].strip():
+        subject_lines.append(lines[index].rstrip())
+        index += 1
+    index = _skip_blank_lines(lines, index)
+    message_lines = lines[index:]
+    if message_lines:
+        # 'git log' terminates the last line of '%b'
+        message_lines.append('')
+
+    return Revision(
+        hash=commit_hash,
+        abbrev_hash=abbrev_hash,
+        author_email=author_email,
+        author_name=author_name,
+        committer_email=committer_email,
+        committer_name=committer_name,
+        subject=' '.join(subject_lines),
+        message='\n'.join(message_lines))
+
+
+def _parse_commit_header(content):
+    header, _, _ = content.partition('\n\n')
+    fields = {}
+    for line in header.split('\n'):
+        if line.startswith(' '):
+            # continuation of a multi-line header, e.g. 'gpgsig'
+            continue
+        key, _, value = line.partition(' ')
+        fields.setdefault(key, value)
+    return fields
+
+
+def _recode_to_utf8(content, encoding):
+    # 'git log' re-encodes messages to UTF-8 by default, if the encoding isn't
+    # known or the content isn't valid in it then it's left as it is
+    try:
+        return content.decode(encoding).encode('utf-8')
+    except (LookupError, UnicodeError):
+        return content
+
+
+def _parse_ident(ident):
+    # e.g. 'Alice <alice@server.test> 1400000000 +0000'
+    email_begin = ident.index('<')
+    email_end = ident.rindex('>')
+    name = ident[:email_begin].strip()
+    email = ident[email_begin + 1:email_end]
+    return name, email
+
+
+def _skip_blank_lines(lines, index):
+    while index < len(lines) and not lines[index].strip():
+        index += 1
+    return index
+
+
+def _abbreviate_hash(clone, commit_hash):
+    # find the shortest unique prefix of at least 7 characters, as 'git log'
+    # would for '%h'
+    for length in xrange(_MIN_ABBREV_HASH_LENGTH, len(commit_hash)):
+        prefix = commit_hash[:length]
+        try:
+            if clone.get_object_info(prefix).hash == commit_hash:
+                return prefix
+        except phlsys_git.ObjectNotFoundError:
+            # the prefix is ambiguous
+            pass
+    return commit_hash
+
+
 def make_revision_from_hash(clone, commitHash):
     """Return a 'phlgit_log__Revision' based on 'commitHash' from the clone.
     Raise an exception if the clone does not return a valid FullMessage from
     the commitHash.
 
-    :clone: something that supports "call()" with git commands
+    The commit is read with the clone's long-lived 'git cat-file' process, so
+    that no new processes are started.
+
+    :clone: supports 'read_object()' and 'get_object_info()' like phlsys_git
     :commitHash: a string containing the hash to get the message of
     :returns: a 'phlgit_log__Revision' based on the 'commitHash'
 
     """
-    fmt = "%H%n%h%n%ae%n%an%n%ce%n%cn%n%s%n%b"
-    fullMessage = clone.call("log", commitHash + "^!", "--format=" + fmt)
-    revision = make_revision_from_full_message(fullMessage)
-    return revision
+    commit = clone.read_object(commitHash)
+    if commit.type != 'commit':
+        raise ValueError(
+            "{} is a {}, not a commit".format(commitHash, commit.type))
+    abbrev_hash = _abbreviate_hash(clone, commit.hash)
+    return make_revision_from_commit_object(
+        commit.hash, abbrev_hash, commit.content)
 
 
 def make_revisions_from_hashes(clone, hashes):
@@ -197,7 +393,7 @@ def make_revisions_from_hashes(clone, hashes):
     Raise an exception if the clone does not return a valid FullMessage
     from any of 'hashes'.
 
-    :clone: something that supports "call()" with git commands
+    :clone: supports 'read_object()' and 'get_object_info()' like phlsys_git
     :returns: a list of 'phlgit_log__Revision'
 
     """
@@ -216,12 +412,12 @@ def get_author_names_emails_from_hashes(clone, hashes):
     Raise an exception if the clone does not return a valid FullMessage from
     the commitHash.
 
-    :clone: something that supports "call()" with git commands
+    :clone: supports 'call("log")' with git log parameters
     :hashes: a list of strings containing the hashes to get the messages of
     :returns: a list of unique committer emails in commit order from 'start..'
 
     """
-    revisions = make_revisions_from_hashes(clone, hashes)
+    revisions = iter_revisions_from_hashes(clone, hashes)
     observedEmails = set()
     uniqueAuthors = []
     for r in revisions:
@@ -128,6 +128,76 @@ class Test(unittest.TestCase):
         self.assertEqual(len(committers), 1)
         self.assertEqual(committers[0], (self.authorName, self.authorEmail))
 
+    def testRevisionMatchesLog(self):
+        self._createCommitNewFile("README")
+        self._createCommitNewFile(
+            "README2", "MULTI\nLINE SUBJECT", "\nBODY\n\nMORE BODY")
+        fmt = "%H%n%h%n%ae%n%an%n%ce%n%cn%n%s%n%b"
+        for ref in ["HEAD", "HEAD~1"]:
+            commit_hash = phlgit_log.get_last_commit_hash_from_ref(
+                self.clone, ref)
+            expected = phlgit_log.make_revision_from_full_message(
+                self.clone.call("log", commit_hash + "^!", "--format=" + fmt))
+            revision = phlgit_log.make_revision_from_hash(
+                self.clone, commit_hash)
+            self.assertEqual(revision, expected)
+
+    def testRevisionMatchesLogForRawMessages(self):
+        self._createCommitNewFile("README")
+        tree = self.clone.call("write-tree").strip()
+        fmt = "%H%n%h%n%ae%n%an%n%ce%n%cn%n%s%n%b"
+
+        def check(encoding, message, subject, body):
+            commit_hash = self.clone.call(
+                "-c", "i18n.commitEncoding=" + encoding,
+                "commit-tree", tree, "-p", "HEAD",
+                stdin=message).strip()
+            expected = phlgit_log.make_revision_from_full_message(
+                self.clone.call("log", commit_hash + "^!", "--format=" + fmt))
+            revision = phlgit_log.make_revision_from_hash(
+                self.clone, commit_hash)
+            self.assertEqual(revision, expected)
+            self.assertEqual(revision.subject, subject)
+            self.assertEqual(revision.message, body)
+
+        # CRLF line endings
+        check(
+            "UTF-8",
+            "MULTI\r\nLINE\r\n\r\nBODY\r\nMORE\r\n",
+            "MULTI LINE",
+            "BODY\nMORE\n")
+
+        # messages are re-encoded to UTF-8
+        check(
+            "iso-8859-1",
+            "CAF\xc9\n\nD\xc9J\xc0 VU\n",
+            "CAF\xc3\x89",
+            "D\xc3\x89J\xc3\x80 VU\n")
+
+    def testIterRevisions(self):
+        self._createCommitNewFile("README")
+        self.clone.call("branch", "fork")
+        self._createCommitNewFile("ONE", "ONE", "BODY\nBODY")
+        self._createCommitNewFile("TWO", "MULTI\nLINE", "\n\nBODY\n\n")
+        self._createCommitNewFile("THREE")
+
+        hashes = phlgit_log.get_range_hashes(self.clone, "fork", "master")
+        expected = [
+            phlgit_log.make_revision_from_hash(self.clone, h) for h in hashes
+        ]
+
+        revisions = phlgit_log.iter_revisions_from_range(
+            self.clone, "fork", "master")
+        self.assertListEqual(list(revisions), expected)
+
+        hashes.reverse()
+        expected.reverse()
+        revisions = phlgit_log.iter_revisions_from_hashes(self.clone, hashes)
+        self.assertListEqual(list(revisions), expected)
+
+        self.assertListEqual(
+            list(phlgit_log.iter_revisions_from_hashes(self.clone, [])), [])
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
@@ -0,0 +1,55 @@
+"""Wrapper around 'git ls-remote'."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgit_lsremote
+#
+# Public Functions:
+#   hash_ref_pairs
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+
+def hash_ref_pairs(clone, remote, *patterns):
+    """Return a list of (sha1, name) tuples from the refs on 'remote'.
+
+    If any 'patterns' are supplied then only the refs matching at least one
+    of them are listed, as described for 'git ls-remote', e.g. 'refs/heads/*'
+    to only list the branches.
+
+    :clone: supports 'call()'
+    :remote: the string name or url of the remote to list the refs of
+    :*patterns: string patterns to match the refs against
+    :returns: a list of (sha1, name)
+
+    """
+    lines = clone.call('ls-remote', remote, *patterns).splitlines()
+    result = [tuple(line.split()) for line in lines]
+    return result
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
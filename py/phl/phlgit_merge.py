@@ -9,9 +9,13 @@
 #
 # Public Functions:
 #   squash
+#   squash_without_checkout
 #   ours
 #   no_ff
 #
+# Public Assignments:
+#   SQUASH_WITHOUT_CHECKOUT_MIN_GIT_VERSION
+#
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
 # =============================================================================
@@ -23,6 +27,9 @@ from __future__ import absolute_import
 import phlsys_fs
 import phlsys_subprocess
 
+# 'squash_without_checkout' needs 'git merge-tree --write-tree'
+SQUASH_WITHOUT_CHECKOUT_MIN_GIT_VERSION = (2, 38)
+
 
 class MergeException(Exception):
 
@@ -46,6 +53,63 @@ def squash(clone, source, message, author=None):
     return result
 
 
+def squash_without_checkout(
+        repo, base, source, message, author_name, author_email):
+    """Return the string hash of a new commit squashing 'source' onto 'base'.
+
+    The new commit has 'base' as its only parent and the tree that merging
+    'source' into 'base' would result in.  No branches are updated and the
+    working tree and index are not touched, so this is much cheaper than a
+    checkout for large repositories.
+
+    The merge is performed with 'git merge-tree', which uses the same merge
+    machinery as 'git merge', so conflicts are detected in the same way.
+    Note that this requires Git 2.38 or later, older versions will raise
+    CalledProcessError; see SQUASH_WITHOUT_CHECKOUT_MIN_GIT_VERSION, 'squash'
+    works with any version.
+
+    Raise MergeException if there are conflicts or there is nothing to
+    commit, like 'squash'.
+
+    :repo: supports 'call'
+    :base: the string name of the commit to land on
+    :source: the string name of the commit to squash onto 'base'
+    :message: the string message for the new commit
+    :author_name: the string name of the author of the new commit
+    :author_email: the string email of the author of the new commit
+    :returns: the string hash of the new commit
+
+    """
+    base = repo.call("rev-parse", "--verify", base + "^{commit}").strip()
+
+    try:
+        tree = repo.call("merge-tree", "--write-tree", base, source)
+    except phlsys_subprocess.CalledProcessError as e:
+        # 'git merge-tree' returns 1 if there were conflicts, the messages
+        # about them follow the first blank line
+        if e.exitcode != 1:
+            raise
+        raise MergeException(e.stdout.partition("\n\n")[2])
+    tree = tree.strip()
+
+    base_tree = repo.call("rev-parse", base + "^{tree}").strip()
+    if tree == base_tree:
+        raise MergeException(
+            "nothing to commit, '{}' has no changes on '{}'".format(
+                source, base))
+
+    # tidy the message in the same way that 'git commit -m' would
+    message = repo.call("stripspace", stdin=message)
+
+    env = {
+        'GIT_AUTHOR_NAME': author_name,
+        'GIT_AUTHOR_EMAIL': author_email,
+    }
+    commit = repo.call(
+        "commit-tree", tree, "-p", base, stdin=message, env=env)
+    return commit.strip()
+
+
 def ours(repo, branch, message):
     """Merge the specified 'branch' into HEAD, discarding all changes.
 
@@ -55,13 +119,18 @@ def ours(repo, branch, message):
 
     Behaviour is undefined if the current branch is 'branch'.
 
+    The histories of HEAD and 'branch' may be unrelated, e.g. when merging
+    into an orphan branch for the first time.
+
     :repo: supports 'call'
     :branch: the string name of the branch to merge into HEAD
     :message: the string message to make on the commit
     :returns: None
 
     """
-    return repo.call("merge", "--no-edit", "-s", "ours", branch, "-m", message)
+    return repo.call(
+        "merge", "--no-edit", "--allow-unrelated-histories", "-s", "ours",
+        branch, "-m", message)
 
 
 def no_ff(repo, branch):
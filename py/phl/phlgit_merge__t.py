@@ -0,0 +1,107 @@
+"""Test suite for phlgit_merge."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] squashing without checkout makes a single commit on the base
+# [ A] squashing without checkout sets the author and message
+# [ A] squashing without checkout doesn't touch branches, index or worktree
+# [ B] squashing without checkout raises MergeException on conflicts
+# [ B] squashing without checkout raises MergeException if nothing changes
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_SquashWithoutCheckout
+# [ B] test_B_SquashWithoutCheckoutFails
+#==============================================================================
+
+from __future__ import absolute_import
+
+import unittest
+
+import phlgitu_fixture
+
+import phlgit_merge
+
+
+class Test(unittest.TestCase):
+
+    def test_A_SquashWithoutCheckout(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+            worker.commit_new_file("add ROOT", "ROOT")
+            worker.commit_new_file_on_new_branch("fork", "add FORK", "FORK")
+            worker.commit_new_file("add FORK2", "FORK2")
+            worker.checkout_master()
+            worker.commit_new_file("add MASTER", "MASTER")
+
+            def get_state():
+                return (
+                    worker.repo.call("rev-parse", "HEAD", "master", "fork"),
+                    worker.repo.call("status", "--porcelain"))
+
+            state = get_state()
+
+            landed = phlgit_merge.squash_without_checkout(
+                worker.repo, "master", "fork", "land fork\n\n",
+                "Land Author", "land@author.test")
+
+            self.assertEqual(state, get_state())
+
+            self.assertEqual(
+                worker.repo.call("rev-parse", "master"),
+                worker.repo.call("rev-parse", landed + "^"))
+            self.assertEqual(
+                ["FORK", "FORK2", "MASTER", "README", "ROOT"],
+                worker.repo.call("ls-tree", "--name-only", landed).split())
+            self.assertEqual(
+                "Land Author\nland@author.test\nland fork\n\n",
+                worker.repo.call(
+                    "show", "-s", "--format=%an%n%ae%n%B", landed))
+
+    def test_B_SquashWithoutCheckoutFails(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+            worker.commit_new_file("add ROOT", "ROOT", "root\n")
+            worker.commit_new_file_on_new_branch(
+                "fork", "add FILE", "FILE", "fork\n")
+            worker.checkout_master()
+            worker.commit_new_file("add FILE", "FILE", "master\n")
+
+            self.assertRaises(
+                phlgit_merge.MergeException,
+                phlgit_merge.squash_without_checkout,
+                worker.repo, "master", "fork", "message",
+                "author", "author@author.test")
+
+            # 'master^' has nothing that isn't already on 'master'
+            self.assertRaises(
+                phlgit_merge.MergeException,
+                phlgit_merge.squash_without_checkout,
+                worker.repo, "master", "master^", "message",
+                "author", "author@author.test")
+
+            self.assertEqual("", worker.repo.call("status", "--porcelain"))
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
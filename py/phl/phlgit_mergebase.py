@@ -0,0 +1,87 @@
+"""Wrapper around 'git merge-base'."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgit_mergebase
+#
+# Public Classes:
+#   Error
+#
+# Public Functions:
+#   get_or_none
+#   get
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import phlsys_subprocess
+
+
+class Error(Exception):
+    pass
+
+
+def get_or_none(clone, left, right):
+    """Return string hash of the best common ancestor of the commits, or None.
+
+    Note that None is only returned if the commits don't share any history,
+    raise if either of the refs is invalid.
+
+    :clone: supports call()
+    :left: string of the first reference to consider
+    :right: string of the second reference to consider
+    :returns: string of the common ancestor's commit hash or None
+
+    """
+    try:
+        return clone.call("merge-base", left, right).strip()
+    except phlsys_subprocess.CalledProcessError as e:
+        # 'git merge-base' returns 1 if there is no common ancestor, any other
+        # non-zero code indicates a real error
+        if e.exitcode == 1:
+            return None
+        raise
+
+
+def get(clone, left, right):
+    """Return string hash of the best common ancestor of the commits.
+
+    Raise if the commits don't share any history.
+
+    :clone: supports call()
+    :left: string of the first reference to consider
+    :right: string of the second reference to consider
+    :returns: string of the common ancestor's commit hash
+
+    """
+    merge_base = get_or_none(clone, left, right)
+    if merge_base is None:
+        raise Error(
+            "'{}' and '{}' have no common ancestor.".format(left, right))
+    return merge_base
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
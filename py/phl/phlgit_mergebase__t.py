@@ -0,0 +1,80 @@
+"""Test suite for phlgit_mergebase."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] the merge-base of a fork and its base is the fork point
+# [ A] there is no merge-base between unrelated histories
+# [ A] 'get' raises if there is no merge-base
+# [ A] invalid refs raise rather than returning None
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+#==============================================================================
+
+from __future__ import absolute_import
+
+import unittest
+
+import phlgitu_fixture
+import phlsys_subprocess
+
+import phlgit_mergebase
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Breathing(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+            worker.commit_new_file("add ROOT", "ROOT")
+            fork_point = worker.repo.call("rev-parse", "HEAD").strip()
+            worker.commit_new_file_on_new_branch("fork", "add FORK", "FORK")
+            worker.checkout_master()
+            worker.commit_new_file("add MASTER", "MASTER")
+
+            self.assertEqual(
+                fork_point,
+                phlgit_mergebase.get(worker.repo, "master", "fork"))
+
+            worker.repo.call("checkout", "--orphan", "unrelated")
+            worker.commit_new_file("add UNRELATED", "UNRELATED")
+
+            self.assertIsNone(
+                phlgit_mergebase.get_or_none(
+                    worker.repo, "master", "unrelated"))
+
+            self.assertRaises(
+                phlgit_mergebase.Error,
+                phlgit_mergebase.get,
+                worker.repo, "master", "unrelated")
+
+            self.assertRaises(
+                phlsys_subprocess.CalledProcessError,
+                phlgit_mergebase.get_or_none,
+                worker.repo, "master", "doesnotexist")
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
@@ -12,6 +12,7 @@
 #   branch
 #   move_asymmetrical
 #   delete
+#   atomic
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -81,6 +82,22 @@ def delete(clone, remote, branch, *args):
     removals = [':' + b for b in itertools.chain([branch], args)]
     clone.call('push', remote, *removals)
 
+
+def atomic(clone, remote, refspec, *args):
+    """Push all of the supplied refspecs to 'remote', or none of them.
+
+    Note that this relies on the remote supporting atomic pushes, this was
+    introduced in Git 2.4.
+
+    :clone: supports call()
+    :remote: string name of the remote
+    :refspec: string refspec to push, e.g. '+src:dst' or ':dst' to delete
+    :*args: (optional) more string refspecs to push
+    :returns: None
+
+    """
+    clone.call('push', '--atomic', remote, refspec, *args)
+
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
@@ -0,0 +1,75 @@
+"""Wrapper around 'git --version'."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgit_version
+#
+# Public Functions:
+#   get
+#   parse
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import phlsys_subprocess
+
+
+def get():
+    """Return the version of the 'git' on the PATH, as a tuple of ints.
+
+    :returns: a tuple of ints, e.g. (2, 39, 5)
+
+    """
+    return parse(phlsys_subprocess.run('git', '--version').stdout)
+
+
+def parse(version_text):
+    """Return the version from the supplied 'git --version' output.
+
+    Usage examples:
+        >>> parse('git version 2.39.5\\n')
+        (2, 39, 5)
+
+        >>> parse('git version 2.37.1 (Apple Git-137.1)')
+        (2, 37, 1)
+
+        >>> parse('git version 2.38.0.windows.1')
+        (2, 38, 0)
+
+    :version_text: the string output of 'git --version'
+    :returns: a tuple of ints
+
+    """
+    version = version_text.split()[2]
+    numbers = []
+    for part in version.split('.'):
+        if not part.isdigit():
+            break
+        numbers.append(int(part))
+    return tuple(numbers)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
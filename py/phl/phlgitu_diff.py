@@ -0,0 +1,519 @@
+"""Utilities for working with git diffs in memory."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgitu_diff
+#
+# Public Classes:
+#   Error
+#   Hunk
+#    .is_complete
+#    .num_added
+#    .num_removed
+#    .add_line
+#    .size
+#    .format
+#   FileDiff
+#    .hunks
+#    .num_added
+#    .num_removed
+#    .is_binary
+#    .name
+#    .make_binary_stub
+#    .add_header_line
+#    .add_hunk
+#    .size
+#    .format
+#
+# Public Functions:
+#   parse
+#   size
+#   format_file_diffs
+#   make_stat
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import re
+
+_HUNK_HEADER_RE = re.compile(
+    r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$')
+
+# 'git diff --stat' scales the graph to fit the terminal, we'll just use a
+# fixed width that would fit in the usual 80 columns
+_MAX_STAT_GRAPH_WIDTH = 50
+
+
+class Error(Exception):
+    pass
+
+
+class Hunk(object):
+
+    """A hunk of a file diff, which may be formatted with less context."""
+
+    def __init__(self, old_start, old_count, new_start, new_count, heading):
+        """Construct an empty hunk from the values in its '@@' header line.
+
+        :old_start: the integer first line number in the old file
+        :old_count: the integer number of lines from the old file
+        :new_start: the integer first line number in the new file
+        :new_count: the integer number of lines from the new file
+        :heading: the string after the closing '@@', e.g. ' def main():'
+
+        """
+        super(Hunk, self).__init__()
+        self._old_count = old_count
+        self._new_count = new_count
+        self._heading = heading
+        self._header = '@@ -{} +{} @@{}\n'.format(
+            _format_range(old_start, old_count),
+            _format_range(new_start, new_count),
+            heading)
+
+        # git gives the line before the hunk as the start if there are none
+        self._old_line = old_start if old_count else old_start + 1
+        self._new_line = new_start if new_count else new_start + 1
+
+        self._kinds = []
+        self._texts = []
+
+        # the line numbers for each line, lines that don't appear on one side
+        # get the number of the next line on that side
+        self._old_lines = []
+        self._new_lines = []
+
+        # the total size and line counts up to but not including each line,
+        # so that the size of any range can be calculated quickly
+        self._size_before = [0]
+        self._old_before = [0]
+        self._new_before = [0]
+
+        self._change_indices = []
+        self._num_added = 0
+        self._num_removed = 0
+
+    @property
+    def is_complete(self):
+        return (
+            self._old_before[-1] == self._old_count and
+            self._new_before[-1] == self._new_count)
+
+    @property
+    def num_added(self):
+        return self._num_added
+
+    @property
+    def num_removed(self):
+        return self._num_removed
+
+    def add_line(self, line):
+        """Add the supplied string 'line' of the hunk, including the newline.
+
+        :line: the string line, beginning with one of ' ', '+', '-' or '\\'
+        :returns: None
+
+        """
+        kind = line[:1]
+        if kind == '\\':
+            # '\ No newline at end of file' belongs with the previous line
+            self._texts[-1] += line
+            self._size_before[-1] += len(line)
+            return
+
+        if kind not in (' ', '+', '-'):
+            raise Error("unexpected line in hunk: {}".format(line))
+
+        is_old = kind != '+'
+        is_new = kind != '-'
+
+        self._kinds.append(kind)
+        self._texts.append(line)
+        self._old_lines.append(self._old_line)
+        self._new_lines.append(self._new_line)
+        self._size_before.append(self._size_before[-1] + len(line))
+        self._old_before.append(self._old_before[-1] + is_old)
+        self._new_before.append(self._new_before[-1] + is_new)
+
+        self._old_line += is_old
+        self._new_line += is_new
+
+        if kind != ' ':
+            self._change_indices.append(len(self._kinds) - 1)
+            self._num_added += is_new
+            self._num_removed += is_old
+
+    def size(self, context_lines=None):
+        """Return the size of the hunk when formatted with 'context_lines'.
+
+        :context_lines: the integer lines of context, None for all of it
+        :returns: the integer size of the formatted hunk
+
+        """
+        if context_lines is None:
+            return len(self._header) + self._size_before[-1]
+        return sum(
+            len(self._make_header(begin, end)) +
+            self._size_before[end] - self._size_before[begin]
+            for begin, end in self._group_changes(context_lines))
+
+    def format(self, context_lines=None):
+        """Return the string hunk formatted with 'context_lines' of context.
+
+        Note that when formatting with less context, all of the resulting
+        hunks will have the heading of the original hunk.  This is the same
+        as git unless another function begins within the original hunk.
+
+        :context_lines: the integer lines of context, None for all of it
+        :returns: the string hunk, possibly split into several hunks
+
+        """
+        if context_lines is None:
+            return self._header + ''.join(self._texts)
+        return ''.join(
+            self._make_header(begin, end) + ''.join(self._texts[begin:end])
+            for begin, end in self._group_changes(context_lines))
+
+    def _group_changes(self, context_lines):
+        # return a list of [begin, end) ranges of lines to include, changes
+        # are grouped together if their context would overlap, like git
+        groups = []
+        num_lines = len(self._kinds)
+        for index in self._change_indices:
+            begin = max(0, index - context_lines)
+            end = min(num_lines, index + context_lines + 1)
+            if groups and begin <= groups[-1][1]:
+                groups[-1][1] = end
+            else:
+                groups.append([begin, end])
+        return groups
+
+    def _make_header(self, begin, end):
+        old_count = self._old_before[end] - self._old_before[begin]
+        new_count = self._new_before[end] - self._new_before[begin]
+        old_start = self._old_lines[begin]
+        new_start = self._new_lines[begin]
+        if not old_count:
+            old_start -= 1
+        if not new_count:
+            new_start -= 1
+        return '@@ -{} +{} @@{}\n'.format(
+            _format_range(old_start, old_count),
+            _format_range(new_start, new_count),
+            self._heading)
+
+
+class FileDiff(object):
+
+    """The part of a diff which concerns a single file."""
+
+    def __init__(self):
+        super(FileDiff, self).__init__()
+        self._header_lines = []
+        self._header_size = 0
+        self._hunks = []
+
+    @property
+    def hunks(self):
+        return self._hunks
+
+    @property
+    def num_added(self):
+        return sum(h.num_added for h in self._hunks)
+
+    @property
+    def num_removed(self):
+        return sum(h.num_removed for h in self._hunks)
+
+    @property
+    def is_binary(self):
+        return any(
+            line.startswith('Binary files ') or
+            line.startswith('GIT binary patch')
+            for line in self._header_lines)
+
+    @property
+    def name(self):
+        """Return the string name of the file, e.g. for a diffstat.
+
+        Renamed files are described as 'old => new'.
+
+        """
+        old_path = None
+        new_path = None
+        for line in self._header_lines:
+            if line.startswith('rename from '):
+                old_path = line[len('rename from '):-1]
+            elif line.startswith('rename to '):
+                new_path = line[len('rename to '):-1]
+        if old_path is not None and new_path is not None:
+            return '{} => {}'.format(old_path, new_path)
+
+        for line in self._header_lines:
+            if line.startswith('+++ b/'):
+                return line[len('+++ b/'):-1]
+            if line.startswith('--- a/'):
+                return line[len('--- a/'):-1]
+
+        # e.g. 'diff --git a/README b/README', ambiguous with spaces in the
+        # path so we only use this as a last resort
+        for line in self._header_lines:
+            if line.startswith('diff --git a/'):
+                paths = line[len('diff --git a/'):-1]
+                half = (len(paths) - len(' b/')) // 2
+                return paths[:half]
+
+        return ''
+
+    def make_binary_stub(self):
+        """Return a new FileDiff which describes the file as just 'differing'.
+
+        This is what git would produce if the file was marked as '-diff' in
+        '.gitattributes'.
+
+        :returns: a FileDiff
+
+        """
+        stub = FileDiff()
+        old_path = None
+        new_path = None
+        for line in self._header_lines:
+            if line.startswith('--- '):
+                old_path = line[len('--- '):-1]
+            elif line.startswith('+++ '):
+                new_path = line[len('+++ '):-1]
+            else:
+                stub.add_header_line(line)
+
+        if old_path is None or new_path is None:
+            raise Error("file diff has no paths: {}".format(self.name))
+
+        stub.add_header_line(
+            'Binary files {} and {} differ\n'.format(old_path, new_path))
+        return stub
+
+    def add_header_line(self, line):
+        self._header_lines.append(line)
+        self._header_size += len(line)
+
+    def add_hunk(self, hunk):
+        self._hunks.append(hunk)
+
+    def size(self, context_lines=None):
+        """Return the size of the file diff formatted with 'context_lines'.
+
+        :context_lines: the integer lines of context, None for all of it
+        :returns: the integer size of the formatted file diff
+
+        """
+        return self._header_size + sum(
+            h.size(context_lines) for h in self._hunks)
+
+    def format(self, context_lines=None):
+        """Return the string file diff formatted with 'context_lines'.
+
+        :context_lines: the integer lines of context, None for all of it
+        :returns: the string file diff
+
+        """
+        return ''.join(self._header_lines) + ''.join(
+            h.format(context_lines) for h in self._hunks)
+
+
+def parse(diff):
+    """Return a list of FileDiff from the supplied string 'diff'.
+
+    Raise Error if the diff could not be parsed.
+
+    Usage examples:
+        >>> file_diffs = parse(
+        ...     'diff --git a/README b/README\\n'
+        ...     '--- a/README\\n'
+        ...     '+++ b/README\\n'
+        ...     '@@ -1,5 +1,5 @@\\n'
+        ...     ' one\\n'
+        ...     '-two\\n'
+        ...     '+TWO\\n'
+        ...     ' three\\n'
+        ...     ' four\\n'
+        ...     ' five\\n')
+        >>> print format_file_diffs(file_diffs, 1),
+        diff --git a/README b/README
+        --- a/README
+        +++ b/README
+        @@ -1,3 +1,3 @@
+         one
+        -two
+        +TWO
+         three
+
+        >>> size(file_diffs, 1) == len(format_file_diffs(file_diffs, 1))
+        True
+
+    :diff: the string output from 'git diff'
+    :returns: a list of FileDiff
+
+    """
+    file_diffs = []
+    file_diff = None
+    hunk = None
+
+    lines = diff.split('\n')
+    if lines[-1]:
+        lines[-1] += '\n'
+    else:
+        lines.pop()
+
+    for line in lines:
+        if not line.endswith('\n'):
+            line += '\n'
+
+        if hunk is not None:
+            if not hunk.is_complete or line.startswith('\\'):
+                hunk.add_line(line)
+                continue
+            hunk = None
+
+        if line.startswith('diff ') or file_diff is None:
+            file_diff = FileDiff()
+            file_diffs.append(file_diff)
+
+        match = _HUNK_HEADER_RE.match(line[:-1])
+        if match:
+            old_start, old_count, new_start, new_count, heading = (
+                match.groups())
+            hunk = Hunk(
+                int(old_start),
+                1 if old_count is None else int(old_count),
+                int(new_start),
+                1 if new_count is None else int(new_count),
+                heading)
+            file_diff.add_hunk(hunk)
+        else:
+            file_diff.add_header_line(line)
+
+    if hunk is not None and not hunk.is_complete:
+        raise Error("diff ended in the middle of a hunk")
+
+    return file_diffs
+
+
+def size(file_diffs, context_lines=None):
+    """Return the size of 'file_diffs' formatted with 'context_lines'.
+
+    :file_diffs: a list of FileDiff
+    :context_lines: the integer lines of context, None for all of it
+    :returns: the integer size of the formatted diff
+
+    """
+    return sum(f.size(context_lines) for f in file_diffs)
+
+
+def format_file_diffs(file_diffs, context_lines=None):
+    """Return the string diff of 'file_diffs' formatted with 'context_lines'.
+
+    :file_diffs: a list of FileDiff
+    :context_lines: the integer lines of context, None for all of it
+    :returns: the string diff
+
+    """
+    return ''.join(f.format(context_lines) for f in file_diffs)
+
+
+def make_stat(file_diffs):
+    """Return a string summary of 'file_diffs' like 'git diff --stat'.
+
+    Usage examples:
+        >>> print make_stat(parse(
+        ...     'diff --git a/README b/README\\n'
+        ...     '--- a/README\\n'
+        ...     '+++ b/README\\n'
+        ...     '@@ -1 +1,2 @@\\n'
+        ...     '-two\\n'
+        ...     '+TWO\\n'
+        ...     '+THREE\\n')),
+         README | 3 ++-
+         1 file changed, 2 insertions(+), 1 deletion(-)
+
+    :file_diffs: a list of FileDiff
+    :returns: the string summary
+
+    """
+    if not file_diffs:
+        return ''
+
+    name_width = max(len(f.name) for f in file_diffs)
+    max_changes = max(f.num_added + f.num_removed for f in file_diffs)
+    count_width = len(str(max_changes))
+
+    lines = []
+    total_added = 0
+    total_removed = 0
+    for f in file_diffs:
+        added = f.num_added
+        removed = f.num_removed
+        total_added += added
+        total_removed += removed
+
+        if f.is_binary:
+            line = ' {} | Bin'.format(f.name.ljust(name_width))
+        else:
+            if max_changes > _MAX_STAT_GRAPH_WIDTH:
+                added = _scale(added, max_changes)
+                removed = _scale(removed, max_changes)
+            line = ' {} | {} {}{}'.format(
+                f.name.ljust(name_width),
+                str(f.num_added + f.num_removed).rjust(count_width),
+                '+' * added,
+                '-' * removed)
+        lines.append(line.rstrip())
+
+    summary = ' {} file{} changed'.format(
+        len(file_diffs), '' if len(file_diffs) == 1 else 's')
+    if total_added:
+        summary += ', {} insertion{}(+)'.format(
+            total_added, '' if total_added == 1 else 's')
+    if total_removed:
+        summary += ', {} deletion{}(-)'.format(
+            total_removed, '' if total_removed == 1 else 's')
+    lines.append(summary)
+
+    return '\n'.join(lines) + '\n'
+
+
+def _scale(changes, max_changes):
+    if not changes:
+        return 0
+    return max(1, changes * _MAX_STAT_GRAPH_WIDTH // max_changes)
+
+
+def _format_range(start, count):
+    if count == 1:
+        return str(start)
+    return '{},{}'.format(start, count)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2013-2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
@@ -0,0 +1,130 @@
+"""Test suite for phlgitu_diff."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] formatting a parsed diff with full context gives the original diff
+# [ A] formatting with less context is the same as 'git diff --unified'
+# [ A] the size of a formatted diff is calculated correctly
+# [ A] 'no newline at end of file' markers are preserved
+# [ B] hunks split by formatting with less context keep their heading
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_MatchesGitContext
+# [ B] test_B_SplitHunksKeepHeading
+#==============================================================================
+
+from __future__ import absolute_import
+
+import unittest
+
+import phlgit_diff
+import phlgitu_diff
+import phlgitu_fixture
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_A_MatchesGitContext(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+
+            # use numbered lines so that git doesn't find any function
+            # headings for the hunks, which we wouldn't reproduce
+            lines = ["{} line".format(i) for i in xrange(100)]
+            worker.commit_new_file(
+                "add numbers", "numbers", '\n'.join(lines) + '\n')
+            worker.commit_new_file("add moved", "moved", "content\n")
+            worker.repo.call("branch", "diff_branch")
+            worker.repo.call("checkout", "diff_branch")
+
+            lines[5] = "5 changed"
+            lines[10:12] = []
+            lines.insert(50, "50 inserted")
+            lines[-1] = "99 no newline"
+            worker.create_new_file("numbers", '\n'.join(lines))
+            worker.repo.call("mv", "moved", "renamed")
+            worker.add_new_file("new_file", "new content\n")
+            worker.repo.call("commit", "-a", "-m", "change things")
+
+            full_diff = phlgit_diff.raw_diff_range(
+                worker.repo, "master", "diff_branch", 100000)
+            file_diffs = phlgitu_diff.parse(full_diff)
+
+            self.assertEqual(
+                phlgitu_diff.format_file_diffs(file_diffs), full_diff)
+            self.assertEqual(phlgitu_diff.size(file_diffs), len(full_diff))
+
+            for context_lines in [0, 1, 3, 10, 50]:
+                expected = phlgit_diff.raw_diff_range(
+                    worker.repo, "master", "diff_branch", context_lines)
+                if not context_lines:
+                    expected = worker.repo.call(
+                        "diff", "master...diff_branch", "-M", "--unified=0")
+                diff = phlgitu_diff.format_file_diffs(
+                    file_diffs, context_lines)
+                self.assertEqual(diff, expected)
+                self.assertEqual(
+                    phlgitu_diff.size(file_diffs, context_lines), len(diff))
+
+            self.assertIn("\\ No newline at end of file", diff)
+
+    def test_B_SplitHunksKeepHeading(self):
+        with phlgitu_fixture.lone_worker_context() as worker:
+
+            # the only line that git will find as a function heading is the
+            # 'def' line, which is before both of the changes
+            lines = ["{} line".format(i) for i in xrange(60)]
+            lines[10] = "def main():"
+            worker.commit_new_file(
+                "add numbers", "numbers", '\n'.join(lines) + '\n')
+            worker.repo.call("branch", "diff_branch")
+            worker.repo.call("checkout", "diff_branch")
+
+            lines[25] = "25 changed"
+            lines[40] = "40 changed"
+            worker.create_new_file("numbers", '\n'.join(lines) + '\n')
+            worker.repo.call("commit", "-a", "-m", "change things")
+
+            # the changes are in a single hunk with 10 lines of context
+            file_diffs = phlgitu_diff.parse(
+                phlgit_diff.raw_diff_range(
+                    worker.repo, "master", "diff_branch", 10))
+            self.assertEqual(len(file_diffs[0].hunks), 1)
+
+            expected = phlgit_diff.raw_diff_range(
+                worker.repo, "master", "diff_branch", 1)
+            diff = phlgitu_diff.format_file_diffs(file_diffs, 1)
+            self.assertEqual(diff, expected)
+            self.assertEqual(diff.count("@@ def main():\n"), 2)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2013-2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
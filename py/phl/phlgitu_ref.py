@@ -13,6 +13,8 @@
 #   fq_remote_to_short_local
 #   fq_to_short
 #   is_under_remote
+#   parse_refspec
+#   map_by_pattern
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -122,6 +124,64 @@ def is_under_remote(ref, remote):
     return ref.startswith('refs/remotes/' + remote + '/')
 
 
+def parse_refspec(refspec):
+    """Return the (source, destination) patterns of a 'src:dst' refspec.
+
+    The optional leading '+' is ignored.  Raise Error if the refspec isn't of
+    that form, e.g. if it is a negative refspec or has no destination.
+
+    Usage example:
+        >>> parse_refspec("+refs/heads/*:refs/remotes/origin/*")
+        ('refs/heads/*', 'refs/remotes/origin/*')
+
+        >>> parse_refspec("^refs/heads/wip/*")
+        Traceback (most recent call last):
+        Error: unsupported refspec: ^refs/heads/wip/*
+
+    """
+    parts = refspec[1:] if refspec.startswith('+') else refspec
+    parts = parts.split(':')
+    if len(parts) != 2 or not all(parts) or parts[0].startswith('^'):
+        raise Error("unsupported refspec: {}".format(refspec))
+
+    src, dst = parts
+    if src.count('*') > 1 or src.count('*') != dst.count('*'):
+        raise Error("unsupported refspec: {}".format(refspec))
+
+    return src, dst
+
+
+def map_by_pattern(ref, from_pattern, to_pattern):
+    """Return 'ref' mapped from 'from_pattern' to 'to_pattern', else None.
+
+    The patterns may contain a single '*', which matches any string as in
+    refspecs, e.g. the patterns returned by 'parse_refspec'.
+
+    Usage example:
+        >>> map_by_pattern(
+        ...     "refs/heads/mywork", "refs/heads/*", "refs/remotes/origin/*")
+        'refs/remotes/origin/mywork'
+
+        >>> map_by_pattern(
+        ...     "refs/config/arcyd", "refs/heads/*", "refs/remotes/origin/*")
+
+        >>> map_by_pattern(
+        ...     "refs/heads/master", "refs/heads/master", "refs/remotes/o/m")
+        'refs/remotes/o/m'
+
+    """
+    if '*' not in from_pattern:
+        return to_pattern if ref == from_pattern else None
+
+    prefix, suffix = from_pattern.split('*')
+    if len(ref) < len(prefix) + len(suffix):
+        return None
+    if not ref.startswith(prefix) or not ref.endswith(suffix):
+        return None
+
+    return to_pattern.replace('*', ref[len(prefix):len(ref) - len(suffix)])
+
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
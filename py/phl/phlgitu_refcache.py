@@ -0,0 +1,163 @@
+"""Cache the refs of a Git repository in memory."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlgitu_refcache
+#
+# Public Classes:
+#   RefCache
+#    .is_ref
+#    .get_hash_or_none
+#    .hash_ref_pairs
+#    .set_ref
+#    .remove_ref
+#    .invalidate
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+
+class RefCache(object):
+
+    """A snapshot of the refs in a repository, read only when needed.
+
+    The refs are read all at once with a single 'git for-each-ref', after
+    which lookups are dictionary lookups.  Clients that change refs must
+    tell the cache about it, either with 'set_ref' and 'remove_ref' if the
+    new values are known, or with 'invalidate' if they're not.
+
+    Usage examples:
+
+        Look up refs in a new repository:
+        >>> import phlgitu_fixture
+        >>> with phlgitu_fixture.lone_worker_context() as worker:
+        ...     cache = RefCache(worker.repo)
+        ...     cache.is_ref('refs/heads/master')
+        ...     cache.is_ref('refs/heads/other')
+        ...     worker.repo.call('branch', 'other')
+        ...     cache.is_ref('refs/heads/other')
+        ...     cache.invalidate('refs/heads/')
+        ...     cache.is_ref('refs/heads/other')
+        True
+        False
+        ''
+        False
+        True
+
+    """
+
+    def __init__(self, repo):
+        """Construct a cache of the refs in 'repo'.
+
+        :repo: supports 'call()'
+
+        """
+        super(RefCache, self).__init__()
+        self._repo = repo
+
+        # the hash of each ref by name, or None if not read yet
+        self._ref_to_hash = None
+
+        # refs starting with these prefixes may have changed
+        self._stale_prefixes = set()
+
+    def is_ref(self, ref):
+        """Return True if the fully qualified 'ref' exists, else False.
+
+        :ref: the string fully qualified name of the ref, e.g. 'refs/heads/x'
+        :returns: True if the ref exists, otherwise False
+
+        """
+        return self.get_hash_or_none(ref) is not None
+
+    def get_hash_or_none(self, ref):
+        """Return the string hash that the fully qualified 'ref' refers to.
+
+        :ref: the string fully qualified name of the ref, e.g. 'refs/heads/x'
+        :returns: the string hash of the ref, or None if it doesn't exist
+
+        """
+        if any(ref.startswith(p) for p in self._stale_prefixes):
+            self._ref_to_hash = None
+        return self._get_ref_to_hash().get(ref)
+
+    def hash_ref_pairs(self):
+        """Return a list of (hash, ref) tuples for all the refs, like show-ref.
+
+        The list is sorted by ref name.
+
+        :returns: a list of (string hash, string fully qualified ref)
+
+        """
+        if self._stale_prefixes:
+            self._ref_to_hash = None
+        return [(h, r) for r, h in sorted(self._get_ref_to_hash().iteritems())]
+
+    def set_ref(self, ref, hash_):
+        """Record that the fully qualified 'ref' now refers to 'hash_'.
+
+        :ref: the string fully qualified name of the ref, e.g. 'refs/heads/x'
+        :hash_: the string hash that the ref now refers to
+        :returns: None
+
+        """
+        if self._ref_to_hash is not None:
+            self._ref_to_hash[ref] = hash_
+
+    def remove_ref(self, ref):
+        """Record that the fully qualified 'ref' no longer exists.
+
+        :ref: the string fully qualified name of the ref, e.g. 'refs/heads/x'
+        :returns: None
+
+        """
+        if self._ref_to_hash is not None:
+            self._ref_to_hash.pop(ref, None)
+
+    def invalidate(self, prefix='refs/'):
+        """Record that any refs starting with 'prefix' may have changed.
+
+        The refs will all be read again when one of them is next looked up,
+        other refs may still be looked up without reading them again.
+
+        :prefix: the string that the changed refs start with
+        :returns: None
+
+        """
+        if self._ref_to_hash is not None:
+            self._stale_prefixes.add(prefix)
+
+    def _get_ref_to_hash(self):
+        if self._ref_to_hash is None:
+            output = self._repo.call(
+                'for-each-ref', '--format=%(objectname) %(refname)')
+            self._ref_to_hash = dict(
+                reversed(line.split(' ', 1)) for line in output.splitlines())
+            self._stale_prefixes = set()
+        return self._ref_to_hash
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
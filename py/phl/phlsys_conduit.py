@@ -33,13 +33,15 @@ import contextlib
 import hashlib
 import json
 import logging
+import threading
 import time
 import urllib
-import urllib2
 import urlparse
 
 import phldef_conduit
 
+import phlsys_httppool
+
 _URLLIB_TIMEOUT = 600
 
 # TODO: handle re-authentication when the token expires
@@ -170,9 +172,10 @@ class Conduit(object):
             certificate=None,
             actAsUser=None,
             http_proxy=None,
-            https_proxy=None):
+            https_proxy=None,
+            http_pool=None):
         self._conduit_uri = conduitUri
-        self._act_as_user = actAsUser
+        self._default_act_as_user = actAsUser
         self._timeout = 5
         self._username = user
         self._certificate = certificate
@@ -181,20 +184,28 @@ class Conduit(object):
         self._http_proxy = http_proxy
         self._https_proxy = https_proxy
 
+        # share keep-alive connections with all the other instances by default
+        if http_pool is None:
+            http_pool = phlsys_httppool.get_default_pool()
+        self._http_pool = http_pool
+
+        # the user to impersonate is tracked per-thread, so that a single
+        # instance may be shared between threads which act as different users
+        self._thread_local = threading.local()
+
         self._conduit = {}
         if user and certificate:
             self._authenticate()
 
     def set_act_as_user(self,  user):
-        self._act_as_user = user
-        self._conduit["actAsUser"] = self._act_as_user
+        self._thread_local.act_as_user = user
 
     def clear_act_as_user(self):
-        self._act_as_user = None
-        del self._conduit["actAsUser"]
+        self._thread_local.act_as_user = None
 
     def get_act_as_user(self):
-        return self._act_as_user
+        return getattr(
+            self._thread_local, 'act_as_user', self._default_act_as_user)
 
     def get_user(self):
         return self._username
@@ -222,16 +233,13 @@ class Conduit(object):
                 result=result,
                 obj=message_dict,
                 uri=self._conduit_uri,
-                actAsUser=self._act_as_user)
+                actAsUser=self.get_act_as_user())
 
         self._conduit = {
             'sessionKey': result["sessionKey"],
             'connectionID': result["connectionID"],
         }
 
-        if self._act_as_user:
-            self._conduit["actAsUser"] = self._act_as_user
-
     def _authenticate_make_message(self):
         token = str(int(time.time()))
         # pylint: disable=E1101
@@ -257,25 +265,43 @@ class Conduit(object):
             "output": "json",
         })
 
-        if self._https_proxy or self._http_proxy:
-            proxy = {}
-            if self._https_proxy:
-                proxy['https'] = self._https_proxy
-            if self._http_proxy:
-                proxy['http'] = self._http_proxy
-            proxy_handler = urllib2.ProxyHandler(proxy)
-            opener = urllib2.build_opener(proxy_handler)
-            data = opener.open(path, body, _URLLIB_TIMEOUT).read()
-        else:
-            data = urllib2.urlopen(path, body, _URLLIB_TIMEOUT).read()
+        data = self._http_pool.post(
+            path, body, self._get_proxy(path), _URLLIB_TIMEOUT)
 
         return json.loads(data)
 
+    def _get_proxy(self, url):
+        # pylint: disable=E1103
+        # pylint doesn't seem to know the members of SplitResult
+        split = urlparse.urlsplit(url)
+        scheme = split.scheme.lower()
+        hostname = split.hostname
+        # pylint: enable=E1103
+
+        if scheme == 'https' and self._https_proxy:
+            return self._https_proxy
+        if scheme == 'http' and self._http_proxy:
+            return self._http_proxy
+
+        # fall back to the environment, as urllib2.urlopen() would
+        if self._https_proxy or self._http_proxy:
+            return None
+        if urllib.proxy_bypass(hostname):
+            return None
+        return urllib.getproxies().get(scheme)
+
+    def _make_conduit_param(self):
+        conduit = dict(self._conduit)
+        act_as_user = self.get_act_as_user()
+        if act_as_user:
+            conduit["actAsUser"] = act_as_user
+        return conduit
+
     def call(self, method, param_dict_in=None):
         attempts = 3
         for x in range(attempts):
             param_dict = dict(param_dict_in) if param_dict_in else {}
-            param_dict["__conduit__"] = self._conduit
+            param_dict["__conduit__"] = self._make_conduit_param()
             response = self._communicate(method, param_dict)
 
             error = response["error_code"]
@@ -297,7 +323,7 @@ class Conduit(object):
                         result=result,
                         obj=param_dict,
                         uri=self._conduit_uri,
-                        actAsUser=self._act_as_user)
+                        actAsUser=self.get_act_as_user())
 
         if error:
             raise ConduitException(
@@ -307,7 +333,7 @@ class Conduit(object):
                 result=result,
                 obj=param_dict,
                 uri=self._conduit_uri,
-                actAsUser=self._act_as_user)
+                actAsUser=self.get_act_as_user())
 
         return result
 
@@ -14,6 +14,7 @@
 #   nostd
 #   ensure_dir
 #   write_text_file
+#   replace_file_atomically
 #
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
@@ -27,6 +28,7 @@ import os
 import shutil
 import sys
 import tempfile
+import threading
 
 
 @contextlib.contextmanager
@@ -245,6 +247,47 @@ def write_text_file(path, text):
         f.write(text)
 
 
+def replace_file_atomically(path, text, fsync=True):
+    """Replace the file at 'path' with one containing 'text'.
+
+    The new contents are written to a temporary file in the same directory,
+    which is then renamed over 'path'.  Readers will see either the old
+    contents or the new contents, never a partially written file.
+
+    Usage example:
+
+        >>> with chtmpdir_context():
+        ...     replace_file_atomically('testfile', 'hello')
+        ...     replace_file_atomically('testfile', 'goodbye', fsync=False)
+        ...     with read_file_lock_context('testfile') as f:
+        ...         print f.read()
+        ...     os.listdir('.')
+        goodbye
+        ['testfile']
+
+    :path: the string path of the file to replace
+    :text: the string contents of the new file
+    :fsync: if True, make sure the contents are on disk before replacing
+    :returns: None
+
+    """
+    # the temporary file must be unique to this thread, there may be other
+    # writers to the same path
+    temp_path = '{}.{}.{}.tmp'.format(
+        path, os.getpid(), threading.current_thread().ident)
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.rename(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
@@ -5,40 +5,228 @@
 # phlsys_git
 #
 # Public Classes:
+#   Error
+#   ObjectNotFoundError
 #   Repo
 #    .call
+#    .start_call
+#    .read_object
+#    .get_object_info
+#    .close
 #    .working_dir
 #
+# Public Assignments:
+#   ObjectInfo
+#   Object
+#
 # -----------------------------------------------------------------------------
 # (this contents block is generated, edits will be lost)
 # =============================================================================
 
 from __future__ import absolute_import
 
+import collections
 import os
+import subprocess
+import threading
 
 import phlsys_subprocess
 
+ObjectInfo = collections.namedtuple(
+    'phlsys_git__ObjectInfo',
+    ['hash', 'type', 'size'])
+
+Object = collections.namedtuple(
+    'phlsys_git__Object',
+    ['hash', 'type', 'content'])
+
+
+class Error(Exception):
+    pass
+
+
+class ObjectNotFoundError(Error):
+    pass
+
 
 class Repo(object):
 
     def __init__(self, workingDir):
         self._workingDir = os.path.abspath(workingDir)
+        self._cat_file_batch = _CatFileProcess(self._workingDir, '--batch')
+        self._cat_file_batch_check = _CatFileProcess(
+            self._workingDir, '--batch-check')
 
-    # def call(*args, stdin=None): <-- supported in Python 3
+    # def call(*args, stdin=None, env=None, timeout=None): <-- Python 3
     def call(self, *args, **kwargs):
         stdin = kwargs.pop("stdin", None)
+        env = kwargs.pop("env", None)
+        timeout = kwargs.pop("timeout", None)
         assert(not kwargs)
         result = phlsys_subprocess.run(
             'git', *args,
-            stdin=stdin, workingDir=self._workingDir)
+            stdin=stdin, env=env, timeout=timeout,
+            workingDir=self._workingDir)
         return result.stdout
 
+    def start_call(self, *args, **kwargs):
+        """Start a git command and return the phlsys_subprocess.Process.
+
+        The arguments are the same as for 'call', the command runs in the
+        background until 'wait' is called on the returned Process.  Several
+        commands may be run at once and waited on together with
+        'phlsys_subprocess.gather'.
+
+        :*args: the string arguments to pass to git
+        :**kwargs: 'stdin', 'env' or 'timeout', as for 'call'
+        :returns: a phlsys_subprocess.Process
+
+        """
+        stdin = kwargs.pop("stdin", None)
+        env = kwargs.pop("env", None)
+        timeout = kwargs.pop("timeout", None)
+        assert(not kwargs)
+        return phlsys_subprocess.start(
+            'git', *args,
+            stdin=stdin, env=env, timeout=timeout,
+            workingDir=self._workingDir)
+
+    def read_object(self, name):
+        """Return an Object for the git object referred to by 'name'.
+
+        The object is read using a 'git cat-file --batch' process which is
+        shared by all calls on this repo, rather than starting a new process.
+
+        Raise ObjectNotFoundError if there is no such object.
+
+        :name: a string that git can resolve to an object, e.g. a hash
+        :returns: an Object
+
+        """
+        hash_, type_, _, content = self._cat_file_batch.request(name)
+        return Object(hash_, type_, content)
+
+    def get_object_info(self, name):
+        """Return an ObjectInfo for the git object referred to by 'name'.
+
+        The object is looked up using a 'git cat-file --batch-check' process
+        which is shared by all calls on this repo, rather than starting a new
+        process.
+
+        Raise ObjectNotFoundError if there is no such object.
+
+        :name: a string that git can resolve to an object, e.g. a hash
+        :returns: an ObjectInfo
+
+        """
+        hash_, type_, size, _ = self._cat_file_batch_check.request(name)
+        return ObjectInfo(hash_, type_, size)
+
+    def close(self):
+        """Stop any long-lived git processes started for this repo.
+
+        They will be started again if they're needed.
+
+        :returns: None
+
+        """
+        self._cat_file_batch.close()
+        self._cat_file_batch_check.close()
+
     @property
     def working_dir(self):
         return self._workingDir
 
 
+class _CatFileProcess(object):
+
+    """A long-lived 'git cat-file' process, started when first needed.
+
+    Note that the process will exit by itself once the pipes to it are closed,
+    so there's no need to explicitly close it when discarding a Repo.
+
+    """
+
+    def __init__(self, working_dir, mode):
+        super(_CatFileProcess, self).__init__()
+        self._working_dir = working_dir
+        self._mode = mode
+        self._process = None
+        self._lock = threading.Lock()
+
+    def request(self, name):
+        """Return a (hash, type, size, content) tuple for the object 'name'.
+
+        The content is only read in '--batch' mode, otherwise it is None.
+
+        Raise ObjectNotFoundError if there is no such object.
+
+        """
+        if '\n' in name:
+            raise ValueError("object name must not contain a newline")
+
+        with self._lock:
+            try:
+                return self._request(name)
+            except ObjectNotFoundError:
+                raise
+            except Exception:
+                # we can't be sure what state the process is in, start afresh
+                self._close()
+                raise
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _request(self, name):
+        if self._process is None:
+            with open(os.devnull, 'w') as devnull:
+                self._process = subprocess.Popen(
+                    ['git', 'cat-file', self._mode],
+                    cwd=self._working_dir,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=devnull,
+                    close_fds=True)
+
+        self._process.stdin.write(name + '\n')
+        self._process.stdin.flush()
+
+        header = self._process.stdout.readline()
+        if not header:
+            raise Error(
+                "git cat-file {} exited in {}".format(
+                    self._mode, self._working_dir))
+
+        fields = header.split()
+        if len(fields) != 3:
+            # e.g. '<name> missing' or '<name> ambiguous'
+            raise ObjectNotFoundError(header.strip())
+
+        hash_, type_, size = fields
+        size = int(size)
+
+        content = None
+        if self._mode == '--batch':
+            content = self._process.stdout.read(size + 1)
+            if len(content) != size + 1:
+                raise Error(
+                    "git cat-file {} exited in {}".format(
+                        self._mode, self._working_dir))
+            content = content[:-1]  # strip the trailing newline
+
+        return hash_, type_, size, content
+
+    def _close(self):
+        process = self._process
+        self._process = None
+        if process is not None:
+            process.stdin.close()
+            process.stdout.close()
+            process.wait()
+
+
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
 #
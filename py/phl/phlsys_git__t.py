@@ -6,10 +6,14 @@
 # cover those concerns.
 #
 # Concerns:
-# TODO
+# [ A] can commit to a new repo
+# [ B] can read objects and object info without starting new processes
+# [ B] reading a missing object raises ObjectNotFoundError
+# [ B] can still read objects after closing the repo
 #------------------------------------------------------------------------------
 # Tests:
-# TODO
+# [ A] test_can_commit
+# [ B] test_can_read_objects
 #==============================================================================
 
 from __future__ import absolute_import
@@ -41,6 +45,40 @@ class Test(unittest.TestCase):
         clone.call("commit", "-m", "initial commit")
         runCommands("rm -rf " + path)
 
+    def test_can_read_objects(self):
+        run = phlsys_subprocess.run
+        runCommands = phlsys_subprocess.run_commands
+        path = "phlsys_git_TestReadObjects"
+        runCommands("mkdir " + path)
+        try:
+            run("git", "init", workingDir=path)
+            clone = phlsys_git.Repo(path)
+            runCommands("touch " + path + "/README")
+            clone.call("add", "README")
+            clone.call("commit", "-m", "initial commit")
+            head = clone.call("rev-parse", "HEAD").strip()
+
+            commit = clone.read_object("HEAD")
+            self.assertEqual(commit.hash, head)
+            self.assertEqual(commit.type, "commit")
+            self.assertIn("initial commit", commit.content)
+
+            info = clone.get_object_info(head)
+            self.assertEqual(info.type, "commit")
+            self.assertEqual(info.size, len(commit.content))
+
+            self.assertRaises(
+                phlsys_git.ObjectNotFoundError,
+                clone.read_object,
+                "refs/heads/nonexistent")
+
+            # the processes should be restarted after closing
+            clone.close()
+            self.assertEqual(clone.read_object(head), commit)
+            clone.close()
+        finally:
+            runCommands("rm -rf " + path)
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
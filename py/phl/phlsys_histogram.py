@@ -0,0 +1,173 @@
+"""Fixed-memory histograms of durations, with log-sized buckets.
+
+Usage example:
+    >>> h = Histogram()
+    >>> for i in xrange(100):
+    ...     h.record(0.01 * (i + 1))
+    >>> h.count, h.max
+    (100, 1.0)
+    >>> ['{:.2f}'.format(h.percentile(p)) for p in (50, 90, 99, 100)]
+    ['0.51', '1.00', '1.00', '1.00']
+
+"""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlsys_histogram
+#
+# Public Classes:
+#   Histogram
+#    .record
+#    .merge
+#    .percentile
+#    .cumulative_counts
+#    .to_dict
+#    .from_dict
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import math
+
+# values are placed in buckets with bounds that grow by a fixed ratio, this
+# means that percentiles are accurate to within about 19% of the value, no
+# matter how large or small it is.  the smallest bucket is for values under a
+# millisecond, the largest is for values over about nine hours.
+_LEAST_BOUND = 0.001
+_BUCKETS_PER_DOUBLING = 4
+_NUM_BUCKETS = 100
+
+
+class Histogram(object):
+
+    def __init__(self):
+        self._counts = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+
+    def record(self, value):
+        """Add the number 'value' to the histogram.
+
+        :value: a non-negative number, e.g. a duration in seconds
+        :returns: None
+
+        """
+        self._counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add all the values recorded in the 'other' Histogram to this one.
+
+        :other: the Histogram to merge from
+        :returns: None
+
+        """
+        for i, count in enumerate(other._counts):
+            self._counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        if other.max is not None:
+            if self.max is None or other.max > self.max:
+                self.max = other.max
+
+    def percentile(self, percent):
+        """Return the value which 'percent' of the values are not more than.
+
+        The value returned is the upper bound of the bucket the percentile
+        lies in, or the maximum recorded value if that is smaller.
+
+        :percent: the number percentile to return, e.g. 99
+        :returns: the number value of the percentile, or None if empty
+
+        """
+        if not self.count:
+            return None
+
+        threshold = self.count * percent / 100.0
+        cumulative = 0
+        for i, count in enumerate(self._counts):
+            cumulative += count
+            if count and cumulative >= threshold:
+                return min(_bucket_upper_bound(i), self.max)
+
+        return self.max
+
+    def cumulative_counts(self):
+        """Return a list of (upper_bound, count) for each doubling in value.
+
+        Each 'count' is the number of values less than 'upper_bound', the
+        last 'upper_bound' is infinity so the last 'count' is all of them.
+        The bounds are the same for every Histogram, as monitoring systems
+        expect.
+
+        :returns: a list of (number, int)
+
+        """
+        result = []
+        cumulative = 0
+        for i, count in enumerate(self._counts):
+            cumulative += count
+            if i % _BUCKETS_PER_DOUBLING == 0 or i == _NUM_BUCKETS - 1:
+                result.append((_bucket_upper_bound(i), cumulative))
+        return result
+
+    def to_dict(self):
+        return {
+            'counts': dict((i, c) for i, c in enumerate(self._counts) if c),
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+        }
+
+    @staticmethod
+    def from_dict(d):
+        histogram = Histogram()
+        for i, c in d['counts'].iteritems():
+            histogram._counts[int(i)] = c
+        histogram.count = d['count']
+        histogram.total = d['total']
+        histogram.max = d['max']
+        return histogram
+
+
+def _bucket_index(value):
+    if value < _LEAST_BOUND:
+        return 0
+    index = int(math.log(value / _LEAST_BOUND, 2) * _BUCKETS_PER_DOUBLING) + 1
+    return min(index, _NUM_BUCKETS - 1)
+
+
+def _bucket_upper_bound(index):
+    if index == _NUM_BUCKETS - 1:
+        return float('inf')
+    return _LEAST_BOUND * 2 ** (float(index) / _BUCKETS_PER_DOUBLING)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
@@ -0,0 +1,124 @@
+"""Test suite for phlsys_histogram."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] empty histograms have no percentiles
+# [ A] percentiles are within the bucket precision of the true values
+# [ A] values outside the range of the buckets are handled
+# [ B] merged histograms are the same as recording all the values in one
+# [ B] histograms survive a round-trip through to_dict and json
+# [ C] cumulative counts have the same bounds for any values recorded
+# [ C] cumulative counts never decrease and end with all the values
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Percentiles
+# [ B] test_B_MergeAndDict
+# [ C] test_C_CumulativeCounts
+#==============================================================================
+
+from __future__ import absolute_import
+
+import json
+import unittest
+
+import phlsys_histogram
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Percentiles(self):
+        histogram = phlsys_histogram.Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertIsNone(histogram.max)
+
+        values = [0.002 * (i + 1) for i in xrange(1000)]
+        for v in values:
+            histogram.record(v)
+
+        for percent in (50, 90, 99):
+            expected = values[int(len(values) * percent / 100.0) - 1]
+            actual = histogram.percentile(percent)
+            self.assertGreaterEqual(actual, expected)
+            self.assertLess(actual, expected * 1.2)
+        self.assertEqual(values[-1], histogram.percentile(100))
+        self.assertEqual(values[-1], histogram.max)
+
+        histogram.record(0)
+        histogram.record(10 ** 9)
+        self.assertEqual(10 ** 9, histogram.percentile(100))
+        self.assertEqual(1002, histogram.count)
+
+    def test_B_MergeAndDict(self):
+        small = phlsys_histogram.Histogram()
+        large = phlsys_histogram.Histogram()
+        together = phlsys_histogram.Histogram()
+        for i in xrange(100):
+            small.record(i * 0.001)
+            large.record(i * 10.0)
+            together.record(i * 0.001)
+            together.record(i * 10.0)
+
+        small.merge(large)
+        merged_dict = small.to_dict()
+        together_dict = together.to_dict()
+        self.assertAlmostEqual(
+            together_dict.pop('total'), merged_dict.pop('total'))
+        self.assertEqual(together_dict, merged_dict)
+
+        restored = phlsys_histogram.Histogram.from_dict(
+            json.loads(json.dumps(together.to_dict())))
+        for percent in (1, 50, 90, 99, 100):
+            self.assertEqual(
+                together.percentile(percent), restored.percentile(percent))
+        self.assertEqual(together.count, restored.count)
+
+    def test_C_CumulativeCounts(self):
+        empty = phlsys_histogram.Histogram()
+        histogram = phlsys_histogram.Histogram()
+        for value in (0.0005, 0.003, 0.003, 1.5, 10 ** 9):
+            histogram.record(value)
+
+        empty_counts = empty.cumulative_counts()
+        counts = histogram.cumulative_counts()
+        self.assertEqual(
+            [bound for bound, _ in empty_counts],
+            [bound for bound, _ in counts])
+        self.assertEqual(set([0]), set(c for _, c in empty_counts))
+
+        bounds = [bound for bound, _ in counts]
+        self.assertEqual(sorted(bounds), bounds)
+        self.assertEqual(float('inf'), bounds[-1])
+
+        for bound, count in counts:
+            expected = len([
+                v for v in (0.0005, 0.003, 0.003, 1.5) if v < bound])
+            if bound == float('inf'):
+                expected = 5
+            self.assertEqual(expected, count)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
@@ -0,0 +1,186 @@
+"""Test suite for phlsys_httppool."""
+
+from __future__ import absolute_import
+
+import BaseHTTPServer
+import contextlib
+import httplib
+import SocketServer
+import threading
+import time
+import unittest
+
+import phlsys_httppool
+
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ B] the posted body is received by the server, the response is returned
+# [ B] connections are re-used for subsequent requests to the same server
+# [ C] stale connections are replaced and the request is retried
+# [ D] responses other than 200 raise HttpError
+# [ E] requests are not sent again if a new connection fails after sending
+# [ F] connections closed by the server while idle are replaced
+# [ F] requests are sent again once, if a re-used connection gets no response
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+# [ B] test_B_ReuseConnection
+# [ C] test_C_ReconnectStale
+# [ D] test_D_HttpError
+# [ E] test_E_NoResendAfterSending
+# [ F] test_F_ReconnectClosedWhileIdle
+#==============================================================================
+
+
+class _EchoHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    drop_count = 0
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        body = self.rfile.read(length)
+        if self.path == '/drop':
+            # act on the request and then drop the connection without a
+            # response, as a server might if it was restarted
+            _EchoHandler.drop_count += 1
+            self.close_connection = 1
+            return
+        status = 200 if self.path == '/echo' else 404
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _IdleTimeoutHandler(_EchoHandler):
+
+    # close connections that are idle for longer than this, like keep-alive
+    # timeouts on real servers
+    timeout = 0.2
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    # the pool keeps connections open, don't wait for them on shutdown
+    daemon_threads = True
+
+
+@contextlib.contextmanager
+def _server_context(handler=_EchoHandler):
+    server = _Server(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:{}'.format(server.server_port)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Breathing(self):
+        pool = phlsys_httppool.Pool()
+        self.assertEqual(
+            phlsys_httppool.PoolStats(hits=0, misses=0, reconnects=0),
+            pool.stats())
+        pool.close()
+
+    def test_B_ReuseConnection(self):
+        pool = phlsys_httppool.Pool()
+        with _server_context() as url:
+            self.assertEqual('hello', pool.post(url + '/echo', 'hello'))
+            self.assertEqual('world', pool.post(url + '/echo', 'world'))
+        self.assertEqual(
+            phlsys_httppool.PoolStats(hits=1, misses=1, reconnects=0),
+            pool.stats())
+        pool.close()
+
+    def test_C_ReconnectStale(self):
+        pool = phlsys_httppool.Pool()
+        with _server_context() as url:
+            self.assertEqual('hello', pool.post(url + '/echo', 'hello'))
+
+            # simulate the server dropping the idle connection
+            for connections in pool._idle.itervalues():
+                for connection in connections:
+                    connection._http.sock.close()
+
+            self.assertEqual('world', pool.post(url + '/echo', 'world'))
+        self.assertEqual(
+            phlsys_httppool.PoolStats(hits=1, misses=1, reconnects=1),
+            pool.stats())
+        pool.close()
+
+    def test_D_HttpError(self):
+        pool = phlsys_httppool.Pool()
+        with _server_context() as url:
+            with self.assertRaises(phlsys_httppool.HttpError) as context:
+                pool.post(url + '/missing', 'hello')
+        self.assertEqual(404, context.exception.status)
+        pool.close()
+
+    def test_E_NoResendAfterSending(self):
+        pool = phlsys_httppool.Pool()
+        _EchoHandler.drop_count = 0
+        with _server_context() as url:
+            self.assertRaises(
+                httplib.BadStatusLine, pool.post, url + '/drop', 'hello')
+        self.assertEqual(1, _EchoHandler.drop_count)
+        self.assertEqual(
+            phlsys_httppool.PoolStats(hits=0, misses=1, reconnects=0),
+            pool.stats())
+        pool.close()
+
+    def test_F_ReconnectClosedWhileIdle(self):
+        pool = phlsys_httppool.Pool(max_idle_secs=60)
+        with _server_context(_IdleTimeoutHandler) as url:
+            self.assertEqual('hello', pool.post(url + '/echo', 'hello'))
+            time.sleep(_IdleTimeoutHandler.timeout * 5)
+            self.assertEqual('world', pool.post(url + '/echo', 'world'))
+        self.assertEqual(
+            phlsys_httppool.PoolStats(hits=1, misses=1, reconnects=1),
+            pool.stats())
+
+        # the request is only sent again once
+        _EchoHandler.drop_count = 0
+        with _server_context() as url:
+            self.assertEqual('hello', pool.post(url + '/echo', 'hello'))
+            self.assertRaises(
+                httplib.BadStatusLine, pool.post, url + '/drop', 'hello')
+        self.assertEqual(2, _EchoHandler.drop_count)
+        pool.close()
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2013-2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
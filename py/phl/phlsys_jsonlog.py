@@ -0,0 +1,245 @@
+"""Buffered, rotated logs of JSON records, one record per line."""
+# =============================================================================
+# CONTENTS
+# -----------------------------------------------------------------------------
+# phlsys_jsonlog
+#
+# Public Classes:
+#   Writer
+#    .write
+#    .flush
+#    .close
+#
+# Public Functions:
+#   read
+#
+# -----------------------------------------------------------------------------
+# (this contents block is generated, edits will be lost)
+# =============================================================================
+
+from __future__ import absolute_import
+
+import json
+import os
+import threading
+import time
+
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_DEFAULT_MAX_AGE_SECS = 7 * 24 * 60 * 60
+_DEFAULT_BACKUP_COUNT = 4
+_DEFAULT_FLUSH_INTERVAL_SECS = 5
+
+
+class Writer(object):
+
+    def __init__(
+            self,
+            path,
+            max_bytes=_DEFAULT_MAX_BYTES,
+            max_age_secs=_DEFAULT_MAX_AGE_SECS,
+            backup_count=_DEFAULT_BACKUP_COUNT,
+            flush_interval_secs=_DEFAULT_FLUSH_INTERVAL_SECS):
+        """Construct a writer which appends JSON records to the file 'path'.
+
+        Records are buffered in memory and appended to the file together by
+        a background thread every 'flush_interval_secs', or when 'flush' or
+        'close' are called.
+
+        The file is rotated when it would grow larger than 'max_bytes', or
+        when it was started more than 'max_age_secs' ago by this writer.  The
+        old file is renamed to 'path.1', the previous 'path.1' is renamed to
+        'path.2' and so on, only 'backup_count' old files are kept.
+
+        A single instance may be used from many threads at once.
+
+        Usage example:
+
+            >>> import phlsys_fs
+            >>> with phlsys_fs.chtmpdir_context():
+            ...     writer = Writer('log', max_bytes=30)
+            ...     writer.write({'count': 1})
+            ...     writer.write({'count': 2})
+            ...     writer.flush()
+            ...     writer.write({'count': 3})
+            ...     writer.close()
+            ...     print sorted(os.listdir('.'))
+            ...     print list(read('log'))
+            ['log', 'log.1']
+            [{u'count': 1}, {u'count': 2}, {u'count': 3}]
+
+        :path: the string path of the file to write
+        :max_bytes: the integer size to rotate the file at
+        :max_age_secs: the number of seconds to rotate the file after
+        :backup_count: the integer number of rotated files to keep
+        :flush_interval_secs: the number of seconds between writes to the file
+
+        """
+        super(Writer, self).__init__()
+        self._path = os.path.abspath(path)
+        self._max_bytes = max_bytes
+        self._max_age_secs = max_age_secs
+        self._backup_count = backup_count
+        self._flush_interval_secs = flush_interval_secs
+
+        # guards the buffer, which is appended to by many threads
+        self._lock = threading.Lock()
+        self._buffer = []
+
+        # guards the file, which is only written to when flushing
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._file_start_time = None
+
+        self._stop_event = threading.Event()
+        self._flusher = None
+
+    def write(self, record):
+        """Buffer 'record' to be appended to the log.
+
+        :record: an object which may be serialized with 'json.dumps'
+        :returns: None
+
+        """
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            if self._flusher is None and not self._stop_event.is_set():
+                self._flusher = threading.Thread(target=self._flush_forever)
+                self._flusher.daemon = True
+                self._flusher.start()
+
+    def flush(self):
+        """Append all the buffered records to the log now.
+
+        :returns: None
+
+        """
+        with self._file_lock:
+            with self._lock:
+                lines = self._buffer
+                self._buffer = []
+
+            if not lines:
+                return
+
+            data = ''.join(lines)
+            self._rotate_if_needed(len(data))
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+
+    def close(self):
+        """Stop the background flushing, flush and close the log.
+
+        :returns: None
+
+        """
+        with self._lock:
+            self._stop_event.set()
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join()
+        self.flush()
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _flush_forever(self):
+        while not self._stop_event.wait(self._flush_interval_secs):
+            self.flush()
+
+    def _open(self):
+        dir_path = os.path.dirname(self._path)
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path)
+        self._file = open(self._path, 'a')
+        self._file_start_time = time.time()
+
+    def _rotate_if_needed(self, new_bytes):
+        if self._file is None:
+            if not os.path.isfile(self._path):
+                return
+            size = os.path.getsize(self._path)
+            age = 0
+        else:
+            size = self._file.tell()
+            age = time.time() - self._file_start_time
+
+        if not size:
+            return
+
+        is_too_big = size + new_bytes > self._max_bytes
+        is_too_old = age > self._max_age_secs
+        if not is_too_big and not is_too_old:
+            return
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        for i in xrange(self._backup_count - 1, 0, -1):
+            older = _rotated_path(self._path, i)
+            if os.path.exists(older):
+                os.rename(older, _rotated_path(self._path, i + 1))
+        if self._backup_count:
+            os.rename(self._path, _rotated_path(self._path, 1))
+        else:
+            os.remove(self._path)
+
+
+def read(path):
+    """Generate the records in the log at 'path', oldest first.
+
+    The records in the rotated files are included.  Lines which aren't valid
+    JSON, e.g. a partially written line, are skipped.
+
+    :path: the string path of the log, as passed to 'Writer'
+    :returns: a generator of the records
+
+    """
+    paths = []
+    i = 1
+    while os.path.exists(_rotated_path(path, i)):
+        paths.append(_rotated_path(path, i))
+        i += 1
+    paths.reverse()
+    if os.path.exists(path):
+        paths.append(path)
+
+    for p in paths:
+        with open(p) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                yield record
+
+
+def _rotated_path(path, index):
+    return '{}.{}'.format(path, index)
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
@@ -0,0 +1,146 @@
+"""Test suite for phlsys_jsonlog."""
+#==============================================================================
+#                                   TEST PLAN
+#------------------------------------------------------------------------------
+# Here we detail the things we are concerned to test and specify which tests
+# cover those concerns.
+#
+# Concerns:
+# [ A] records written can be read back in order
+# [ A] records are flushed in the background without explicit flushing
+# [ B] the log is rotated when it would grow too large
+# [ B] only 'backup_count' rotated files are kept
+# [ B] the log is rotated when it's too old
+# [ C] records written from many threads at once are all kept intact
+# [ D] lines which aren't valid JSON are skipped when reading
+#------------------------------------------------------------------------------
+# Tests:
+# [ A] test_A_Breathing
+# [ B] test_B_Rotation
+# [ C] test_C_Threads
+# [ D] test_D_ReadSkipsInvalid
+#==============================================================================
+
+from __future__ import absolute_import
+
+import os
+import threading
+import time
+import unittest
+
+import phlsys_fs
+
+import phlsys_jsonlog
+
+
+class Test(unittest.TestCase):
+
+    def test_A_Breathing(self):
+        with phlsys_fs.chtmpdir_context():
+            writer = phlsys_jsonlog.Writer(
+                'dir/log', flush_interval_secs=0.1)
+            writer.write({'count': 1})
+            writer.write({'count': 2})
+
+            # wait for the background flusher
+            for _ in xrange(50):
+                if os.path.exists('dir/log'):
+                    break
+                time.sleep(0.1)
+            self.assertEqual(
+                [{'count': 1}, {'count': 2}],
+                list(phlsys_jsonlog.read('dir/log')))
+
+            writer.write({'count': 3})
+            writer.close()
+            self.assertEqual(
+                [{'count': 1}, {'count': 2}, {'count': 3}],
+                list(phlsys_jsonlog.read('dir/log')))
+
+    def test_B_Rotation(self):
+        with phlsys_fs.chtmpdir_context():
+            # each record is 13 bytes, so there's room for two per file
+            writer = phlsys_jsonlog.Writer('log', max_bytes=30, backup_count=2)
+            for i in xrange(10, 16):
+                writer.write({'count': i})
+                writer.flush()
+            writer.close()
+
+            self.assertItemsEqual(['log', 'log.1', 'log.2'], os.listdir('.'))
+            self.assertEqual(
+                [{'count': i} for i in xrange(10, 16)],
+                list(phlsys_jsonlog.read('log')))
+
+            # a new writer continues the existing log
+            writer = phlsys_jsonlog.Writer('log', max_bytes=30, backup_count=2)
+            writer.write({'count': 16})
+            writer.close()
+            self.assertEqual(
+                [{'count': i} for i in xrange(12, 17)],
+                list(phlsys_jsonlog.read('log')))
+
+            writer = phlsys_jsonlog.Writer('log', max_age_secs=0.1)
+            writer.write({'count': 17})
+            writer.flush()
+            time.sleep(0.2)
+            writer.write({'count': 18})
+            writer.close()
+            with open('log') as f:
+                self.assertEqual('{"count": 18}\n', f.read())
+            self.assertEqual(
+                [{'count': i} for i in xrange(12, 19)],
+                list(phlsys_jsonlog.read('log')))
+
+    def test_C_Threads(self):
+        with phlsys_fs.chtmpdir_context():
+            writer = phlsys_jsonlog.Writer('log', flush_interval_secs=0.01)
+
+            def write_many(thread_index):
+                for i in xrange(200):
+                    writer.write({'thread': thread_index, 'count': i})
+
+            threads = [
+                threading.Thread(target=write_many, args=(t,))
+                for t in xrange(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            writer.close()
+
+            records = list(phlsys_jsonlog.read('log'))
+            self.assertEqual(800, len(records))
+            for t in xrange(4):
+                self.assertEqual(
+                    range(200),
+                    [r['count'] for r in records if r['thread'] == t])
+
+    def test_D_ReadSkipsInvalid(self):
+        with phlsys_fs.chtmpdir_context():
+            with open('log', 'w') as f:
+                f.write('an old style line\n{"count": 1}\n{"count":')
+            self.assertEqual([{'count': 1}], list(phlsys_jsonlog.read('log')))
+
+
+#------------------------------------------------------------------------------
+# Copyright (C) 2014 Bloomberg Finance L.P.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#------------------------------- END-OF-FILE ----------------------------------
@@ -5,6 +5,11 @@
 # phlsys_scheduleunreliables
 #
 # Public Classes:
+#   TriggeredOperation
+#    .do
+#    .getDelay
+#    .getIdleDelay
+#    .isTriggered
 #   DelayedRetryNotifyOperation
 #    .do
 #    .getDelay
@@ -12,6 +17,7 @@
 # Public Functions:
 #   process_loop_forever
 #   process_once
+#   process_loop_event_driven
 #   make_timed_queue
 #
 # -----------------------------------------------------------------------------
@@ -20,50 +26,146 @@
 
 from __future__ import absolute_import
 
+import collections
+import contextlib
+import multiprocessing.pool
+
 import phlsys_timedqueue
 
+# when waiting for a pool to finish we must specify a timeout, otherwise the
+# wait is uninterruptible and signals like SIGTERM will not be handled until
+# all the workers have finished
+_POOL_WAIT_SECS = 60 * 60 * 24 * 365
+
+
+def process_loop_forever(
+        operations, concurrent_operations=None, max_workers=1):
+    """Process the supplied operations until an exception is raised.
+
+    Each cycle, all of the 'concurrent_operations' are processed first and
+    then each of the 'operations' are processed in turn.  If 'max_workers' is
+    greater than one then up to that many 'concurrent_operations' will be
+    processed at the same time, using a pool of threads.
+
+    :operations: an iterable of objects that support 'do' and 'getDelay'
+    :concurrent_operations: as 'operations', but may be processed concurrently
+    :max_workers: the maximum number of 'concurrent_operations' to do at once
+    :returns: None
 
-def process_loop_forever(operations):
+    """
     # use a copy of the original, as we may modify it
     # we need to do set operations so 'set' is most appropriate
     operations = set(operations)
+    concurrent_operations = set(concurrent_operations or [])
 
     paused_operations = phlsys_timedqueue.TimedQueue()
+    paused_concurrent_operations = phlsys_timedqueue.TimedQueue()
 
-    while True:
-        _process_operations(operations, paused_operations)
+    with _pool_context(max_workers) as pool:
+        while True:
+            _process_operations(
+                concurrent_operations, paused_concurrent_operations, pool)
+            _process_operations(operations, paused_operations)
 
 
-def process_once(operations):
+def process_once(operations, concurrent_operations=None, max_workers=1):
     """Return the set of still active operations after processing each once.
 
     :operations: an iterable of objects that support 'do' and 'getDelay'
+    :concurrent_operations: as 'operations', but may be processed concurrently
+    :max_workers: the maximum number of 'concurrent_operations' to do at once
     :returns: a set of the still active operations after processing each once.
 
     """
     # use a copy of the original, as we may modify it
     # we need to do set operations so 'set' is most appropriate
     operations = set(operations)
+    concurrent_operations = set(concurrent_operations or [])
 
     paused_operations = phlsys_timedqueue.TimedQueue()
 
+    with _pool_context(max_workers) as pool:
+        _process_operations(concurrent_operations, paused_operations, pool)
     _process_operations(operations, paused_operations)
 
-    return operations
+    return operations | concurrent_operations
+
+
+def process_loop_event_driven(
+        operations, triggered_operations, max_workers=1):
+    """Process the supplied operations as they become due, until exception.
+
+    Each iteration, each of the 'operations' are processed in turn.  These are
+    expected to include an operation which waits for a while and operations
+    which refresh whatever state the 'triggered_operations' depend on.
+
+    Then each of the 'triggered_operations' which are due are started, an
+    operation is due if:
+
+      - it has not been done yet
+      - it succeeded last time and 'isTriggered()' returns True
+      - it succeeded last time and 'getIdleDelay()' has elapsed since
+      - it failed last time and 'getDelay()' has elapsed since
+
+    If 'max_workers' is greater than one then the 'triggered_operations' are
+    processed in the background using a pool of threads, so that a slow
+    operation doesn't hold up the others.
+
+    :operations: an iterable of objects that support 'do' and 'getDelay'
+    :triggered_operations: an iterable of TriggeredOperation
+    :max_workers: the maximum number of 'triggered_operations' to do at once
+    :returns: None
+
+    """
+    # use a copy of the original, as we may modify it
+    # we need to do set operations so 'set' is most appropriate
+    operations = set(operations)
+
+    paused_operations = phlsys_timedqueue.TimedQueue()
+    scheduler = _TriggeredScheduler(triggered_operations)
+
+    with _pool_context(max_workers) as pool:
+        while True:
+            _process_operations(operations, paused_operations)
+            scheduler.process(pool)
 
 
 def make_timed_queue():
     return phlsys_timedqueue.TimedQueue()
 
 
-def _process_operations(operations, paused_operations):
+@contextlib.contextmanager
+def _pool_context(max_workers):
+    if max_workers is None or max_workers <= 1:
+        yield None
+        return
+
+    pool = multiprocessing.pool.ThreadPool(max_workers)
+    try:
+        yield pool
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _do_operation(op):
+    return op.do()
+
+
+def _process_operations(operations, paused_operations, pool=None):
     assert isinstance(operations, set)
     operations |= set(paused_operations.pop_expired())
 
-    new_bad_operations = set()
-    for op in operations:
-        if not op.do():
-            new_bad_operations.add(op)
+    # fix the order of the operations so that we can match them with results
+    operation_list = list(operations)
+    if pool is None:
+        results = [_do_operation(op) for op in operation_list]
+    else:
+        results = pool.map_async(_do_operation, operation_list).get(
+            _POOL_WAIT_SECS)
+
+    new_bad_operations = set(
+        op for op, is_ok in zip(operation_list, results) if not is_ok)
 
     if new_bad_operations:
         operations -= new_bad_operations
@@ -73,6 +175,94 @@ def _process_operations(operations, paused_operations):
                 paused_operations.push(op, delay)
 
 
+class _TriggeredScheduler(object):
+
+    def __init__(self, operations):
+        super(_TriggeredScheduler, self).__init__()
+        self._ready = set(operations)
+        self._idle = set()
+        self._in_flight = {}
+        self._deadlines = phlsys_timedqueue.TimedQueue()
+
+        # operations may be in the deadline queue more than once, only the
+        # entry with the latest generation is valid, the others are ignored
+        self._generations = collections.defaultdict(int)
+
+    def process(self, pool):
+        self._collect_finished()
+        self._collect_due()
+        self._start_ready(pool)
+
+    def _collect_finished(self):
+        for op, result in self._in_flight.items():
+            if result.ready():
+                del self._in_flight[op]
+                self._on_finished(op, result.get())
+
+    def _collect_due(self):
+        for op, generation in self._deadlines.pop_expired():
+            if generation == self._generations[op]:
+                self._idle.discard(op)
+                self._ready.add(op)
+
+        for op in list(self._idle):
+            if op.isTriggered():
+                self._idle.remove(op)
+                self._generations[op] += 1  # invalidate the idle deadline
+                self._ready.add(op)
+
+    def _start_ready(self, pool):
+        ready = self._ready
+        self._ready = set()
+        for op in ready:
+            if pool is None:
+                self._on_finished(op, _do_operation(op))
+            else:
+                self._in_flight[op] = pool.apply_async(_do_operation, (op,))
+
+    def _on_finished(self, op, is_ok):
+        if is_ok:
+            self._idle.add(op)
+            self._push_deadline(op, op.getIdleDelay())
+        else:
+            self._push_deadline(op, op.getDelay())
+
+    def _push_deadline(self, op, delay):
+        self._generations[op] += 1
+        if delay is not None:
+            self._deadlines.push((op, self._generations[op]), delay)
+
+
+class TriggeredOperation(object):
+
+    def __init__(self, operation, is_triggered, idle_delay):
+        """Wrap the supplied 'operation' so that it may be triggered.
+
+        :operation: an object that supports 'do' and 'getDelay'
+        :is_triggered: a callable that returns True if 'operation' is due
+        :idle_delay: a timedelta to wait before doing a successful operation
+                     again if it is not triggered, or None to wait forever
+        :returns: None
+
+        """
+        super(TriggeredOperation, self).__init__()
+        self._op = operation
+        self._is_triggered = is_triggered
+        self._idle_delay = idle_delay
+
+    def do(self):
+        return self._op.do()
+
+    def getDelay(self):
+        return self._op.getDelay()
+
+    def getIdleDelay(self):
+        return self._idle_delay
+
+    def isTriggered(self):
+        return self._is_triggered()
+
+
 class DelayedRetryNotifyOperation(object):
     # TODO: support iterables generally
 
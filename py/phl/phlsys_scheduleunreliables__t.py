@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 import datetime
 import functools
+import threading
 import unittest
 
 import phlsys_scheduleunreliables
@@ -19,6 +20,13 @@ import phlsys_scheduleunreliables
 # [ C] loopOnce moves bad operations into paused_operations
 # [ D] loopOnce moves expired bad operations into operations
 # [ E] loopOnce drops bad operations which return 'None' from getDelay()
+# [ F] process_once performs concurrent operations at the same time
+# [ F] process_once performs concurrent operations before other operations
+# [ G] triggered operations are performed once initially
+# [ G] triggered operations are not performed again until triggered
+# [ G] triggered operations are performed again after their idle delay
+# [ G] failed triggered operations are dropped when out of delays
+# [ G] failed triggered operations are performed again after their delay
 #------------------------------------------------------------------------------
 # Tests:
 # [ A] test_A_Breathing
@@ -26,6 +34,8 @@ import phlsys_scheduleunreliables
 # [ C] test_C_MakeBadOperations
 # [ D] test_D_ExpireBadOperations
 # [ E] test_E_DropBadOperations
+# [ F] test_F_ConcurrentOperations
+# [ G] test_G_TriggeredOperations
 #==============================================================================
 
 
@@ -153,6 +163,103 @@ class Test(unittest.TestCase):
         self.assertEqual(0, len(operations))
         self.assertEqual(0, len(bad_operations.pop_expired()))
 
+    def test_F_ConcurrentOperations(self):
+        # make 4 operations which can only complete if they are all running at
+        # the same time, process them with 4 workers.
+
+        num_operations = 4
+        results = []
+        lock = threading.Lock()
+        all_started = threading.Event()
+        started = [0]
+
+        def do():
+            with lock:
+                started[0] += 1
+                if started[0] == num_operations:
+                    all_started.set()
+            all_started.wait(10)
+            with lock:
+                results.append(all_started.is_set())
+
+        def do_last():
+            with lock:
+                results.append('last')
+
+        def makeOperation(f):
+            delays = []
+            return phlsys_scheduleunreliables.DelayedRetryNotifyOperation(
+                f, delays)
+
+        concurrent_operations = [
+            makeOperation(do) for _ in range(num_operations)
+        ]
+        operations = [makeOperation(do_last)]
+
+        active = phlsys_scheduleunreliables.process_once(
+            operations, concurrent_operations, num_operations)
+
+        self.assertSetEqual(set(operations + concurrent_operations), active)
+        self.assertListEqual([True] * num_operations + ['last'], results)
+
+    def test_G_TriggeredOperations(self):
+        results = []
+        is_triggered = [False]
+        is_failing = [False]
+
+        def do():
+            results.append('do')
+            if is_failing[0]:
+                raise Exception("bad_do")
+
+        def reportNothing(_):
+            pass
+
+        def makeOperation(idle_delay):
+            delays = [datetime.timedelta()]  # expire immediately
+            return phlsys_scheduleunreliables.TriggeredOperation(
+                phlsys_scheduleunreliables.DelayedRetryNotifyOperation(
+                    do, delays, reportNothing),
+                lambda: is_triggered[0],
+                idle_delay)
+
+        # [ G] triggered operations are performed once initially
+        operation = makeOperation(idle_delay=None)
+        scheduler = phlsys_scheduleunreliables._TriggeredScheduler(
+            [operation])
+        scheduler.process(None)
+        self.assertListEqual(['do'], results)
+
+        # [ G] triggered operations are not performed again until triggered
+        scheduler.process(None)
+        self.assertListEqual(['do'], results)
+        is_triggered[0] = True
+        scheduler.process(None)
+        self.assertListEqual(['do', 'do'], results)
+        is_triggered[0] = False
+
+        # [ G] failed triggered operations are dropped when out of delays
+        # [ G] failed triggered operations are performed again after delay
+        is_failing[0] = True
+        is_triggered[0] = True
+        scheduler.process(None)
+        self.assertListEqual(['do'] * 3, results)
+        is_triggered[0] = False
+        scheduler.process(None)
+        self.assertListEqual(['do'] * 4, results)
+        scheduler.process(None)
+        self.assertListEqual(['do'] * 4, results)
+
+        # [ G] triggered operations are performed again after their idle delay
+        results[:] = []
+        is_failing[0] = False
+        operation = makeOperation(idle_delay=datetime.timedelta())
+        scheduler = phlsys_scheduleunreliables._TriggeredScheduler(
+            [operation])
+        scheduler.process(None)
+        scheduler.process(None)
+        self.assertListEqual(['do', 'do'], results)
+
 
 #------------------------------------------------------------------------------
 # Copyright (C) 2013-2014 Bloomberg Finance L.P.
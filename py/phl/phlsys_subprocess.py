@@ -7,9 +7,14 @@
 # Public Classes:
 #   Error
 #   CalledProcessError
+#   TimeoutError
+#   Process
+#    .wait
 #
 # Public Functions:
 #   run
+#   start
+#   gather
 #   run_commands
 #
 # Public Assignments:
@@ -22,13 +27,28 @@
 from __future__ import absolute_import
 
 import collections
+import distutils.spawn
+import errno
+import math
+import os
+import select
+import signal
 import subprocess
 import sys
+import time
 
 RunResult = collections.namedtuple(
     'phlsys_subprocess__RunResult',
     ['stdout', 'stderr'])
 
+_READ_BYTES = 64 * 1024
+_WRITE_BYTES = select.PIPE_BUF
+
+# the path of the 'setsid' command, or None if there isn't one; found on first
+# use by '_get_setsid_path'
+_SETSID_PATH = None
+_IS_SETSID_PATH_FOUND = False
+
 
 class Error(Exception):
 
@@ -65,8 +85,24 @@ class CalledProcessError(Error):
         super(CalledProcessError, self).__init__(self.msg)
 
 
-# def run(*args, workingDir=None): <-- supported in Python 3, use kwargs
-# for now
+class TimeoutError(CalledProcessError):
+
+    """Exception for called processes which were killed for taking too long.
+
+    Attributes are as for CalledProcessError, plus:
+        timeout  -- number, the seconds the command was allowed to run for
+
+    """
+
+    def __init__(
+            self, timeout, cmd, stdin, stdout, stderr, exitcode, workingdir):
+        super(TimeoutError, self).__init__(
+            cmd, stdin, stdout, stderr, exitcode, workingdir)
+        self.timeout = timeout
+        self.msg = "timed out after {0} seconds\n".format(timeout) + self.msg
+        self.args = (self.msg,)
+
+
 def run(*args, **kwargs):
     """Execute the command described by args, return a 'RunResult'.
 
@@ -76,6 +112,10 @@ def run(*args, **kwargs):
     Raise a 'CalledProcessError' if the return code is not equal to
     zero; also echo extra information to stderr.
 
+    If 'timeout' is supplied then the command and any processes it started
+    are killed if it doesn't finish within that many seconds, a
+    'TimeoutError' is raised in that case.
+
     Usage examples:
         Echoing 'hello stdout' to stdout:
         >>> run('echo', 'hello stdout')
@@ -85,50 +125,315 @@ def run(*args, **kwargs):
         >>> run('sort', '-r', stdin='1\\n2\\n3')
         phlsys_subprocess__RunResult(stdout='3\\n2\\n1\\n', stderr='')
 
+        Adding to the environment of the command:
+        >>> run('sh', '-c', 'echo $GREETING', env={'GREETING': 'hello'})
+        phlsys_subprocess__RunResult(stdout='hello\\n', stderr='')
+
+        Giving up on a command that takes too long:
+        >>> run('sleep', '10', timeout=0.1)
+        ... # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+            ...
+        TimeoutError: timed out after 0.1 seconds
+        cmd: sleep 10...
+
     :*args: a tuple of strings corresponding to command-line arguments
     :**kwargs: keyword arguments corresponding to the special
     :returns: a RunResult corresponding to the output of the command
 
     """
-    # TODO: allow customization of non-zero return value behaviour,
-    #       maybe not all clients will want to raise an exception in this case.
-    #       if we do allow this customization then we'll also want to
-    #       return the return value via the RunResult
+    return start(*args, **kwargs).wait()
+
+
+def start(*args, **kwargs):
+    """Start the command described by args, return a 'Process' to wait on.
+
+    The arguments are the same as for 'run'.  The command runs in the
+    background until 'wait' is called on the returned 'Process', or until it
+    is passed to 'gather' with others.
+
+    Usage examples:
+        Running two commands at the same time:
+        >>> hello = start('echo', 'hello')
+        >>> goodbye = start('echo', 'goodbye')
+        >>> gather(hello, goodbye)
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [phlsys_subprocess__RunResult(stdout='hello\\n', stderr=''),
+         phlsys_subprocess__RunResult(stdout='goodbye\\n', stderr='')]
+
+    :*args: a tuple of strings corresponding to command-line arguments
+    :**kwargs: keyword arguments as for 'run'
+    :returns: a Process
+
+    """
     workingDir = kwargs.pop("workingDir", None)
     stdin = kwargs.pop("stdin", None)
+    env = kwargs.pop("env", None)
+    timeout = kwargs.pop("timeout", None)
     assert not kwargs
-    cmd = args
-    try:
-        p = subprocess.Popen(
-            cmd,
-            cwd=workingDir,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE)
-        out, err = p.communicate(input=stdin)
-    except OSError:
-        sys.stderr.write(
-            "OSError: unable to locate command: {0}\n".format(" ".join(cmd)))
-        raise
-
-    # pylint has faulty detection of POpen members:
-    # http://www.logilab.org/ticket/46273
-    # pylint: disable=E1101
-    returncode = p.returncode  # pylint: disable=E1101
-    # pylint: enable=E1101
-
-    if (returncode != 0):
-        raise CalledProcessError(
-            cmd=cmd,
-            stdin=stdin,
-            stdout=out,
-            stderr=err,
-            exitcode=returncode,
-            workingdir=workingDir)
-    return RunResult(stdout=out, stderr=err)
-
-
-# XXX: doesn't handle quotes or backticks
+    return Process(args, stdin, env, workingDir, timeout)
+
+
+def gather(*processes):
+    """Return a list of 'RunResult' for 'processes', once they've all finished.
+
+    The output of all the processes is read at the same time, so that they
+    may all make progress and each is only killed if it exceeds it's own
+    timeout.
+
+    Raise the error from the first of the 'processes' which failed, if any,
+    once they have all finished.
+
+    :*processes: the Process objects to wait on, as returned from 'start'
+    :returns: a list of RunResult, in the same order as 'processes'
+
+    """
+    _communicate(processes)
+    return [p.wait() for p in processes]
+
+
+class Process(object):
+
+    """A command started by 'start', wait on it for the 'RunResult'."""
+
+    def __init__(self, cmd, stdin, env, working_dir, timeout):
+        super(Process, self).__init__()
+        self._cmd = cmd
+        self._stdin = stdin
+        self._working_dir = working_dir
+        self._timeout = timeout
+        self._deadline = None
+        if timeout is not None:
+            self._deadline = time.time() + timeout
+
+        # 'env' only adds to the environment, rather than replacing it
+        if env is not None:
+            env = dict(os.environ, **env)
+
+        # put the command in a process group of it's own, so that if we kill
+        # it we can also kill any processes that it started.
+        #
+        # N.B. use the 'setsid' command rather than 'preexec_fn=os.setsid',
+        # running Python code in the child between fork and exec is unsafe
+        # when other threads are running, it may deadlock on locks which were
+        # held by the other threads when we forked.  'setsid' doesn't fork as
+        # the child isn't a process group leader, so the command keeps the
+        # pid of the child and leads its own process group.  If there's no
+        # 'setsid' then only the command itself will be killed.
+        self._is_process_group = False
+        popen_cmd = cmd
+        if timeout is not None:
+            setsid_path = _get_setsid_path()
+            if setsid_path is not None:
+                popen_cmd = (setsid_path,) + tuple(cmd)
+                self._is_process_group = True
+
+        try:
+            # N.B. close the parent's other fds in the child, otherwise
+            # children launched concurrently from other threads will inherit
+            # the pipes to each other and we'll wait for all of them to finish
+            self._popen = subprocess.Popen(
+                popen_cmd,
+                cwd=working_dir,
+                env=env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                close_fds=True)
+        except OSError:
+            sys.stderr.write(
+                "OSError: unable to locate command: {0}\n".format(
+                    " ".join(cmd)))
+            raise
+
+        self._input_offset = 0
+        self._out = []
+        self._err = []
+        self._is_timed_out = False
+        self._returncode = None
+
+        self._readers = {
+            self._popen.stdout.fileno(): (self._popen.stdout, self._out),
+            self._popen.stderr.fileno(): (self._popen.stderr, self._err),
+        }
+        self._writers = {}
+        if stdin:
+            self._writers[self._popen.stdin.fileno()] = self._popen.stdin
+        else:
+            self._popen.stdin.close()
+
+    def wait(self):
+        """Return the 'RunResult' of the command, once it has finished.
+
+        Raise a 'CalledProcessError' if the return code is not equal to zero,
+        raise a 'TimeoutError' if it was killed for taking too long.
+
+        :returns: a RunResult
+
+        """
+        _communicate([self])
+
+        out = ''.join(self._out)
+        err = ''.join(self._err)
+
+        if self._is_timed_out:
+            raise TimeoutError(
+                timeout=self._timeout,
+                cmd=self._cmd,
+                stdin=self._stdin,
+                stdout=out,
+                stderr=err,
+                exitcode=self._returncode,
+                workingdir=self._working_dir)
+
+        if self._returncode != 0:
+            raise CalledProcessError(
+                cmd=self._cmd,
+                stdin=self._stdin,
+                stdout=out,
+                stderr=err,
+                exitcode=self._returncode,
+                workingdir=self._working_dir)
+
+        return RunResult(stdout=out, stderr=err)
+
+    def _is_finished(self):
+        return self._returncode is not None
+
+    def _on_readable(self, fd):
+        f, chunks = self._readers[fd]
+        data = os.read(fd, _READ_BYTES)
+        if data:
+            chunks.append(data)
+        else:
+            f.close()
+            del self._readers[fd]
+        self._finish_if_done()
+
+    def _on_writable(self, fd):
+        f = self._writers[fd]
+        chunk = self._stdin[
+            self._input_offset:self._input_offset + _WRITE_BYTES]
+        try:
+            self._input_offset += os.write(fd, chunk)
+        except OSError as e:
+            # the command may exit without reading all of it's input
+            if e.errno != errno.EPIPE:
+                raise
+            self._input_offset = len(self._stdin)
+        if self._input_offset >= len(self._stdin):
+            f.close()
+            del self._writers[fd]
+        self._finish_if_done()
+
+    def _finish_if_done(self):
+        if not self._readers and not self._writers:
+            self._returncode = self._popen.wait()
+
+    def _kill(self):
+        self._is_timed_out = True
+        try:
+            if self._is_process_group:
+                os.killpg(self._popen.pid, signal.SIGKILL)
+            else:
+                os.kill(self._popen.pid, signal.SIGKILL)
+        except OSError as e:
+            # the process may have already gone
+            if e.errno != errno.ESRCH:
+                raise
+
+        # don't wait for the pipes to close, a process may have escaped the
+        # group and still have them open
+        for f, _ in self._readers.itervalues():
+            f.close()
+        for f in self._writers.itervalues():
+            f.close()
+        self._readers = {}
+        self._writers = {}
+        self._returncode = self._popen.wait()
+
+
+def _communicate(processes):
+    # read from and write to all of the 'processes' until they're finished,
+    # killing any which exceed their deadline
+    pending = [p for p in processes if not p._is_finished()]
+    while pending:
+        reader_to_process = {}
+        writer_to_process = {}
+        deadlines = []
+        for p in pending:
+            reader_to_process.update((fd, p) for fd in p._readers)
+            writer_to_process.update((fd, p) for fd in p._writers)
+            if p._deadline is not None:
+                deadlines.append(p._deadline)
+
+        timeout = None
+        if deadlines:
+            timeout = max(0, min(deadlines) - time.time())
+
+        try:
+            readable, writable = _wait_for_io(
+                reader_to_process.keys(), writer_to_process.keys(), timeout)
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                continue
+            raise
+
+        for fd in readable:
+            reader_to_process[fd]._on_readable(fd)
+        for fd in writable:
+            writer_to_process[fd]._on_writable(fd)
+
+        now = time.time()
+        for p in pending:
+            if not p._is_finished():
+                if p._deadline is not None and now >= p._deadline:
+                    p._kill()
+
+        pending = [p for p in pending if not p._is_finished()]
+
+
+def _wait_for_io(readers, writers, timeout):
+    # return the (readable, writable) fds, waiting at most 'timeout' seconds
+    # or forever if it's None.
+    #
+    # prefer 'poll' to 'select', 'select' can't handle fds numbered more than
+    # FD_SETSIZE, usually 1024, which a busy process may well have
+    if not hasattr(select, 'poll'):
+        readable, writable, _ = select.select(readers, writers, [], timeout)
+        return readable, writable
+
+    poller = select.poll()
+    for fd in readers:
+        poller.register(fd, select.POLLIN)
+    for fd in writers:
+        poller.register(fd, select.POLLOUT)
+
+    if timeout is not None:
+        timeout = int(math.ceil(timeout * 1000))
+
+    # a hung-up or broken fd is reported as ready too, reading will find the
+    # end of the file and writing will fail with EPIPE, which we handle
+    readers = set(readers)
+    readable = []
+    writable = []
+    for fd, _ in poller.poll(timeout):
+        if fd in readers:
+            readable.append(fd)
+        else:
+            writable.append(fd)
+    return readable, writable
+
+
+def _get_setsid_path():
+    global _SETSID_PATH
+    global _IS_SETSID_PATH_FOUND
+    if not _IS_SETSID_PATH_FOUND:
+        _SETSID_PATH = distutils.spawn.find_executable('setsid')
+        _IS_SETSID_PATH_FOUND = True
+    return _SETSID_PATH
+
+
 def run_commands(*commands):
     """Execute the command-line strings descripted by '*commands'.
 
@@ -1,5 +1,8 @@
 from __future__ import absolute_import
 
+import os
+import resource
+import time
 import unittest
 
 import phlsys_fs
@@ -47,6 +50,68 @@ class PhlsysSubprocessTests(unittest.TestCase):
             phlsys_subprocess.run,
             cmd)
 
+    def test_run_large_input_output(self):
+        "Passing more than a pipe buffer in and out doesn't deadlock"
+        content = "".join(str(i) + "\n" for i in xrange(100000))
+        result = phlsys_subprocess.run("cat", stdin=content)
+        self.assertEqual(result.stdout, content)
+
+    def test_run_timeout(self):
+        "Command that takes too long - killed with its children, raises"
+        start = time.time()
+        with self.assertRaises(phlsys_subprocess.TimeoutError) as cm:
+            # the backgrounded sleep holds stdout open, it must be killed
+            # along with the shell for us to return promptly
+            phlsys_subprocess.run(
+                "sh", "-c", "echo started; sleep 10 & wait", timeout=0.5)
+        self.assertLess(time.time() - start, 5)
+        self.assertIsInstance(
+            cm.exception, phlsys_subprocess.CalledProcessError)
+        self.assertEqual(cm.exception.stdout, "started\n")
+
+    def test_gather_concurrent(self):
+        "Several commands started together - run at the same time"
+        start = time.time()
+        processes = [
+            phlsys_subprocess.start("sh", "-c", "sleep 1; echo " + str(i))
+            for i in xrange(4)
+        ]
+        results = phlsys_subprocess.gather(*processes)
+        self.assertLess(time.time() - start, 3)
+        self.assertEqual(
+            [str(i) + "\n" for i in xrange(4)], [r.stdout for r in results])
+
+    def test_gather_error(self):
+        "Several commands started together - first failure raised"
+        processes = [
+            phlsys_subprocess.start("false"),
+            phlsys_subprocess.start("sleep", "10", timeout=0.5),
+            phlsys_subprocess.start("echo", "hello"),
+        ]
+        with self.assertRaises(phlsys_subprocess.CalledProcessError) as cm:
+            phlsys_subprocess.gather(*processes)
+        self.assertEqual(("false",), cm.exception.cmd)
+        self.assertRaises(phlsys_subprocess.TimeoutError, processes[1].wait)
+        self.assertEqual("hello\n", processes[2].wait().stdout)
+
+    def test_run_many_fds_open(self):
+        "Commands run while the parent has fds numbered over 1024"
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft_limit < 1200:
+            self.skipTest("not allowed enough open files")
+        fds = []
+        try:
+            while not fds or fds[-1] < 1100:
+                fds.extend(os.pipe())
+            self.assertEqual(
+                "hi\n", phlsys_subprocess.run("echo", "hi").stdout)
+            self.assertEqual(
+                "hi\n",
+                phlsys_subprocess.run("cat", stdin="hi\n", timeout=5).stdout)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
     def test_run_commands(self):
         "Run simple cmds - returns None"
         self.assertEqual(
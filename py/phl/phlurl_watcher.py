@@ -123,7 +123,9 @@ class Watcher(object):
         :returns: None
 
         """
-        json.dump(self._results, f)
+        # take a copy first, the results may be updated by another thread
+        # while we're dumping them
+        json.dump(dict(self._results), f)
 
 
 #------------------------------------------------------------------------------